@@ -0,0 +1 @@
+"""Scripts for measuring the performance of OpenFermion-Cirq."""
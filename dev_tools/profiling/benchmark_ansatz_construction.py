@@ -0,0 +1,85 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Times the construction of swap network ansatzes and the resolution of
+their parameters, against the number of qubits.
+
+The construction time is compared with that of packing the same operations
+into a circuit with cirq.Circuit.from_ops and the EARLIEST strategy.
+
+Example:
+    python dev_tools/profiling/benchmark_ansatz_construction.py \
+        --n_qubits 10 20 50 --repetitions 5
+"""
+
+import argparse
+import sys
+import timeit
+
+import numpy
+import openfermion
+
+import cirq
+
+from openfermioncirq.variational import SwapNetworkTrotterAnsatz
+
+
+def main(n_qubits, iterations, repetitions):
+    print('{} iterations, mean times (ms)'.format(iterations))
+    print('{:<8}{:>8}{:>16}{:>16}{:>16}{:>16}'.format(
+        'qubits', 'params', 'construction', 'from_ops', 'param_resolver',
+        'resolve circuit'))
+    for n in n_qubits:
+        hamiltonian = openfermion.random_diagonal_coulomb_hamiltonian(
+                n, real=True, seed=n)
+
+        start = timeit.default_timer()
+        for _ in range(repetitions):
+            ansatz = SwapNetworkTrotterAnsatz(hamiltonian,
+                                              iterations=iterations)
+        construction_time = (timeit.default_timer() - start) / repetitions
+
+        start = timeit.default_timer()
+        for _ in range(repetitions):
+            cirq.Circuit.from_ops(ansatz.operations(ansatz.qubits),
+                                  strategy=cirq.InsertStrategy.EARLIEST)
+        from_ops_time = (timeit.default_timer() - start) / repetitions
+
+        x = numpy.random.RandomState(n).randn(ansatz.num_params)
+        start = timeit.default_timer()
+        for _ in range(repetitions):
+            resolver = ansatz.param_resolver(x)
+        resolver_time = (timeit.default_timer() - start) / repetitions
+
+        start = timeit.default_timer()
+        for _ in range(repetitions):
+            cirq.resolve_parameters(ansatz.circuit, resolver)
+        resolve_time = (timeit.default_timer() - start) / repetitions
+
+        print('{:<8}{:>8}{:>16.1f}{:>16.1f}{:>16.3f}{:>16.1f}'.format(
+            n, ansatz.num_params, 1e3 * construction_time,
+            1e3 * from_ops_time, 1e3 * resolver_time, 1e3 * resolve_time))
+
+
+def parse_arguments(args):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--n_qubits', default=[10, 20, 50], type=int,
+                        nargs='+', help='Numbers of qubits to time.')
+    parser.add_argument('--iterations', default=1, type=int,
+                        help='Number of iterations of the ansatz.')
+    parser.add_argument('--repetitions', default=3, type=int,
+                        help='Number of repetitions of each timing.')
+    return vars(parser.parse_args(args))
+
+
+if __name__ == '__main__':
+    main(**parse_arguments(sys.argv[1:]))
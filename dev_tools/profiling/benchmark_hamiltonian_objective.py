@@ -0,0 +1,88 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Times HamiltonianObjective with each way of applying the Hamiltonian.
+
+Example:
+    python dev_tools/profiling/benchmark_hamiltonian_objective.py \
+        --n_qubits 4 8 12 --repetitions 5
+"""
+
+from typing import TYPE_CHECKING
+
+import argparse
+import sys
+import timeit
+
+import openfermion
+
+from openfermioncirq.variational import HamiltonianObjective
+
+if TYPE_CHECKING:
+    # pylint: disable=unused-import
+    from typing import Any, Dict, Tuple
+
+
+MODES = (('sparse', {}),
+         ('linear_op', {'use_linear_op': True}),
+         ('pauli_masks', {'use_pauli_masks': True})
+         )  # type: Tuple[Tuple[str, Dict[str, Any]], ...]
+
+
+def time_mode(hamiltonian, n_qubits, repetitions, seed=0, **kwargs):
+    """Returns the time in seconds to construct the objective and the mean
+    time of one call to its value method."""
+    start = timeit.default_timer()
+    objective = HamiltonianObjective(hamiltonian, **kwargs)
+    construction_time = timeit.default_timer() - start
+
+    state = openfermion.haar_random_vector(1 << n_qubits, seed)
+    start = timeit.default_timer()
+    for _ in range(repetitions):
+        objective.value(state)
+    return (construction_time,
+            (timeit.default_timer() - start) / repetitions)
+
+
+def main(n_qubits, repetitions, skip_linear_op):
+    print('Time to construct the objective / mean time per value (ms)')
+    print('{:<8}{:>8}'.format('qubits', 'terms') + ''.join(
+        '{:>24}'.format(name) for name, _ in MODES))
+    for n in n_qubits:
+        hamiltonian = openfermion.jordan_wigner(
+                openfermion.random_interaction_operator(n, real=True, seed=n))
+        row = '{:<8}{:>8}'.format(n, len(hamiltonian.terms))
+        for name, kwargs in MODES:
+            if skip_linear_op and name == 'linear_op':
+                row += '{:>24}'.format('-')
+                continue
+            construction_time, value_time = time_mode(
+                    hamiltonian, n, repetitions, **kwargs)
+            row += '{:>24}'.format('{:.1f} / {:.3f}'.format(
+                1e3 * construction_time, 1e3 * value_time))
+        print(row)
+
+
+def parse_arguments(args):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--n_qubits', default=[4, 8, 12], type=int,
+                        nargs='+', help='Numbers of qubits to time.')
+    parser.add_argument('--repetitions', default=5, type=int,
+                        help='Number of values to time.')
+    parser.add_argument('--skip_linear_op', action='store_true',
+                        help='Do not time the LinearQubitOperator, which is '
+                             'very slow for more than about 10 qubits.')
+    return vars(parser.parse_args(args))
+
+
+if __name__ == '__main__':
+    main(**parse_arguments(sys.argv[1:]))
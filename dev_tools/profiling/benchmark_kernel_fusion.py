@@ -0,0 +1,78 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Counts and times the passes of compiled ansatz circuits with and without
+kernel fusion.
+
+Example:
+    python dev_tools/profiling/benchmark_kernel_fusion.py \
+        --n_qubits 8 --repetitions 20
+"""
+
+import argparse
+import sys
+import timeit
+
+import numpy
+
+from dev_tools.profiling.benchmark_variational_black_boxes import (
+        example_ansatzes)
+from openfermioncirq.simulation import CompiledCircuit
+
+
+def compile_ansatz(ansatz, fuse):
+    return CompiledCircuit(
+            ansatz.circuit,
+            qubit_order=ansatz.qubit_permutation(ansatz.qubits),
+            params=ansatz.param_symbols,
+            scale_factors=ansatz.param_table.scale_factors,
+            fuse=fuse)
+
+
+def time_final_states(compiled, repetitions, seed=0):
+    """Returns the mean time in seconds of one call to final_state."""
+    random_state = numpy.random.RandomState(seed)
+    xs = random_state.randn(repetitions, len(compiled.params))
+    compiled.final_state(xs[0], copy=False)
+    start = timeit.default_timer()
+    for x in xs:
+        compiled.final_state(x, copy=False)
+    return (timeit.default_timer() - start) / repetitions
+
+
+def main(n_qubits, iterations, repetitions):
+    print('{} qubits, {} iterations, passes and mean time per '
+          'evaluation'.format(n_qubits, iterations))
+    print('{:<34}{:>10}{:>10}{:>14}{:>14}'.format(
+        'ansatz', 'unfused', 'fused', 'unfused (ms)', 'fused (ms)'))
+    for name, ansatz, _ in example_ansatzes(n_qubits, iterations):
+        unfused = compile_ansatz(ansatz, fuse=False)
+        fused = compile_ansatz(ansatz, fuse=True)
+        print('{:<34}{:>10}{:>10}{:>14.3f}{:>14.3f}'.format(
+            name, unfused.num_passes, fused.num_passes,
+            1e3 * time_final_states(unfused, repetitions),
+            1e3 * time_final_states(fused, repetitions)))
+
+
+def parse_arguments(args):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--n_qubits', default=8, type=int,
+                        help='Number of qubits of the ansatz circuits.')
+    parser.add_argument('--iterations', default=1, type=int,
+                        help='Number of iterations of each ansatz.')
+    parser.add_argument('--repetitions', default=10, type=int,
+                        help='Number of evaluations to time.')
+    return vars(parser.parse_args(args))
+
+
+if __name__ == '__main__':
+    main(**parse_arguments(sys.argv[1:]))
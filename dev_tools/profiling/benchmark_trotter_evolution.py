@@ -0,0 +1,95 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Times Trotter evolution by TrotterEvolution against building and
+simulating the circuit of simulate_trotter.
+
+LINEAR_SWAP_NETWORK and SPLIT_OPERATOR evolve a random diagonal Coulomb
+Hamiltonian, and LOW_RANK evolves the Hamiltonian of LiH. LOW_RANK is only
+timed for order 0, the only order it supports, and on at most 12 qubits.
+
+Example:
+    python dev_tools/profiling/benchmark_trotter_evolution.py \
+        --n_qubits 8 --n_steps 100
+"""
+
+import argparse
+import sys
+import timeit
+
+import numpy
+import openfermion
+
+import cirq
+
+from dev_tools.profiling.benchmark_variational_black_boxes import (
+        lih_hamiltonian)
+from openfermioncirq import simulate_trotter
+from openfermioncirq.trotter import (
+        LINEAR_SWAP_NETWORK,
+        LOW_RANK,
+        SPLIT_OPERATOR,
+        TrotterEvolution)
+
+
+def main(n_qubits, n_steps, order):
+    qubits = cirq.LineQubit.range(n_qubits)
+    diagonal_coulomb = openfermion.random_diagonal_coulomb_hamiltonian(
+            n_qubits, real=True, seed=n_qubits)
+    algorithms = [('LINEAR_SWAP_NETWORK', LINEAR_SWAP_NETWORK,
+                   diagonal_coulomb),
+                  ('SPLIT_OPERATOR', SPLIT_OPERATOR, diagonal_coulomb)]
+    if order == 0 and n_qubits <= 12:
+        algorithms.append(
+                ('LOW_RANK', LOW_RANK, lih_hamiltonian(n_qubits)))
+    initial_state = openfermion.haar_random_vector(2**n_qubits, seed=0)
+    time = 1.0
+
+    print('{} qubits, {} steps of order {}, times (s)'.format(
+        n_qubits, n_steps, order))
+    print('{:<24}{:>12}{:>12}{:>12}{:>12}'.format(
+        'algorithm', 'circuit', 'compile', 'evolve', 'error'))
+    for name, algorithm, hamiltonian in algorithms:
+        start = timeit.default_timer()
+        circuit = cirq.Circuit.from_ops(simulate_trotter(
+            qubits, hamiltonian, time, n_steps, order, algorithm))
+        expected = circuit.apply_unitary_effect_to_state(
+                initial_state, qubit_order=qubits)
+        circuit_time = timeit.default_timer() - start
+
+        start = timeit.default_timer()
+        evolution = TrotterEvolution(qubits, hamiltonian, time, n_steps,
+                                     order, algorithm)
+        compile_time = timeit.default_timer() - start
+
+        start = timeit.default_timer()
+        final_state = evolution.final_state(initial_state)
+        evolve_time = timeit.default_timer() - start
+
+        print('{:<24}{:>12.3f}{:>12.3f}{:>12.3f}{:>12.1e}'.format(
+            name, circuit_time, compile_time, evolve_time,
+            numpy.max(numpy.abs(final_state - expected))))
+
+
+def parse_arguments(args):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--n_qubits', default=8, type=int,
+                        help='Number of qubits.')
+    parser.add_argument('--n_steps', default=100, type=int,
+                        help='Number of Trotter steps.')
+    parser.add_argument('--order', default=0, type=int,
+                        help='Order of the Trotter formula.')
+    return vars(parser.parse_args(args))
+
+
+if __name__ == '__main__':
+    main(**parse_arguments(sys.argv[1:]))
@@ -0,0 +1,122 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Times black box evaluations for the ansatzes shipped with the library.
+
+Example:
+    python dev_tools/profiling/benchmark_variational_black_boxes.py \
+        --n_qubits 8 --repetitions 20
+"""
+
+import argparse
+import sys
+import timeit
+
+import numpy
+import openfermion
+
+from openfermioncirq.variational import (
+        HamiltonianObjective,
+        LowRankTrotterAnsatz,
+        SplitOperatorTrotterAnsatz,
+        SwapNetworkTrotterAnsatz,
+        SwapNetworkTrotterHubbardAnsatz)
+from openfermioncirq.variational.variational_black_box import (
+        COMPILED_SIMULATE,
+        UNITARY_SIMULATE)
+
+
+def example_ansatzes(n_qubits, iterations=1, seed=0):
+    """Yields (name, ansatz, objective) for each shipped ansatz.
+
+    The number of qubits must be even and at most 12.
+    """
+    diagonal_coulomb = openfermion.random_diagonal_coulomb_hamiltonian(
+            n_qubits, real=True, seed=seed)
+    # The low rank ansatz needs a Hamiltonian with the symmetries of a
+    # molecule
+    interaction = lih_hamiltonian(n_qubits)
+    hubbard = openfermion.fermi_hubbard(
+            n_qubits // 2, 1, 1.0, 4.0, periodic=False)
+
+    yield ('SwapNetworkTrotterAnsatz',
+           SwapNetworkTrotterAnsatz(diagonal_coulomb, iterations=iterations),
+           HamiltonianObjective(diagonal_coulomb))
+    yield ('SplitOperatorTrotterAnsatz',
+           SplitOperatorTrotterAnsatz(diagonal_coulomb, iterations=iterations),
+           HamiltonianObjective(diagonal_coulomb))
+    yield ('LowRankTrotterAnsatz',
+           LowRankTrotterAnsatz(interaction, iterations=iterations),
+           HamiltonianObjective(interaction))
+    yield ('SwapNetworkTrotterHubbardAnsatz',
+           SwapNetworkTrotterHubbardAnsatz(
+               n_qubits // 2, 1, 1.0, 4.0, periodic=False,
+               iterations=iterations),
+           HamiltonianObjective(hubbard))
+
+
+def lih_hamiltonian(n_qubits):
+    """The Hamiltonian of LiH in the STO-3G basis on n_qubits qubits.
+
+    The molecule has 6 spatial orbitals and 4 electrons: up to 5 orbitals
+    are active with the lowest one frozen, and all 6 are active with all
+    the electrons, so the number of qubits must be even and at most 12.
+    """
+    if n_qubits % 2 or not 2 <= n_qubits <= 12:
+        raise ValueError('The number of qubits must be even and between 2 '
+                         'and 12, but was {}.'.format(n_qubits))
+    n_orbitals = n_qubits // 2
+    return openfermion.load_molecular_hamiltonian(
+            [('Li', (0., 0., 0.)), ('H', (0., 0., 1.45))], 'sto-3g', 1,
+            format(1.45), 2 if n_orbitals < 6 else 4, n_orbitals)
+
+
+def time_evaluations(black_box, repetitions, seed=0):
+    """Returns the mean time in seconds of one call to black_box.evaluate."""
+    random_state = numpy.random.RandomState(seed)
+    xs = random_state.randn(repetitions, black_box.dimension)
+    # Warm up, e.g. to compile the circuit
+    black_box.evaluate(xs[0])
+    start = timeit.default_timer()
+    for x in xs:
+        black_box.evaluate(x)
+    return (timeit.default_timer() - start) / repetitions
+
+
+def main(n_qubits, iterations, repetitions):
+    print('{} qubits, {} iterations, mean time per evaluation'.format(
+        n_qubits, iterations))
+    print('{:<34}{:>14}{:>14}{:>10}'.format(
+        'ansatz', 'unitary (ms)', 'compiled (ms)', 'speedup'))
+    for name, ansatz, objective in example_ansatzes(n_qubits, iterations):
+        unitary_time = time_evaluations(
+                UNITARY_SIMULATE(ansatz, objective), repetitions)
+        compiled_time = time_evaluations(
+                COMPILED_SIMULATE(ansatz, objective), repetitions)
+        print('{:<34}{:>14.3f}{:>14.3f}{:>9.1f}x'.format(
+            name, 1e3 * unitary_time, 1e3 * compiled_time,
+            unitary_time / compiled_time))
+
+
+def parse_arguments(args):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--n_qubits', default=8, type=int,
+                        help='Number of qubits of the ansatz circuits.')
+    parser.add_argument('--iterations', default=1, type=int,
+                        help='Number of iterations of each ansatz.')
+    parser.add_argument('--repetitions', default=10, type=int,
+                        help='Number of evaluations to time.')
+    return vars(parser.parse_args(args))
+
+
+if __name__ == '__main__':
+    main(**parse_arguments(sys.argv[1:]))
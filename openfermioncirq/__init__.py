@@ -61,6 +61,7 @@ from openfermioncirq import (
     gates,
     optimization,
     primitives,
+    simulation,
     trotter,
     variational,
     testing,
@@ -16,9 +16,21 @@ from openfermioncirq.optimization.algorithm import (
     OptimizationAlgorithm,
     OptimizationParams)
 
+from openfermioncirq.optimization.ask_tell import (
+    AskTellAlgorithm,
+    AskTellOptimizer,
+    SynchronousAlgorithmAdapter,
+    ask_tell_optimizer,
+    optimize_asynchronously)
+
 from openfermioncirq.optimization.black_box import (
     BlackBox,
-    StatefulBlackBox)
+    StatefulBlackBox,
+    StopOptimization)
+
+from openfermioncirq.optimization.evaluations import (
+    FunctionValues,
+    GrowableArray)
 
 from openfermioncirq.optimization.result import (
     OptimizationResult,
@@ -88,15 +88,24 @@ class OptimizationParams:
         cost_of_evaluate: A cost value associated with the `evaluate`
             method of the BlackBox to be optimized. For use with black boxes
             with a noise and cost model.
+        evaluation_cache_size: The number of noiseless function values that a
+            StatefulBlackBox remembers, so that points queried again by the
+            algorithm are not evaluated again. 0 disables the cache.
+        evaluation_cache_tolerance: The tolerance to which points are rounded
+            before being looked up in the evaluation cache.
     """
 
     def __init__(self,
                  algorithm: OptimizationAlgorithm,
                  initial_guess: Optional[numpy.ndarray]=None,
                  initial_guess_array: Optional[numpy.ndarray]=None,
-                 cost_of_evaluate: Optional[float]=None) -> None:
+                 cost_of_evaluate: Optional[float]=None,
+                 evaluation_cache_size: int=0,
+                 evaluation_cache_tolerance: float=0.0) -> None:
         """Construct a parameters object by setting its attributes."""
         self.algorithm = algorithm
         self.initial_guess = initial_guess
         self.initial_guess_array = initial_guess_array
         self.cost_of_evaluate = cost_of_evaluate
+        self.evaluation_cache_size = evaluation_cache_size
+        self.evaluation_cache_tolerance = evaluation_cache_tolerance
@@ -0,0 +1,396 @@
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Optimization algorithms that propose points and receive their values."""
+
+from typing import List, Optional, Sequence, TYPE_CHECKING, Tuple
+
+import abc
+import concurrent.futures
+import os
+import queue
+import threading
+
+import numpy
+
+from openfermioncirq.optimization.algorithm import OptimizationAlgorithm
+from openfermioncirq.optimization.black_box import (
+        BlackBox,
+        StatefulBlackBox,
+        StopOptimization)
+from openfermioncirq.optimization.result import OptimizationResult
+
+if TYPE_CHECKING:
+    # pylint: disable=unused-import
+    from typing import Any, Dict
+
+
+class AskTellOptimizer(metaclass=abc.ABCMeta):
+    """The state of one optimization run driven by asking and telling.
+
+    Instead of evaluating a black box itself, the optimizer is asked for
+    points to evaluate and told their function values, which lets a driver
+    such as `optimize_asynchronously` evaluate several points at once and
+    report the values in the order in which the evaluations finish.
+    """
+
+    @abc.abstractmethod
+    def ask(self, n: int=1) -> List[numpy.ndarray]:
+        """Proposes points at which to evaluate the objective function.
+
+        Args:
+            n: The maximum number of points to propose.
+
+        Returns:
+            A list of at most n points. It is empty if the optimizer is done,
+            or if it needs the values of the points already proposed before
+            it can propose more.
+        """
+        pass
+
+    @abc.abstractmethod
+    def tell(self, x: numpy.ndarray, value: float) -> None:
+        """Reports the function value of a proposed point."""
+        pass
+
+    @abc.abstractproperty
+    def done(self) -> bool:
+        """Whether the optimizer has finished."""
+        pass
+
+    @abc.abstractmethod
+    def result(self) -> OptimizationResult:
+        """The result of the optimization, once it is done."""
+        pass
+
+    def close(self) -> None:
+        """Releases the resources of the optimizer.
+
+        This is called by `optimize_asynchronously` when the run ends, also
+        when it ends before the optimizer is done.
+        """
+        pass
+
+
+class AskTellAlgorithm(OptimizationAlgorithm):
+    """An optimization algorithm that proposes points and receives values.
+
+    Subclasses implement `optimizer`, which starts a run. The `optimize`
+    method drives the run by evaluating the proposed points one at a time,
+    so an AskTellAlgorithm can be used wherever an OptimizationAlgorithm
+    is; use `optimize_asynchronously` to evaluate points concurrently.
+    """
+
+    @abc.abstractmethod
+    def optimizer(self,
+                  black_box: BlackBox,
+                  initial_guess: Optional[numpy.ndarray]=None,
+                  initial_guess_array: Optional[numpy.ndarray]=None
+                  ) -> AskTellOptimizer:
+        """Starts an optimization run.
+
+        Args:
+            black_box: The black box to optimize. The optimizer may read its
+                dimension and bounds, but must not evaluate it.
+            initial_guess: An initial point at which to evaluate the objective
+                function.
+            initial_guess_array: An array of initial points at which to evaluate
+                the objective function, for algorithms that can use multiple
+                initial points. This is a 2d numpy array with each row
+                representing one initial point.
+        """
+        pass
+
+    def optimize(self,
+                 black_box: BlackBox,
+                 initial_guess: Optional[numpy.ndarray]=None,
+                 initial_guess_array: Optional[numpy.ndarray]=None
+                 ) -> OptimizationResult:
+        return optimize_asynchronously(self,
+                                       black_box,
+                                       initial_guess,
+                                       initial_guess_array,
+                                       max_pending=1)
+
+
+class SynchronousAlgorithmAdapter(AskTellOptimizer):
+    """Runs an OptimizationAlgorithm that evaluates the black box itself as an
+    AskTellOptimizer.
+
+    The algorithm runs in a separate thread on a proxy of the black box.
+    When the algorithm evaluates a point, the thread waits until the point
+    has been asked for and its value told. A batch evaluation proposes all
+    the points of the batch at once. Other algorithms propose one point at a
+    time, so that they keep working, for instance under
+    `optimize_asynchronously`, but do not evaluate points concurrently.
+
+    The gradient of the black box, if the algorithm uses it, is computed in
+    the thread of the algorithm. Costs passed by the algorithm to
+    `evaluate_with_cost` are ignored: points are evaluated with the
+    `cost_of_evaluate` of the black box.
+    """
+
+    def __init__(self,
+                 algorithm: OptimizationAlgorithm,
+                 black_box: BlackBox,
+                 initial_guess: Optional[numpy.ndarray]=None,
+                 initial_guess_array: Optional[numpy.ndarray]=None) -> None:
+        """
+        Args:
+            algorithm: The algorithm to run.
+            black_box: The black box to optimize. It is not evaluated by the
+                algorithm.
+            initial_guess: The initial guess to pass to the algorithm.
+            initial_guess_array: The array of initial guesses to pass to the
+                algorithm.
+        """
+        # The batches of points evaluated by the algorithm, followed by None
+        # when it finishes
+        self._requests = queue.Queue()  # type: queue.Queue
+        # The values of the batches, or None to stop the algorithm
+        self._replies = queue.Queue()  # type: queue.Queue
+        # The points of the current batch and their values, once told
+        self._batch = []  # type: List[List[Any]]
+        self._num_asked = 0
+        self._finished = False
+        self._result = None  # type: Optional[OptimizationResult]
+        self._error = None  # type: Optional[BaseException]
+        self._thread = threading.Thread(
+                target=self._run,
+                args=(algorithm,
+                      _ProxyBlackBox(black_box, self._requests, self._replies),
+                      initial_guess,
+                      initial_guess_array),
+                daemon=True)
+        self._thread.start()
+
+    def _run(self,
+             algorithm: OptimizationAlgorithm,
+             black_box: BlackBox,
+             initial_guess: Optional[numpy.ndarray],
+             initial_guess_array: Optional[numpy.ndarray]) -> None:
+        try:
+            self._result = algorithm.optimize(black_box,
+                                              initial_guess,
+                                              initial_guess_array)
+        except StopOptimization:
+            pass
+        except BaseException as error:  # pylint: disable=broad-except
+            self._error = error
+        finally:
+            self._requests.put(None)
+
+    def ask(self, n: int=1) -> List[numpy.ndarray]:
+        if self._finished:
+            return []
+        if not self._batch:
+            # Wait until the algorithm evaluates a batch or finishes
+            xs = self._requests.get()
+            if xs is None:
+                self._finished = True
+                return []
+            self._batch = [[x, None] for x in xs]
+            self._num_asked = 0
+        start = self._num_asked
+        self._num_asked = min(start + n, len(self._batch))
+        return [x for x, _ in self._batch[start:self._num_asked]]
+
+    def tell(self, x: numpy.ndarray, value: float) -> None:
+        for entry in self._batch[:self._num_asked]:
+            if entry[1] is None and numpy.array_equal(entry[0], x):
+                entry[1] = value
+                break
+        else:
+            raise ValueError('The point {} was not asked for.'.format(x))
+        if all(entry[1] is not None for entry in self._batch):
+            self._replies.put(numpy.array([value for _, value in self._batch]))
+            self._batch = []
+
+    @property
+    def done(self) -> bool:
+        return self._finished
+
+    def result(self) -> OptimizationResult:
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        if self._result is None:
+            raise ValueError('The optimization was stopped before the '
+                             'algorithm finished.')
+        return self._result
+
+    def close(self) -> None:
+        """Stops the algorithm, if it is still running."""
+        if self._thread.is_alive():
+            self._replies.put(None)
+            self._thread.join()
+
+
+class _ProxyBlackBox(BlackBox):
+    """Hands the points evaluated by an algorithm to an adapter and waits for
+    their values."""
+
+    def __init__(self,
+                 black_box: BlackBox,
+                 requests: queue.Queue,
+                 replies: queue.Queue) -> None:
+        self._black_box = black_box
+        self._requests = requests
+        self._replies = replies
+        super().__init__()
+
+    @property
+    def dimension(self) -> int:
+        return self._black_box.dimension
+
+    @property
+    def bounds(self) -> Optional[Sequence[Tuple[float, float]]]:
+        return self._black_box.bounds
+
+    @property
+    def has_gradient(self) -> bool:
+        return self._black_box.has_gradient
+
+    def _evaluate(self,
+                  x: numpy.ndarray) -> float:
+        return self._exchange(numpy.array([x], dtype=float))[0]
+
+    def _evaluate_batch(self,
+                        xs: numpy.ndarray) -> numpy.ndarray:
+        return self._exchange(numpy.array(xs, dtype=float))
+
+    def _gradient(self,
+                  x: numpy.ndarray) -> numpy.ndarray:
+        return self._black_box.gradient(x)
+
+    def _exchange(self, xs: numpy.ndarray) -> numpy.ndarray:
+        self._requests.put(xs)
+        values = self._replies.get()
+        if values is None:
+            raise StopOptimization()
+        return values
+
+
+def ask_tell_optimizer(algorithm: OptimizationAlgorithm,
+                       black_box: BlackBox,
+                       initial_guess: Optional[numpy.ndarray]=None,
+                       initial_guess_array: Optional[numpy.ndarray]=None
+                       ) -> AskTellOptimizer:
+    """Starts an optimization run of any algorithm as an AskTellOptimizer.
+
+    An AskTellAlgorithm starts its own optimizer. Other algorithms are run
+    by a SynchronousAlgorithmAdapter.
+    """
+    if isinstance(algorithm, AskTellAlgorithm):
+        return algorithm.optimizer(black_box, initial_guess,
+                                   initial_guess_array)
+    return SynchronousAlgorithmAdapter(algorithm, black_box, initial_guess,
+                                       initial_guess_array)
+
+
+def optimize_asynchronously(
+        algorithm: OptimizationAlgorithm,
+        black_box: BlackBox,
+        initial_guess: Optional[numpy.ndarray]=None,
+        initial_guess_array: Optional[numpy.ndarray]=None,
+        executor: Optional[concurrent.futures.Executor]=None,
+        max_pending: Optional[int]=None) -> OptimizationResult:
+    """Optimizes a black box, evaluating the proposed points concurrently.
+
+    The optimizer of the algorithm is asked for points as long as fewer
+    than `max_pending` evaluations are in progress, the points are submitted
+    to the executor, and the value of each point is told to the optimizer
+    as soon as its evaluation finishes. Evaluations of a StatefulBlackBox
+    are recorded by the black box in this process, in the order in which
+    they finish, and its stopping criteria apply: if one is met, the
+    evaluations in progress are cancelled and StopOptimization is raised.
+    The evaluation cache of the black box is not used.
+
+    With a ProcessPoolExecutor, the black box is pickled with each point,
+    so evaluations should take much longer than pickling it. With a
+    ThreadPoolExecutor, the black box must support concurrent evaluations,
+    which black boxes that simulate into preallocated buffers, such as
+    those of COMPILED_SIMULATE, do not.
+
+    Args:
+        algorithm: The algorithm to run. Algorithms that are not an
+            AskTellAlgorithm are run by a SynchronousAlgorithmAdapter.
+        black_box: The black box to optimize.
+        initial_guess: An initial point at which to evaluate the objective
+            function.
+        initial_guess_array: An array of initial points at which to evaluate
+            the objective function, for algorithms that can use multiple
+            initial points.
+        executor: The executor that evaluates the points. By default, points
+            are evaluated one at a time in this thread.
+        max_pending: The maximum number of evaluations in progress. Defaults
+            to the number of CPUs if an executor is given, and to 1
+            otherwise.
+
+    Raises:
+        StopOptimization: A stopping criterion of the black box was met.
+        ValueError: The optimizer proposed no points although it was not
+            done and no evaluations were in progress.
+    """
+    if max_pending is None:
+        max_pending = (os.cpu_count() or 1) if executor is not None else 1
+    cost = black_box.cost_of_evaluate
+    optimizer = ask_tell_optimizer(algorithm, black_box, initial_guess,
+                                   initial_guess_array)
+    pending = {}  # type: Dict[concurrent.futures.Future, numpy.ndarray]
+    try:
+        while not optimizer.done:
+            if len(pending) < max_pending:
+                for x in optimizer.ask(max_pending - len(pending)):
+                    pending[_submit(executor, black_box, x, cost)] = x
+            if not pending:
+                if optimizer.done:
+                    break
+                raise ValueError('The optimizer proposed no points although '
+                                 'no evaluations are in progress.')
+            finished, _ = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in finished:
+                x = pending.pop(future)
+                value = future.result()
+                if isinstance(black_box, StatefulBlackBox):
+                    black_box.record_evaluations([value], cost, [x])
+                optimizer.tell(x, value)
+        return optimizer.result()
+    finally:
+        for future in pending:
+            future.cancel()
+        optimizer.close()
+
+
+def _submit(executor: Optional[concurrent.futures.Executor],
+            black_box: BlackBox,
+            x: numpy.ndarray,
+            cost: Optional[float]) -> concurrent.futures.Future:
+    if executor is not None:
+        return executor.submit(_evaluate_point, black_box, x, cost)
+    future = concurrent.futures.Future()  # type: concurrent.futures.Future
+    try:
+        future.set_result(_evaluate_point(black_box, x, cost))
+    except Exception as error:  # pylint: disable=broad-except
+        future.set_exception(error)
+    return future
+
+
+def _evaluate_point(black_box: BlackBox,
+                    x: numpy.ndarray,
+                    cost: Optional[float]) -> float:
+    """Evaluates the objective function without recording the evaluation."""
+    # pylint: disable=protected-access
+    if cost is None:
+        return black_box._evaluate(x)
+    return black_box._evaluate_with_cost(x, cost)
@@ -0,0 +1,123 @@
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import concurrent.futures
+
+import numpy
+import pytest
+
+from openfermioncirq.optimization import (
+        COBYLA,
+        AskTellOptimizer,
+        StopOptimization,
+        SynchronousAlgorithmAdapter,
+        ask_tell_optimizer,
+        optimize_asynchronously)
+from openfermioncirq.testing import (
+        ExampleAlgorithm,
+        ExampleAskTellAlgorithm,
+        ExampleAskTellOptimizer,
+        ExampleBlackBox,
+        ExampleStatefulBlackBox)
+
+
+def test_ask_tell_algorithm_optimize():
+    black_box = ExampleStatefulBlackBox(save_x_vals=True)
+    result = ExampleAskTellAlgorithm().optimize(black_box)
+    assert result.num_evaluations == 5
+    assert black_box.num_evaluations == 5
+    assert result.optimal_value == min(black_box.function_values.values)
+    assert numpy.isclose(result.optimal_value,
+                         numpy.sum(result.optimal_parameters**2))
+
+
+@pytest.mark.parametrize('executor_type', [
+    concurrent.futures.ThreadPoolExecutor,
+    concurrent.futures.ProcessPoolExecutor])
+def test_optimize_asynchronously(executor_type):
+    black_box = ExampleStatefulBlackBox(cost_of_evaluate=2.0)
+    with executor_type(2) as executor:
+        result = optimize_asynchronously(ExampleAskTellAlgorithm(),
+                                         black_box,
+                                         executor=executor,
+                                         max_pending=3)
+    assert result.num_evaluations == 5
+    assert black_box.num_evaluations == 5
+    assert black_box.cost_spent == 10.0
+    assert result.optimal_value == min(black_box.function_values.values)
+
+
+def test_optimize_asynchronously_scipy_algorithm():
+    black_box = ExampleStatefulBlackBox()
+    with concurrent.futures.ThreadPoolExecutor(2) as executor:
+        result = optimize_asynchronously(COBYLA,
+                                         black_box,
+                                         initial_guess=numpy.ones(2),
+                                         executor=executor)
+    expected = COBYLA.optimize(ExampleBlackBox(), numpy.ones(2))
+    assert result.optimal_value == expected.optimal_value
+    numpy.testing.assert_allclose(result.optimal_parameters,
+                                  expected.optimal_parameters)
+    assert black_box.num_evaluations == expected.num_evaluations
+
+
+def test_synchronous_algorithm_adapter():
+    black_box = ExampleBlackBox()
+    optimizer = ask_tell_optimizer(ExampleAlgorithm(), black_box)
+    assert isinstance(optimizer, SynchronousAlgorithmAdapter)
+
+    # The algorithm evaluates one point at a time
+    x, = optimizer.ask(3)
+    assert optimizer.ask() == []
+    with pytest.raises(ValueError):
+        optimizer.tell(x + 1, 0.0)
+    optimizer.tell(x, black_box.evaluate(x))
+    while not optimizer.done:
+        for x in optimizer.ask():
+            optimizer.tell(x, black_box.evaluate(x))
+    assert optimizer.result().message == 'success'
+
+    # Closing the adapter stops the algorithm
+    optimizer = SynchronousAlgorithmAdapter(ExampleAlgorithm(), black_box)
+    _ = optimizer.ask()
+    optimizer.close()
+    with pytest.raises(ValueError):
+        _ = optimizer.result()
+
+
+def test_optimize_asynchronously_stopping():
+    black_box = ExampleStatefulBlackBox(
+            stopping_rule=lambda black_box: black_box.num_evaluations >= 2)
+    with pytest.raises(StopOptimization):
+        optimize_asynchronously(ExampleAlgorithm(), black_box)
+    assert black_box.num_evaluations == 2
+    assert black_box.stopped_early
+
+
+def test_optimize_asynchronously_stalled_optimizer():
+
+    class StalledOptimizer(ExampleAskTellOptimizer):
+        def ask(self, n=1):
+            return []
+
+    class StalledAlgorithm(ExampleAskTellAlgorithm):
+        def optimizer(self, black_box, initial_guess=None,
+                      initial_guess_array=None):
+            return StalledOptimizer(black_box.dimension)
+
+    with pytest.raises(ValueError):
+        optimize_asynchronously(StalledAlgorithm(), ExampleBlackBox())
+
+
+def test_ask_tell_optimizer_is_abstract():
+    with pytest.raises(TypeError):
+        _ = AskTellOptimizer()  # type: ignore
@@ -12,16 +12,32 @@
 
 """Defines the interface for a black box objective function."""
 
-from typing import Optional, Sequence, TYPE_CHECKING, Tuple
+from typing import (
+        Callable, Hashable, Optional, Sequence, TYPE_CHECKING, Tuple)
 
 import abc
+import collections
 import time
 
 import numpy
 
+from openfermioncirq.optimization.evaluations import (
+        FunctionValues,
+        GrowableArray)
+
 if TYPE_CHECKING:
     # pylint: disable=unused-import
-    from typing import List
+    from typing import Dict, List
+
+
+class StopOptimization(Exception):
+    """Raised by a stateful black box to stop the optimizer querying it.
+
+    A StatefulBlackBox raises this from its evaluation methods once a value
+    reaches its target or its stopping rule returns True. The best value and
+    point evaluated so far are available as the `best_value` and
+    `best_point` attributes of the black box.
+    """
 
 
 class BlackBox(metaclass=abc.ABCMeta):
@@ -47,6 +63,8 @@ class BlackBox(metaclass=abc.ABCMeta):
             should be equal to the dimension of the black box.
         cost_of_evaluate: If specified, then calls to `evaluate` will be
             redirected to `evaluate_with_cost` with the specified cost.
+        has_gradient: Whether the black box can compute the gradient of the
+            objective function with `gradient`.
     """
 
     def __init__(self,
@@ -75,6 +93,23 @@ class BlackBox(metaclass=abc.ABCMeta):
         """
         return None
 
+    @property
+    def has_gradient(self) -> bool:
+        """Whether the black box can compute the gradient of the objective
+        function."""
+        return False
+
+    @property
+    def evaluations_per_gradient(self) -> int:
+        """The number of evaluations of the objective function that computing
+        a gradient takes.
+
+        Each of them is charged the cost of the gradient, if there is one.
+        Gradients computed without evaluating the objective function, such
+        as analytic ones, take none.
+        """
+        return 0
+
     @abc.abstractmethod
     def _evaluate(self,
                   x: numpy.ndarray) -> float:
@@ -94,6 +129,50 @@ class BlackBox(metaclass=abc.ABCMeta):
         # Default: defer to `_evaluate`
         return self._evaluate(x)
 
+    def _evaluate_batch(self,
+                        xs: numpy.ndarray) -> numpy.ndarray:
+        """Evaluate the objective function at each row of an array.
+
+        Implement this method when a BlackBox can evaluate many points at
+        once faster than one at a time.
+        """
+        # Default: evaluate the points one at a time
+        return numpy.array([self._evaluate(x) for x in xs])
+
+    def _evaluate_with_cost_batch(self,
+                                  xs: numpy.ndarray,
+                                  cost: float) -> numpy.ndarray:
+        """Evaluate the objective function at each row of an array with a
+        specified cost for each evaluation.
+
+        Implement this method when a BlackBox with a cost model can evaluate
+        many points at once faster than one at a time.
+        """
+        # Default: evaluate the points one at a time
+        return numpy.array([self._evaluate_with_cost(x, cost) for x in xs])
+
+    def _gradient(self,
+                  x: numpy.ndarray) -> numpy.ndarray:
+        """Compute the gradient of the objective function.
+
+        Implement this method, and override `has_gradient` to return True,
+        when defining a BlackBox that can compute gradients.
+        """
+        raise NotImplementedError(
+                '{} does not compute gradients.'.format(type(self).__name__))
+
+    def _gradient_with_cost(self,
+                            x: numpy.ndarray,
+                            cost: float) -> numpy.ndarray:
+        """Compute the gradient of the objective function with a specified
+        cost.
+
+        Implement this method when defining a BlackBox that can compute
+        gradients with a cost model.
+        """
+        # Default: defer to `_gradient`
+        return self._gradient(x)
+
     def evaluate(self,
                  x: numpy.ndarray) -> float:
         """Evaluate the objective function."""
@@ -111,6 +190,64 @@ class BlackBox(metaclass=abc.ABCMeta):
         """
         return self._evaluate_with_cost(x, cost)
 
+    def gradient(self,
+                 x: numpy.ndarray) -> numpy.ndarray:
+        """Compute the gradient of the objective function.
+
+        Raises:
+            NotImplementedError: The black box does not compute gradients,
+                i.e., `has_gradient` is False.
+        """
+        if self.cost_of_evaluate is not None:
+            return self.gradient_with_cost(x, self.cost_of_evaluate)
+        return self._gradient(x)
+
+    def gradient_with_cost(self,
+                           x: numpy.ndarray,
+                           cost: float) -> numpy.ndarray:
+        """Compute the gradient of the objective function with a specified
+        cost.
+
+        Raises:
+            NotImplementedError: The black box does not compute gradients,
+                i.e., `has_gradient` is False.
+        """
+        return self._gradient_with_cost(x, cost)
+
+    def evaluate_batch(self,
+                       xs: numpy.ndarray) -> numpy.ndarray:
+        """Evaluate the objective function at a batch of points.
+
+        Args:
+            xs: A two-dimensional array whose rows are the points to evaluate.
+
+        Returns:
+            A one-dimensional array containing the function value of each
+            point.
+        """
+        if self.cost_of_evaluate is not None:
+            return self.evaluate_with_cost_batch(xs, self.cost_of_evaluate)
+        return self._evaluate_batch(_as_batch(xs))
+
+    def evaluate_with_cost_batch(self,
+                                 xs: numpy.ndarray,
+                                 cost: float) -> numpy.ndarray:
+        """Evaluate the objective function at a batch of points with a
+        specified cost.
+
+        The cost applies to each point separately, so evaluating a batch of
+        n points costs n times the specified cost.
+
+        Args:
+            xs: A two-dimensional array whose rows are the points to evaluate.
+            cost: The cost of evaluating each point.
+
+        Returns:
+            A one-dimensional array containing the function value of each
+            point.
+        """
+        return self._evaluate_with_cost_batch(_as_batch(xs), cost)
+
     def noise_bounds(self,
                      cost: float,
                      confidence: Optional[float]=None
@@ -141,23 +278,51 @@ class StatefulBlackBox(BlackBox):
 
     Attributes:
         num_evaluations: The number of times the objective function has been
-            evaluated, including noisy evaluations.
-        cost_spent: The total cost that has been spent on function evaluations.
+            evaluated, including noisy evaluations and the evaluations used
+            to compute gradients.
+        num_gradient_evaluations: The number of evaluations of the objective
+            function used to compute gradients. They are not saved in
+            `function_values`, because they are not values at the points
+            queried.
+        cost_spent: The total cost that has been spent on function
+            evaluations, including those used to compute gradients.
         cost_of_evaluate: An optional cost associated with the
             ``evaluate`` method.
-        function_values: A list of tuples storing function values of evaluated
-            points. The tuples contain three objects. The first is a function
-            value, the second is the cost that was used for the evaluation
-            (or None if there was no cost), and the third is the point that
-            was evaluated (or None if the black box was initialized with
-            ``save_x_vals`` set to False.
-        wait_times: A list of floats. The i-th float float represents the time
-            elapsed between the i-th and (i+1)-th times that the black box
-            was queried. Time is recorded using ``time.time()``.
+        function_values: A FunctionValues object storing the function values
+            of evaluated points, the costs used for the evaluations and, if
+            the black box was initialized with ``save_x_vals`` set to True,
+            the points, as arrays. Indexing it gives tuples of three objects.
+            The first is a function value, the second is the cost that was
+            used for the evaluation (or None if there was no cost), and the
+            third is the point that was evaluated (or None if the points are
+            not saved).
+        wait_times: A GrowableArray of floats. The i-th float represents the
+            time elapsed between the i-th and (i+1)-th times that the black
+            box was queried. Time is recorded using ``time.time()``.
+        cache_hits: The number of noiseless evaluations that were answered
+            from the evaluation cache.
+        cache_misses: The number of noiseless evaluations that were looked up
+            in the evaluation cache but not found.
+        best_value: The lowest function value evaluated so far, or infinity
+            if there were no evaluations.
+        best_point: The point at which `best_value` was evaluated, or None.
+        target: If specified, the optimization is stopped as soon as a
+            function value is at most this target.
+        stopping_rule: If specified, a function that is called with the
+            black box after each evaluation, and that returns True to stop
+            the optimization.
+        target_reached: Whether a function value reached the target.
+        stopped_early: Whether the optimization was stopped by the target or
+            the stopping rule.
     """
 
     def __init__(self,
                  save_x_vals: bool=False,
+                 evaluation_cache_size: int=0,
+                 evaluation_cache_tolerance: float=0.0,
+                 target: Optional[float]=None,
+                 stopping_rule: Optional[
+                     Callable[['StatefulBlackBox'], bool]]=None,
                  **kwargs) -> None:
         """
         Args:
@@ -166,19 +331,49 @@ class StatefulBlackBox(BlackBox):
                 black box to consume a lot more memory. This does not affect
                 whether the function values (y values) are saved (they are
                 saved no matter what).
+            evaluation_cache_size: The maximum number of function values of
+                noiseless evaluations to remember. When a point is evaluated
+                again, its remembered value is returned without evaluating
+                the objective function, and the evaluation is not recorded.
+                When the cache is full, the least recently used value is
+                forgotten. Evaluations with a cost are never cached, so that
+                they are sampled from the noise model every time. Defaults
+                to 0, which disables the cache.
+            evaluation_cache_tolerance: Points are rounded to multiples of
+                this tolerance before being looked up in the cache, so that
+                points that differ by less than about the tolerance share a
+                cached value. Defaults to 0, which only matches identical
+                points.
+            target: If specified, StopOptimization is raised as soon as a
+                function value is at most this target. Noisy function values
+                count too.
+            stopping_rule: If specified, this function is called with the
+                black box after each evaluation, and StopOptimization is
+                raised if it returns True.
         """
-        self.function_values = [] \
-            # type: List[Tuple[float, Optional[float], Optional[numpy.ndarray]]]
+        self.function_values = FunctionValues(save_x_vals)
+        self.num_gradient_evaluations = 0
         self.cost_spent = 0.0
-        self.wait_times = []  # type: List[float]
-        self._save_x_vals = save_x_vals
+        self.wait_times = GrowableArray()
         self._time_of_last_query = None  # type: Optional[float]
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._evaluation_cache_size = evaluation_cache_size
+        self._evaluation_cache_tolerance = evaluation_cache_tolerance
+        self._evaluation_cache = collections.OrderedDict() \
+            # type: Dict[Hashable, float]
+        self.best_value = numpy.inf
+        self.best_point = None  # type: Optional[numpy.ndarray]
+        self.target = target
+        self.stopping_rule = stopping_rule
+        self.target_reached = False
+        self.stopped_early = False
         super().__init__(**kwargs)
 
     @property
     def num_evaluations(self) -> float:
         """The number of times the objective function has been evaluated."""
-        return len(self.function_values)
+        return len(self.function_values) + self.num_gradient_evaluations
 
     def evaluate(self,
                  x: numpy.ndarray) -> float:
@@ -187,27 +382,182 @@ class StatefulBlackBox(BlackBox):
         if self.cost_of_evaluate is not None:
             return self.evaluate_with_cost(x, self.cost_of_evaluate)
 
-        if self._time_of_last_query is not None:
-            self.wait_times.append(time.time() - self._time_of_last_query)
+        if self._evaluation_cache_size:
+            return self._evaluate_cached(numpy.asarray(x)[numpy.newaxis])[0]
 
+        self._record_wait_time()
         val = self._evaluate(x)
-        self.function_values.append(
-                (val, None, x if self._save_x_vals else None)
-        )
-        self._time_of_last_query = time.time()
+        self._record_evaluations([val], None, [x])
         return val
 
     def evaluate_with_cost(self,
                            x: numpy.ndarray,
                            cost: float) -> float:
         """Evaluate the objective function with a cost and update state."""
+        self._record_wait_time()
+        val = self._evaluate_with_cost(x, cost)
+        self._record_evaluations([val], cost, [x])
+        return val
+
+    def gradient(self,
+                 x: numpy.ndarray) -> numpy.ndarray:
+        """Compute the gradient of the objective function and update state."""
+        # If cost_of_evaluate is set, defer to gradient_with_cost
+        if self.cost_of_evaluate is not None:
+            return self.gradient_with_cost(x, self.cost_of_evaluate)
+
+        gradient = self._gradient(x)
+        self._record_gradient_evaluations(None)
+        return gradient
+
+    def gradient_with_cost(self,
+                           x: numpy.ndarray,
+                           cost: float) -> numpy.ndarray:
+        """Compute the gradient of the objective function with a cost and
+        update state."""
+        gradient = self._gradient_with_cost(x, cost)
+        self._record_gradient_evaluations(cost)
+        return gradient
+
+    def evaluate_batch(self,
+                       xs: numpy.ndarray) -> numpy.ndarray:
+        """Evaluate the objective function at a batch of points and update
+        state.
+
+        Every point in the batch is recorded as a separate evaluation. The
+        points of a batch are evaluated together, so the wait times between
+        them are recorded as zero.
+        """
+        # If cost_of_evaluate is set, defer to evaluate_with_cost_batch
+        if self.cost_of_evaluate is not None:
+            return self.evaluate_with_cost_batch(xs, self.cost_of_evaluate)
+
+        xs = _as_batch(xs)
+        if self._evaluation_cache_size:
+            return self._evaluate_cached(xs)
+
+        self._record_wait_time()
+        vals = self._evaluate_batch(xs)
+        self._record_evaluations(vals, None, xs)
+        return vals
+
+    def evaluate_with_cost_batch(self,
+                                 xs: numpy.ndarray,
+                                 cost: float) -> numpy.ndarray:
+        """Evaluate the objective function at a batch of points with a cost
+        and update state."""
+        xs = _as_batch(xs)
+        self._record_wait_time()
+        vals = self._evaluate_with_cost_batch(xs, cost)
+        self._record_evaluations(vals, cost, xs)
+        return vals
+
+    def record_evaluations(self,
+                           vals: Sequence[float],
+                           cost: Optional[float],
+                           xs: Sequence[numpy.ndarray]) -> None:
+        """Records evaluations of the objective function that were made
+        outside the black box, for instance by a copy of it in another process.
+
+        The evaluations are recorded as if `evaluate_with_cost_batch` had
+        returned them, or `evaluate_batch` if the cost is None, and the
+        stopping criteria are checked.
+
+        Raises:
+            StopOptimization: The target was reached or the stopping rule said
+                to stop.
+        """
+        self._record_wait_time()
+        self._record_evaluations(vals, cost, xs)
+
+    def _evaluate_cached(self,
+                         xs: numpy.ndarray) -> numpy.ndarray:
+        """Evaluate a batch of points noiselessly, looking them up in the
+        evaluation cache first."""
+        cache = self._evaluation_cache
+        keys = [self._cache_key(x) for x in xs]
+        vals = [None] * len(xs)  # type: List
+        missing = []  # type: List[int]
+        for i, key in enumerate(keys):
+            if key in cache:
+                self.cache_hits += 1
+                cache.move_to_end(key)  # type: ignore
+                vals[i] = cache[key]
+            else:
+                self.cache_misses += 1
+                missing.append(i)
+
+        if missing:
+            missing_xs = xs[missing]
+            self._record_wait_time()
+            missing_vals = (
+                    numpy.array([self._evaluate(missing_xs[0])])
+                    if len(missing_xs) == 1
+                    else self._evaluate_batch(missing_xs))
+            self._record_evaluations(missing_vals, None, missing_xs)
+            for i, val in zip(missing, missing_vals):
+                vals[i] = val
+                cache[keys[i]] = val
+                cache.move_to_end(keys[i])  # type: ignore
+            while len(cache) > self._evaluation_cache_size:
+                cache.popitem(last=False)  # type: ignore
+        return numpy.array(vals)
+
+    def _cache_key(self, x: numpy.ndarray) -> Hashable:
+        x = numpy.asarray(x, dtype=float)
+        if self._evaluation_cache_tolerance:
+            # Adding zero turns negative zeros into zeros
+            x = numpy.round(x / self._evaluation_cache_tolerance) + 0.0
+        return x.tobytes()
+
+    def _record_wait_time(self) -> None:
         if self._time_of_last_query is not None:
             self.wait_times.append(time.time() - self._time_of_last_query)
 
-        val = self._evaluate_with_cost(x, cost)
-        self.function_values.append(
-                (val, cost, x if self._save_x_vals else None)
-        )
-        self.cost_spent += cost
+    def _record_evaluations(self,
+                            vals: Sequence[float],
+                            cost: Optional[float],
+                            xs: Sequence[numpy.ndarray]) -> None:
+        if len(vals) > 1:
+            self.wait_times.extend(numpy.zeros(len(vals) - 1))
+        self.function_values.append(vals, cost, xs)
+        if cost is not None:
+            self.cost_spent += len(vals) * cost
         self._time_of_last_query = time.time()
-        return val
+        self._record_best(vals, xs)
+        self._check_stopping_criteria()
+
+    def _record_gradient_evaluations(self, cost: Optional[float]) -> None:
+        n_evaluations = self.evaluations_per_gradient
+        self.num_gradient_evaluations += n_evaluations
+        if cost is not None:
+            self.cost_spent += n_evaluations * cost
+
+    def _record_best(self,
+                     vals: Sequence[float],
+                     xs: Sequence[numpy.ndarray]) -> None:
+        vals = numpy.asarray(numpy.real(vals), dtype=float)
+        if not len(vals) or numpy.all(numpy.isnan(vals)):
+            return
+        best = int(numpy.nanargmin(vals))
+        if vals[best] < self.best_value:
+            self.best_value = float(vals[best])
+            self.best_point = numpy.array(xs[best], dtype=float)
+
+    def _check_stopping_criteria(self) -> None:
+        """Raises StopOptimization if the target was reached or the stopping
+        rule says to stop."""
+        if self.target is not None and self.best_value <= self.target:
+            self.target_reached = True
+        if self.target_reached or (self.stopping_rule is not None and
+                                   self.stopping_rule(self)):
+            self.stopped_early = True
+            raise StopOptimization()
+
+
+def _as_batch(xs: numpy.ndarray) -> numpy.ndarray:
+    xs = numpy.asarray(xs)
+    if xs.ndim != 2:
+        raise ValueError('A batch of points must be a two-dimensional array, '
+                         'but got an array of shape {}.'.format(xs.shape))
+    return xs
@@ -10,10 +10,15 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+import warnings
+
 import numpy
 import pytest
 
-from openfermioncirq.optimization.black_box import BlackBox, StatefulBlackBox
+from openfermioncirq.optimization.black_box import (
+        BlackBox,
+        StatefulBlackBox,
+        StopOptimization)
 from openfermioncirq.testing import (
         ExampleBlackBox,
         ExampleBlackBoxNoisy,
@@ -41,6 +46,79 @@ def test_black_box_evaluate_with_cost():
     assert 5.0 < noisy_val < 6.0
 
 
+def test_black_box_evaluate_batch():
+    black_box = ExampleBlackBox()
+    xs = numpy.array([[1.0, 2.0], [0.0, 3.0], [-1.0, 0.5]])
+    numpy.testing.assert_allclose(black_box.evaluate_batch(xs),
+                                  [5.0, 9.0, 1.25])
+    numpy.testing.assert_allclose(black_box.evaluate_with_cost_batch(xs, 1.0),
+                                  [5.0, 9.0, 1.25])
+
+    numpy.random.seed(14536)
+    black_box_noisy = ExampleBlackBoxNoisy(cost_of_evaluate=10.0)
+    noisy_vals = black_box_noisy.evaluate_batch(xs)
+    assert noisy_vals.shape == (3,)
+    assert all(noisy_vals != [5.0, 9.0, 1.25])
+    numpy.testing.assert_allclose(noisy_vals, [5.0, 9.0, 1.25], atol=1.0)
+
+    with pytest.raises(ValueError):
+        _ = black_box.evaluate_batch(numpy.array([1.0, 2.0]))
+
+
+def test_black_box_gradient():
+    class GradientBlackBox(ExampleBlackBox):
+        @property
+        def has_gradient(self):
+            return True
+
+        def _gradient(self, x):
+            return 2 * x
+
+    black_box = ExampleBlackBox()
+    assert not black_box.has_gradient
+    with pytest.raises(NotImplementedError):
+        _ = black_box.gradient(numpy.array([1.0, 2.0]))
+
+    gradient_black_box = GradientBlackBox(cost_of_evaluate=1.0)
+    assert gradient_black_box.has_gradient
+    numpy.testing.assert_allclose(
+            gradient_black_box.gradient(numpy.array([1.0, 2.0])), [2.0, 4.0])
+    numpy.testing.assert_allclose(
+            gradient_black_box.gradient_with_cost(
+                numpy.array([0.5, -1.0]), 10.0),
+            [1.0, -2.0])
+
+
+def test_stateful_black_box_gradient_cost():
+    class SampledGradientBlackBox(ExampleStatefulBlackBox):
+        @property
+        def has_gradient(self):
+            return True
+
+        @property
+        def evaluations_per_gradient(self):
+            return 3
+
+        def _gradient(self, x):
+            return 2 * x
+
+    black_box = SampledGradientBlackBox()
+    _ = black_box.evaluate(numpy.array([1.0, 2.0]))
+    _ = black_box.gradient(numpy.array([1.0, 2.0]))
+    assert black_box.num_gradient_evaluations == 3
+    assert black_box.num_evaluations == 4
+    assert black_box.cost_spent == 0.0
+
+    _ = black_box.gradient_with_cost(numpy.array([1.0, 2.0]), 2.0)
+    assert black_box.num_evaluations == 7
+    assert black_box.cost_spent == 6.0
+
+    black_box = SampledGradientBlackBox(cost_of_evaluate=0.5)
+    _ = black_box.gradient(numpy.array([1.0, 2.0]))
+    assert black_box.cost_spent == 1.5
+    assert len(black_box.function_values) == 0
+
+
 def test_black_box_noise_bounds():
     black_box = ExampleBlackBox()
     assert black_box.noise_bounds(100) == (-numpy.inf, numpy.inf)
@@ -78,6 +156,115 @@ def test_stateful_black_box():
         assert isinstance(t, float)
 
 
+def test_stateful_black_box_evaluate_batch():
+    stateful_black_box = ExampleStatefulBlackBox(save_x_vals=True)
+    xs = numpy.random.randn(3, 2)
+    vals = stateful_black_box.evaluate_batch(xs)
+    _ = stateful_black_box.evaluate(xs[0])
+    _ = stateful_black_box.evaluate_with_cost_batch(xs[:2], 1.5)
+
+    assert stateful_black_box.num_evaluations == 6
+    assert stateful_black_box.cost_spent == 3.0
+    assert len(stateful_black_box.wait_times) == 5
+    assert stateful_black_box.wait_times[1] == 0.0
+    assert stateful_black_box.wait_times[4] == 0.0
+
+    for i in range(3):
+        y, z, x = stateful_black_box.function_values[i]
+        assert y == vals[i]
+        assert z is None
+        numpy.testing.assert_allclose(x, xs[i])
+    y, z, x = stateful_black_box.function_values[5]
+    assert z == 1.5
+    numpy.testing.assert_allclose(x, xs[1])
+
+    stateful_black_box = ExampleStatefulBlackBox(cost_of_evaluate=2.0)
+    _ = stateful_black_box.evaluate_batch(xs)
+    assert stateful_black_box.cost_spent == 6.0
+    assert all(z == 2.0 for _, z, _ in stateful_black_box.function_values)
+    numpy.testing.assert_array_equal(stateful_black_box.function_values.costs,
+                                     [2.0, 2.0, 2.0])
+
+
+def test_stateful_black_box_evaluation_cache():
+    stateful_black_box = ExampleStatefulBlackBox(
+            evaluation_cache_size=2, evaluation_cache_tolerance=1e-6)
+    a, b, c = numpy.array([[1.0, 2.0], [0.0, 3.0], [-1.0, 0.5]])
+
+    assert stateful_black_box.evaluate(a) == 5.0
+    assert stateful_black_box.evaluate(a + 1e-9) == 5.0
+    assert stateful_black_box.evaluate(b) == 9.0
+    assert (stateful_black_box.cache_hits,
+            stateful_black_box.cache_misses) == (1, 2)
+    assert stateful_black_box.num_evaluations == 2
+
+    # Evaluating c evicts b, the least recently used point
+    numpy.testing.assert_allclose(
+            stateful_black_box.evaluate_batch(numpy.array([a, c, c])),
+            [5.0, 1.25, 1.25])
+    assert (stateful_black_box.cache_hits,
+            stateful_black_box.cache_misses) == (2, 4)
+    assert stateful_black_box.num_evaluations == 4
+    _ = stateful_black_box.evaluate(b)
+    assert stateful_black_box.cache_misses == 5
+    assert stateful_black_box.num_evaluations == 5
+
+    # Evaluations with a cost bypass the cache
+    _ = stateful_black_box.evaluate_with_cost(b, 1.0)
+    _ = stateful_black_box.evaluate_with_cost_batch(numpy.array([b]), 1.0)
+    assert (stateful_black_box.cache_hits,
+            stateful_black_box.cache_misses) == (2, 5)
+    assert stateful_black_box.num_evaluations == 7
+
+    uncached_black_box = ExampleStatefulBlackBox()
+    _ = uncached_black_box.evaluate(a)
+    _ = uncached_black_box.evaluate(a)
+    assert uncached_black_box.num_evaluations == 2
+    assert (uncached_black_box.cache_hits,
+            uncached_black_box.cache_misses) == (0, 0)
+
+
+def test_stateful_black_box_stopping():
+    black_box = ExampleStatefulBlackBox(target=1.0)
+    assert black_box.evaluate(numpy.array([1.0, 1.0])) == 2.0
+    assert black_box.best_value == 2.0
+    assert not black_box.stopped_early
+    with pytest.raises(StopOptimization):
+        black_box.evaluate_batch(numpy.array([[0.5, 0.0], [3.0, 0.0]]))
+    assert black_box.target_reached
+    assert black_box.stopped_early
+    assert black_box.num_evaluations == 3
+    assert black_box.best_value == 0.25
+    numpy.testing.assert_allclose(black_box.best_point, [0.5, 0.0])
+
+    black_box = ExampleStatefulBlackBox(
+            stopping_rule=lambda black_box: black_box.num_evaluations >= 2)
+    black_box.evaluate(numpy.array([1.0, 1.0]))
+    with pytest.raises(StopOptimization):
+        black_box.evaluate_with_cost(numpy.array([2.0, 0.0]), 1.0)
+    assert black_box.stopped_early
+    assert not black_box.target_reached
+    assert black_box.best_value == 2.0
+
+
+def test_stateful_black_box_complex_values():
+    class ComplexBlackBox(ExampleStatefulBlackBox):
+        def _evaluate(self, x):
+            # Expectation values are complex with a negligible imaginary part
+            return numpy.sum(x**2) + 1e-17j
+
+    black_box = ComplexBlackBox()
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        black_box.evaluate(numpy.array([1.0, 0.0]))
+        black_box.evaluate_with_cost(numpy.array([0.5, 0.0]), 2.0)
+        black_box.evaluate_batch(numpy.array([[2.0, 0.0], [0.0, 0.0]]))
+    assert black_box.best_value == 0.0
+    numpy.testing.assert_array_equal(black_box.function_values.values,
+                                     [1.0, 0.25, 4.0, 0.0])
+    assert black_box.cost_spent == 2.0
+
+
 def test_stateful_black_box_save_x_vals():
     stateful_black_box = ExampleStatefulBlackBox(save_x_vals=True)
     a, b, c, d = numpy.random.randn(4, 2)
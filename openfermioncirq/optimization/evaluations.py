@@ -0,0 +1,183 @@
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Array-backed storage for the evaluations recorded by black boxes."""
+
+from typing import (
+        Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union)
+
+import numpy
+
+
+class GrowableArray:
+    """A float array that grows along its first axis.
+
+    Rows are appended to a preallocated buffer whose capacity doubles when it
+    is full, so appending takes amortized constant time and the rows are
+    stored contiguously. The array can be read, indexed and iterated over
+    like a list of its rows, and `array` is a view of the rows appended so
+    far. Only those rows are pickled.
+    """
+
+    def __init__(self,
+                 row_shape: Tuple[int, ...]=(),
+                 capacity: int=16) -> None:
+        """
+        Args:
+            row_shape: The shape of each row. Defaults to scalars.
+            capacity: The number of rows to allocate space for initially.
+        """
+        self._buffer = numpy.empty((max(capacity, 1),) + tuple(row_shape))
+        self._size = 0
+
+    @property
+    def array(self) -> numpy.ndarray:
+        """The rows appended so far, as a view of the buffer."""
+        return self._buffer[:self._size]
+
+    def append(self, row: Union[float, numpy.ndarray]) -> None:
+        self._reserve(1)
+        self._buffer[self._size] = row
+        self._size += 1
+
+    def extend(self, rows: Union[Sequence[float], numpy.ndarray]) -> None:
+        rows = numpy.asarray(rows, dtype=float)
+        self._reserve(len(rows))
+        self._buffer[self._size:self._size + len(rows)] = rows
+        self._size += len(rows)
+
+    def _reserve(self, n_rows: int) -> None:
+        capacity = len(self._buffer)
+        if self._size + n_rows <= capacity:
+            return
+        buffer = numpy.empty(
+                (max(2 * capacity, self._size + n_rows),) +
+                self._buffer.shape[1:])
+        buffer[:self._size] = self.array
+        self._buffer = buffer
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, index):
+        return self.array[index]
+
+    def __iter__(self) -> Iterator:
+        return iter(self.array)
+
+    def __array__(self, dtype=None) -> numpy.ndarray:
+        return numpy.asarray(self.array, dtype=dtype)
+
+    def __repr__(self) -> str:
+        return 'GrowableArray({!r})'.format(self.array)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {'array': self.array.copy()}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self._buffer = state['array']
+        self._size = len(self._buffer)
+        if not self._size:
+            self._buffer = numpy.empty((1,) + self._buffer.shape[1:])
+
+
+class FunctionValues:
+    """The function values of the points evaluated by a black box.
+
+    The evaluations are stored by column: an array of the function values, an
+    array of the costs of the evaluations with NaN for evaluations without a
+    cost, and, if the points are saved, a two-dimensional array whose rows
+    are the points. For compatibility with code reading the list of tuples
+    this replaces, indexing and iterating give tuples
+    (value, cost or None, point or None).
+    """
+
+    def __init__(self, save_points: bool=False) -> None:
+        """
+        Args:
+            save_points: Whether to save the evaluated points.
+        """
+        self._values = GrowableArray()
+        self._costs = GrowableArray()
+        self._points = None  # type: Optional[GrowableArray]
+        self._save_points = save_points
+
+    @property
+    def values(self) -> numpy.ndarray:
+        """The function values."""
+        return self._values.array
+
+    @property
+    def costs(self) -> numpy.ndarray:
+        """The costs of the evaluations, or NaN for evaluations without a
+        cost."""
+        return self._costs.array
+
+    @property
+    def points(self) -> Optional[numpy.ndarray]:
+        """The evaluated points as the rows of an array, or None if the points
+        are not saved."""
+        if not self._save_points:
+            return None
+        if self._points is None:
+            return numpy.empty((0, 0))
+        return self._points.array
+
+    def append(self,
+               values: Union[Sequence[float], numpy.ndarray],
+               cost: Optional[float],
+               points: Union[Sequence[numpy.ndarray], numpy.ndarray]) -> None:
+        """Records evaluations that have the same cost.
+
+        Args:
+            values: The function values. Objectives such as expectation
+                values may return complex numbers; only their real parts
+                are stored.
+            cost: The cost of each evaluation, or None if it had no cost.
+            points: The evaluated points, one for each function value.
+        """
+        values = numpy.asarray(numpy.real(values), dtype=float)
+        self._values.extend(values)
+        self._costs.extend(numpy.full(len(values),
+                                      numpy.nan if cost is None else cost))
+        if self._save_points:
+            points = numpy.asarray(points, dtype=float)
+            if self._points is None:
+                self._points = GrowableArray(points.shape[1:])
+            self._points.extend(points)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            return [self[i] for i in range(len(self))[index]]
+        index = range(len(self))[index]
+        cost = self._costs[index]
+        return (self._values[index],
+                None if numpy.isnan(cost) else cost,
+                None if self._points is None else self._points[index])
+
+    def __iter__(self) -> Iterator[Tuple[float,
+                                         Optional[float],
+                                         Optional[numpy.ndarray]]]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def __repr__(self) -> str:
+        return 'FunctionValues({!r})'.format(self[:])
+
+    def to_list(self) -> List[Tuple[float,
+                                    Optional[float],
+                                    Optional[numpy.ndarray]]]:
+        """The evaluations as a list of tuples (value, cost, point)."""
+        return list(self)
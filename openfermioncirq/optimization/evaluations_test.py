@@ -0,0 +1,76 @@
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import pickle
+import warnings
+
+import numpy
+
+from openfermioncirq.optimization import FunctionValues, GrowableArray
+
+
+def test_growable_array():
+    array = GrowableArray(capacity=2)
+    for i in range(5):
+        array.append(float(i))
+    array.extend([5.0, 6.0])
+
+    assert len(array) == 7
+    numpy.testing.assert_array_equal(array.array, numpy.arange(7.0))
+    assert array[-1] == 6.0
+    assert list(array) == list(range(7))
+    numpy.testing.assert_array_equal(numpy.asarray(array), array.array)
+
+    unpickled = pickle.loads(pickle.dumps(array))
+    numpy.testing.assert_array_equal(unpickled.array, array.array)
+    unpickled.append(7.0)
+    assert len(unpickled) == 8
+
+    empty = pickle.loads(pickle.dumps(GrowableArray((3,))))
+    empty.append(numpy.ones(3))
+    numpy.testing.assert_array_equal(empty.array, numpy.ones((1, 3)))
+
+
+def test_function_values():
+    function_values = FunctionValues(save_points=True)
+    assert function_values.points.shape == (0, 0)
+    xs = numpy.arange(6.0).reshape(3, 2)
+    function_values.append([0.5, 1.5], None, xs[:2])
+    function_values.append([2.5], 3.0, xs[2:])
+
+    assert len(function_values) == 3
+    numpy.testing.assert_array_equal(function_values.values, [0.5, 1.5, 2.5])
+    numpy.testing.assert_array_equal(function_values.costs,
+                                     [numpy.nan, numpy.nan, 3.0])
+    numpy.testing.assert_array_equal(function_values.points, xs)
+
+    y, z, x = function_values[-1]
+    assert (y, z) == (2.5, 3.0)
+    numpy.testing.assert_array_equal(x, xs[2])
+    assert [z for _, z, _ in function_values] == [None, None, 3.0]
+    assert len(function_values[1:]) == 2
+    assert len(function_values.to_list()) == 3
+
+    function_values = FunctionValues()
+    function_values.append([0.5], 1.0, xs[:1])
+    assert function_values.points is None
+    assert function_values[0] == (0.5, 1.0, None)
+
+
+def test_function_values_complex():
+    function_values = FunctionValues()
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        function_values.append(numpy.array([0.5 + 1e-17j, -1.5 + 0j]), None,
+                               numpy.zeros((2, 1)))
+    assert function_values.values.dtype == float
+    numpy.testing.assert_array_equal(function_values.values, [0.5, -1.5])
@@ -12,11 +12,16 @@
 
 """Classes for storing the results of running an optimization algorithm."""
 
-from typing import Iterable, List, Optional, TYPE_CHECKING, Tuple
+from typing import (
+        Any, Dict, Iterable, List, Optional, TYPE_CHECKING, Tuple, Union)
 
 import numpy
 import pandas
 
+from openfermioncirq.optimization.evaluations import (
+        FunctionValues,
+        GrowableArray)
+
 if TYPE_CHECKING:
     # pylint: disable=unused-import
     from openfermioncirq.optimization.algorithm import OptimizationParams
@@ -34,19 +39,30 @@ class OptimizationResult:
             evaluated in the course of the optimization.
         cost_spent: For objective functions with a cost model, the total cost
             spent on function evaluations.
-        function_values: A list of tuples storing function values of evaluated
-            points. The tuples contain three objects. The first is a function
+        function_values: The function values of evaluated points, either as
+            the FunctionValues of a stateful black box, which is kept without
+            copying, or as a list of tuples. Each tuple, or each item of the
+            FunctionValues, contains three objects. The first is a function
             value, the second is the cost that was used for the evaluation
             (or None if there was no cost), and the third is the point that
             was evaluated (or None if the black box was initialized with
             `save_x_vals` set to False).
-        wait_times: A list of floats. The i-th float float represents the time
-            elapsed between the i-th and (i+1)-th times that the black box
-            was queried. Time is recorded using ``time.time()``.
+        wait_times: A GrowableArray or list of floats. The i-th float
+            represents the time elapsed between the i-th and (i+1)-th times
+            that the black box was queried. Time is recorded using
+            ``time.time()``.
         time: The time, in seconds, it took to obtain the result.
         seed: A random number generator seed used to produce the result.
         status: A status flag set by the optimizer.
         message: A message returned by the optimizer.
+        cache_hits: For black boxes with an evaluation cache, the number of
+            evaluations answered from the cache.
+        cache_misses: For black boxes with an evaluation cache, the number of
+            evaluations that were not found in the cache.
+        stopped_early: Whether the optimizer was stopped before it finished,
+            because a value reached the target, a stopping rule said to
+            stop, or the run was cancelled. The optimal value and parameters
+            are then the best ones evaluated before stopping.
     """
 
     def __init__(self,
@@ -54,14 +70,17 @@ class OptimizationResult:
                  optimal_parameters: numpy.ndarray,
                  num_evaluations: Optional[int]=None,
                  cost_spent: Optional[float]=None,
-                 function_values: Optional[List[Tuple[
+                 function_values: Optional[Union[FunctionValues, List[Tuple[
                      float, Optional[float], Optional[numpy.ndarray]
-                     ]]]=None,
-                 wait_times: Optional[List[float]]=None,
+                     ]]]]=None,
+                 wait_times: Optional[Union[GrowableArray, List[float]]]=None,
                  time: Optional[int]=None,
                  seed: Optional[int]=None,
                  status: Optional[int]=None,
-                 message: Optional[str]=None) -> None:
+                 message: Optional[str]=None,
+                 cache_hits: Optional[int]=None,
+                 cache_misses: Optional[int]=None,
+                 stopped_early: bool=False) -> None:
         self.optimal_value = optimal_value
         self.optimal_parameters = optimal_parameters
         self.num_evaluations = num_evaluations
@@ -72,6 +91,9 @@ class OptimizationResult:
         self.seed = seed
         self.status = status
         self.message = message
+        self.cache_hits = cache_hits
+        self.cache_misses = cache_misses
+        self.stopped_early = stopped_early
 
 
 class OptimizationTrialResult:
@@ -90,11 +112,15 @@ class OptimizationTrialResult:
                 status: A status returned by the optimization algorithm.
                 message: A message returned by the optimization algorithm.
                 time: The time it took for the repetition to complete.
+                stopped_early: Whether the repetition was stopped before the
+                    optimizer finished.
                 average_wait_time: The average time used by the optimizer to
                     decide on the next evaluation point.
         params: An OptimizationParams object storing the optimization
             parameters used to obtain the results.
         repetitions: The number of times the optimization run was repeated.
+        cancelled_repetitions: The number of repetitions that were cancelled
+            before they started, because another run reached the target.
         optimal_value: The optimal value over all repetitions of the run.
         optimal_parameters: The function parameters corresponding to the
             optimal value.
@@ -103,43 +129,107 @@ class OptimizationTrialResult:
     def __init__(self,
                  results: Iterable[OptimizationResult],
                  params: 'OptimizationParams') -> None:
-        self.results = list(results)
+        self.results = []  # type: List[OptimizationResult]
         self.params = params
-        self.data_frame = pandas.DataFrame(
-                {'optimal_value': result.optimal_value,
-                 'optimal_parameters': result.optimal_parameters,
-                 'num_evaluations': result.num_evaluations,
-                 'cost_spent': result.cost_spent,
-                 'time': result.time,
-                 'seed': result.seed,
-                 'status': result.status,
-                 'message': result.message}
-                for result in results)
+        self._columns = {name: [] for name in _COLUMNS} \
+            # type: Dict[str, List[Any]]
+        self._data_frame = None  # type: Optional[pandas.DataFrame]
+        self._optimal_index = None  # type: Optional[int]
+        self.cancelled_repetitions = 0
+        self.extend(results)
+
+    @property
+    def data_frame(self) -> pandas.DataFrame:
+        """The results as a DataFrame, built when first read after the
+        results change."""
+        if self._data_frame is None:
+            self._data_frame = pandas.DataFrame(
+                    {name: list(column)
+                     for name, column in self._columns.items()},
+                    columns=list(_COLUMNS))
+        return self._data_frame
 
     @property
     def repetitions(self) -> int:
-        return len(self.data_frame)
+        return len(self.results)
+
+    @property
+    def estimated_cost_saved(self) -> float:
+        """An estimate of the cost saved by the cancelled repetitions.
+
+        This is the number of cancelled repetitions times the mean cost spent
+        by the repetitions that were not stopped early, or NaN if there are
+        no such repetitions with a known cost. It does not include the cost
+        saved by stopping repetitions early.
+        """
+        if not self.cancelled_repetitions:
+            return 0.0
+        costs = [cost for cost, stopped_early in zip(
+                     self._columns['cost_spent'],
+                     self._columns['stopped_early'])
+                 if cost is not None and not stopped_early]
+        if not costs:
+            return numpy.nan
+        return self.cancelled_repetitions * float(numpy.mean(costs))
 
     @property
     def optimal_value(self) -> float:
-        return self.data_frame['optimal_value'].min()
+        if self._optimal_index is None:
+            return numpy.nan
+        return self.results[self._optimal_index].optimal_value
 
     @property
     def optimal_parameters(self) -> numpy.ndarray:
-        return self.data_frame['optimal_parameters'][
-                self.data_frame['optimal_value'].idxmin()]
+        if self._optimal_index is None:
+            raise ValueError('There are no results with an optimal value.')
+        return self.results[self._optimal_index].optimal_parameters
 
     def extend(self,
                results: Iterable[OptimizationResult]) -> None:
-        new_data_frame = pandas.DataFrame(
-                {'optimal_value': result.optimal_value,
-                 'optimal_parameters': result.optimal_parameters,
-                 'num_evaluations': result.num_evaluations,
-                 'cost_spent': result.cost_spent,
-                 'time': result.time,
-                 'seed': result.seed,
-                 'status': result.status,
-                 'message': result.message}
-                for result in results)
-        self.data_frame = pandas.concat([self.data_frame, new_data_frame])
-        self.results.extend(results)
+        """Appends the results of more repetitions.
+
+        This takes constant time per result: the columns of the data frame
+        are appended to, and the data frame is rebuilt from them only when
+        it is next read.
+        """
+        for result in results:
+            value = result.optimal_value
+            # Like pandas, ignore missing optimal values
+            if value is not None and not numpy.isnan(value) and (
+                    self._optimal_index is None or value < self.optimal_value):
+                self._optimal_index = len(self.results)
+            self.results.append(result)
+            for name in _COLUMNS:
+                # Results pickled before an attribute was added lack it
+                self._columns[name].append(getattr(result, name, None))
+        self._data_frame = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        state['_data_frame'] = None
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        if '_columns' not in state:
+            # Trial results pickled before the data frame was built lazily
+            self.__init__(state['results'], state['params'])  # type: ignore
+            return
+        self.__dict__.update(state)
+        self.__dict__.setdefault('cancelled_repetitions', 0)
+        for name in _COLUMNS:
+            if name not in self._columns:
+                self._columns[name] = [getattr(result, name, None)
+                                       for result in self.results]
+
+
+# The columns of the data frame of an OptimizationTrialResult, which are
+# attributes of OptimizationResult
+_COLUMNS = ('optimal_value',
+            'optimal_parameters',
+            'num_evaluations',
+            'cost_spent',
+            'time',
+            'seed',
+            'status',
+            'message',
+            'stopped_early')
@@ -10,6 +10,8 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+import pickle
+
 import numpy
 
 from openfermioncirq.optimization import (
@@ -103,10 +105,25 @@ def test_optimization_trial_result_extend():
     assert len(trial.results) == 1
     assert trial.repetitions == 1
 
+    data_frame = trial.data_frame
+    assert trial.data_frame is data_frame
+    assert trial.optimal_value == 4.7
+
     trial.extend([result2])
 
     assert len(trial.results) == 2
     assert trial.repetitions == 2
+    assert trial.optimal_value == 3.7
+    numpy.testing.assert_allclose(trial.optimal_parameters,
+                                  numpy.array([1.2, 3.1]))
+    assert trial.data_frame is not data_frame
+    assert list(trial.data_frame['seed']) == [63, 21]
+    assert list(trial.data_frame.index) == [0, 1]
+
+    unpickled = pickle.loads(pickle.dumps(trial))
+    assert unpickled.repetitions == 2
+    assert unpickled.optimal_value == 3.7
+    assert list(unpickled.data_frame['seed']) == [63, 21]
 
 
 def test_optimization_trial_result_data_methods():
@@ -136,3 +153,27 @@ def test_optimization_trial_result_data_methods():
     assert trial.optimal_value == 4.7
     numpy.testing.assert_allclose(trial.optimal_parameters,
                                   numpy.array([1.7, 2.1]))
+
+
+def test_optimization_trial_result_estimated_cost_saved():
+    finished = [OptimizationResult(optimal_value=1.0,
+                                   optimal_parameters=numpy.zeros(2),
+                                   cost_spent=cost)
+                for cost in (2.0, 4.0)]
+    stopped = OptimizationResult(optimal_value=0.5,
+                                 optimal_parameters=numpy.zeros(2),
+                                 cost_spent=1.0,
+                                 stopped_early=True)
+    trial = OptimizationTrialResult(
+            finished + [stopped],
+            params=OptimizationParams(ExampleAlgorithm()))
+    assert trial.estimated_cost_saved == 0.0
+    assert list(trial.data_frame['stopped_early']) == [False, False, True]
+
+    trial.cancelled_repetitions = 2
+    assert trial.estimated_cost_saved == 6.0
+
+    trial = OptimizationTrialResult(
+            [stopped], params=OptimizationParams(ExampleAlgorithm()))
+    trial.cancelled_repetitions = 1
+    assert numpy.isnan(trial.estimated_cost_saved)
@@ -28,19 +28,28 @@ class ScipyOptimizationAlgorithm(OptimizationAlgorithm):
     def __init__(self,
                  options: Optional[Dict]=None,
                  kwargs: Optional[Dict]=None,
-                 uses_bounds: bool=True) -> None:
+                 uses_bounds: bool=True,
+                 uses_gradient: bool=True) -> None:
         """
         Args:
             options: The `options` dictionary passed to scipy.optimize.minimize.
             kwargs: Other keyword arguments passed to scipy.optimize.minimize.
                 This should NOT include the `bounds` or `options` keyword
-                arguments.
+                arguments. If it includes `jac`, the black box's gradient
+                is not used.
             uses_bounds: Whether the algorithm uses bounds on the input
                 variables. Set this to False to prevent scipy.optimize.minimize
                 from raising a warning if the chosen method does not use bounds.
+            uses_gradient: Whether the algorithm uses the gradient of the
+                objective function. If True and the black box can compute
+                gradients, its `gradient` method is passed to
+                scipy.optimize.minimize as `jac`. Set this to False to prevent
+                scipy.optimize.minimize from raising a warning if the chosen
+                method does not use gradients.
         """
         self.kwargs = kwargs or {}
         self.uses_bounds = uses_bounds
+        self.uses_gradient = uses_gradient
         super().__init__(options)
 
     def optimize(self,
@@ -52,11 +61,15 @@ class ScipyOptimizationAlgorithm(OptimizationAlgorithm):
             raise ValueError('The chosen optimization algorithm requires an '
                              'initial guess.')
         bounds = black_box.bounds if self.uses_bounds else None
+        kwargs = self.kwargs
+        if (self.uses_gradient and black_box.has_gradient
+                and 'jac' not in kwargs):
+            kwargs = dict(kwargs, jac=black_box.gradient)
         result = scipy.optimize.minimize(black_box.evaluate,
                                          initial_guess,
                                          bounds=bounds,
                                          options=self.options,
-                                         **self.kwargs)
+                                         **kwargs)
         return OptimizationResult(optimal_value=result.fun,
                                   optimal_parameters=result.x,
                                   num_evaluations=result.nfev,
@@ -70,14 +83,16 @@ class ScipyOptimizationAlgorithm(OptimizationAlgorithm):
 
 COBYLA = ScipyOptimizationAlgorithm(
         kwargs={'method': 'COBYLA'},
-        uses_bounds=False)
+        uses_bounds=False,
+        uses_gradient=False)
 
 L_BFGS_B = ScipyOptimizationAlgorithm(
         kwargs={'method': 'L-BFGS-B'})
 
 NELDER_MEAD = ScipyOptimizationAlgorithm(
         kwargs={'method': 'Nelder-Mead'},
-        uses_bounds=False)
+        uses_bounds=False,
+        uses_gradient=False)
 
 SLSQP = ScipyOptimizationAlgorithm(
         kwargs={'method': 'SLSQP'})
@@ -35,6 +35,39 @@ def test_scipy_algorithm(algorithm):
     assert isinstance(result.message, (str, bytes))
 
 
+class GradientBlackBox(ExampleBlackBox):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.num_gradients = 0
+
+    @property
+    def has_gradient(self):
+        return True
+
+    def _gradient(self, x):
+        self.num_gradients += 1
+        return 2 * x
+
+
+@pytest.mark.parametrize('algorithm, uses_gradient', [
+    (COBYLA, False), (L_BFGS_B, True), (NELDER_MEAD, False), (SLSQP, True)])
+def test_scipy_algorithm_uses_gradient(algorithm, uses_gradient):
+    black_box = GradientBlackBox()
+    initial_guess = numpy.array([1.0, -0.5])
+    result = algorithm.optimize(black_box, initial_guess)
+
+    assert (black_box.num_gradients > 0) == uses_gradient
+    numpy.testing.assert_allclose(result.optimal_parameters, 0, atol=1e-3)
+
+
+def test_scipy_algorithm_explicit_jac_overrides_gradient():
+    black_box = GradientBlackBox()
+    algorithm = ScipyOptimizationAlgorithm(
+            kwargs={'method': 'L-BFGS-B', 'jac': False})
+    _ = algorithm.optimize(black_box, numpy.array([1.0, -0.5]))
+    assert black_box.num_gradients == 0
+
+
 def test_scipy_algorithm_requires_initial_guess():
     black_box = ExampleBlackBox()
     with pytest.raises(ValueError):
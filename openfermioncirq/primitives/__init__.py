@@ -12,7 +12,10 @@
 
 """Building blocks of algorithms for quantum simulation."""
 
-from openfermioncirq.primitives.bogoliubov_transform import bogoliubov_transform
+from openfermioncirq.primitives.bogoliubov_transform import (
+    GivensDecompositionCache,
+    bogoliubov_transform,
+    givens_decomposition_cache)
 
 from openfermioncirq.primitives.ffft import ffft
 
@@ -13,7 +13,13 @@
 """The Bogoliubov transformation."""
 
 from typing import (
-        Iterable, List, Optional, Sequence, Tuple, Union, cast)
+        Any, Callable, Iterable, List, Optional, Sequence, Tuple, Union, cast)
+
+import collections
+import hashlib
+import os
+import pickle
+import tempfile
 
 import numpy
 
@@ -133,6 +139,126 @@ def bogoliubov_transform(
                                      initially_occupied_orbitals)
 
 
+class GivensDecompositionCache:
+    """A bounded cache of the Givens decompositions of bogoliubov_transform.
+
+    Trotter steps apply the same basis changes over and over, and each call
+    to `bogoliubov_transform` would otherwise decompose the transformation
+    matrix again. The decompositions are keyed on a digest of the matrix
+    rounded to `decimals` decimal places, which also covers the initially
+    occupied orbitals since only their rows of the matrix are decomposed.
+    The least recently used decompositions are evicted once there are more
+    than `max_size` of them.
+
+    If `directory` is set, decompositions are also pickled to files in it,
+    so that they can be reused by later runs. Only point it at a directory
+    you trust, since its files are unpickled.
+
+    Attributes:
+        max_size: The number of decompositions kept in memory.
+        directory: An optional directory holding decompositions on disk.
+        decimals: The number of decimal places the matrices are rounded to.
+        hits: The number of decompositions found in memory or on disk.
+        misses: The number of decompositions that were computed.
+    """
+
+    def __init__(self,
+                 max_size: int=128,
+                 directory: Optional[str]=None,
+                 decimals: int=12) -> None:
+        self.max_size = max_size
+        self.directory = directory
+        self.decimals = decimals
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict(
+                )  # type: collections.OrderedDict[str, Any]
+
+    @property
+    def hit_rate(self) -> float:
+        """The fraction of lookups that did not compute a decomposition."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        """Empties the in-memory cache and resets the statistics.
+
+        Files in the directory are left in place.
+        """
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def decompose(self,
+                  decomposition: Callable[[numpy.ndarray], Any],
+                  matrix: numpy.ndarray) -> Any:
+        """Returns decomposition(matrix), computing it only on a miss.
+
+        The returned value is shared between calls and must not be mutated.
+        """
+        key = self._key(decomposition.__name__, matrix)
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+        value = self._load(key)
+        if value is None:
+            self.misses += 1
+            value = decomposition(matrix)
+            self._save(key, value)
+        else:
+            self.hits += 1
+
+        self._entries[key] = value
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return value
+
+    def _key(self, name: str, matrix: numpy.ndarray) -> str:
+        # Adding zero turns negative zeros into zeros
+        rounded = numpy.round(matrix, self.decimals) + 0.0
+        digest = hashlib.sha256()
+        digest.update('{}:{}:{}:'.format(
+            name, rounded.dtype.str, rounded.shape).encode())
+        digest.update(numpy.ascontiguousarray(rounded).tobytes())
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(cast(str, self.directory), key + '.pickle')
+
+    def _load(self, key: str) -> Any:
+        if self.directory is None:
+            return None
+        try:
+            with open(self._path(key), 'rb') as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def _save(self, key: str, value: Any) -> None:
+        if self.directory is None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        # Write to a temporary file first so that concurrent runs never read
+        # a partially written file
+        handle, temporary_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(handle, 'wb') as f:
+            pickle.dump(value, f)
+        os.replace(temporary_path, self._path(key))
+
+
+givens_decomposition_cache = GivensDecompositionCache(max_size=128)
+"""The cache of the decompositions computed by `bogoliubov_transform`.
+
+It keeps the 128 most recently used decompositions in memory; call
+`givens_decomposition_cache.clear()` to release them.
+"""
+
+
 def _is_spin_block_diagonal(matrix) -> bool:
     n = matrix.shape[0]
     if n % 2:
@@ -157,8 +283,8 @@ def _slater_basis_change(qubits: Sequence[cirq.Qid],
     n_qubits = len(qubits)
 
     if initially_occupied_orbitals is None:
-        decomposition, diagonal = givens_decomposition_square(
-                transformation_matrix)
+        decomposition, diagonal = givens_decomposition_cache.decompose(
+                givens_decomposition_square, transformation_matrix)
         circuit_description = list(reversed(decomposition))
         # The initial state is not a computational basis state so the
         # phases left on the diagonal in the decomposition matter
@@ -174,8 +300,8 @@ def _slater_basis_change(qubits: Sequence[cirq.Qid],
         initially_occupied_orbitals_set = set(initially_occupied_orbitals)
         yield (cirq.X(qubits[j]) for j in range(n_qubits)
                if (j < n_occupied) != (j in initially_occupied_orbitals_set))
-        circuit_description = slater_determinant_preparation_circuit(
-                transformation_matrix)
+        circuit_description = givens_decomposition_cache.decompose(
+                slater_determinant_preparation_circuit, transformation_matrix)
 
     yield _ops_from_givens_rotations_circuit_description(
             qubits, circuit_description)
@@ -196,7 +322,8 @@ def _gaussian_basis_change(qubits: Sequence[cirq.Qid],
             [numpy.conjugate(right_block), numpy.conjugate(left_block)])
 
     decomposition, left_decomposition, _, left_diagonal = (
-        fermionic_gaussian_decomposition(transformation_matrix))
+        givens_decomposition_cache.decompose(
+            fermionic_gaussian_decomposition, transformation_matrix))
 
     if (initially_occupied_orbitals is not None and
             len(initially_occupied_orbitals) == 0):
@@ -21,8 +21,12 @@ import openfermion
 from openfermion import get_sparse_operator
 from openfermion.utils import (
         random_quadratic_hamiltonian, random_unitary_matrix)
+from openfermion.ops._givens_rotations import givens_decomposition_square
 
 from openfermioncirq import bogoliubov_transform
+from openfermioncirq.primitives import (
+        GivensDecompositionCache,
+        givens_decomposition_cache)
 
 
 def fourier_transform_matrix(n_modes):
@@ -258,3 +262,40 @@ def test_bogoliubov_transform_bad_shape_raises_error():
     with pytest.raises(ValueError):
         _ = next(bogoliubov_transform(cirq.LineQubit.range(4),
                                       numpy.zeros((4, 7))))
+
+
+def test_givens_decomposition_cache(tmpdir):
+    qubits = cirq.LineQubit.range(4)
+    u = random_unitary_matrix(4, seed=51722)
+    expected = cirq.Circuit.from_ops(bogoliubov_transform(qubits, u))
+
+    cache = GivensDecompositionCache(
+            max_size=1, directory=str(tmpdir), decimals=6)
+    calls = []
+
+    def decomposition(matrix):
+        calls.append(matrix)
+        return givens_decomposition_square(matrix)
+
+    first = cache.decompose(decomposition, u)
+    # Differences beyond the rounding tolerance share the decomposition
+    assert cache.decompose(decomposition, u + 1e-12) is first
+    assert len(calls) == 1
+    assert (cache.hits, cache.misses, cache.hit_rate) == (1, 1, 0.5)
+
+    _ = cache.decompose(decomposition, u.T)
+    assert len(cache) == 1
+    assert len(calls) == 2
+
+    # The evicted decomposition is read back from the directory
+    cache.clear()
+    numpy.testing.assert_allclose(cache.decompose(decomposition, u)[1],
+                                  first[1])
+    assert len(calls) == 2
+    assert (cache.hits, cache.misses) == (1, 0)
+
+    assert cirq.Circuit.from_ops(bogoliubov_transform(qubits, u)) == expected
+    assert givens_decomposition_cache.hits > 0
+    assert 0 < len(givens_decomposition_cache) <= 128
+    givens_decomposition_cache.clear()
+    assert len(givens_decomposition_cache) == 0
@@ -0,0 +1,21 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Fast classical simulation of the circuits produced by this library."""
+
+from openfermioncirq.simulation.compiled_circuit import CompiledCircuit
+
+from openfermioncirq.simulation.gaussian_circuit import GaussianCircuit
+
+from openfermioncirq.simulation.number_sector import NumberSector
+
+from openfermioncirq.simulation.pauli_mask_operator import PauliMaskOperator
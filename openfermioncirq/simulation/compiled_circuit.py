@@ -0,0 +1,1162 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Circuits compiled into flat programs of matrix kernels."""
+
+from typing import (
+        Callable, Dict, List, Optional, Sequence, Tuple, TYPE_CHECKING, Union,
+        cast)
+
+import numpy
+import sympy
+
+import cirq
+
+from openfermioncirq.gates import FSWAP
+from openfermioncirq.simulation.number_sector import NumberSector
+
+if TYPE_CHECKING:
+    # pylint: disable=unused-import
+    from typing import Set
+
+
+class CompiledCircuit:
+    """A circuit compiled into a flat program of matrix kernels.
+
+    Compiling a circuit turns each of its operations into a kernel acting on
+    a state vector stored as a tensor with one axis per qubit. Operations
+    without parameters are converted to matrices once, at compile time.
+    Operations whose gate is a `cirq.EigenGate` with an exponent that is a
+    linear function of a single symbol keep their eigendecomposition, and the
+    symbol is bound to a slot of the parameter vector passed to `final_state`.
+    Evaluating the circuit for new parameters therefore creates no cirq
+    objects and resolves no symbols.
+
+    If the number of particles is specified, the circuit must conserve the
+    number of qubits in the state 1, as do the gates of the ansatzes in this
+    library, and the program is compiled to act on the binomial(n, k)
+    dimensional subspace of states with k particles. State vectors then have
+    one amplitude for each of the computational basis states in
+    `sector_indices`, and each kernel acts on them through index tables
+    precomputed for its qubits.
+
+    By default, the kernels are then fused: each maximal run of kernels that
+    only act on the same one or two qubits, such as the XXYYPowGate, CZPowGate
+    and FSWAP applied to each pair of qubits by a fermionic swap network, is
+    applied in a single pass over the state by multiplying the 2x2 or 4x4
+    matrices of the run together. Kernels in a run need not be adjacent in
+    the circuit, as long as no kernel in between acts on their qubits.
+    Diagonal passes, such as the Rz, CZPowGate and rot111 gates of low rank
+    and split operator Trotter steps, are then merged into layers: since they
+    commute with each other, each layer multiplies the state by a single
+    phase vector over the basis states, rebuilt from the parameter vector by
+    a matrix product when the layer is parameterized.
+
+    Optionally, SWAP and FSWAP gates, which make up about half of the gates
+    of a swap network, are not simulated. Each of them exchanges the axes of
+    the state that hold its two qubits, and later operations act on the
+    relabeled axes. Since FSWAP is a SWAP after a CZ, it leaves a CZ kernel
+    behind. The amplitudes are moved back to the axes of the qubit order by
+    a single permutation at the end, so the final states are exactly those
+    of the circuit.
+
+    Attributes:
+        qubits: The qubits of the circuit, in the order used to index the
+            state vector.
+        params: The symbols bound to the entries of parameter vectors.
+        n_particles: The number of particles of the states the program acts
+            on, or None if it acts on the whole state space.
+        sector_indices: If `n_particles` is specified, the sorted indices of
+            the computational basis states with that number of particles,
+            which index the amplitudes of the state vectors of the program.
+            Otherwise, None.
+    """
+
+    def __init__(self,
+                 circuit: cirq.Circuit,
+                 qubit_order: cirq.QubitOrderOrList=cirq.QubitOrder.DEFAULT,
+                 params: Sequence[sympy.Symbol]=(),
+                 scale_factors: Optional[Sequence[float]]=None,
+                 n_particles: Optional[int]=None,
+                 fuse: bool=True,
+                 relabel_swaps: bool=False) -> None:
+        """
+        Args:
+            circuit: The circuit to compile. Terminal measurements are
+                ignored.
+            qubit_order: Determines how qubits are ordered in the state vector.
+            params: The symbols of the circuit, in the order in which their
+                values appear in parameter vectors.
+            scale_factors: Factors by which the entries of a parameter vector
+                are multiplied before being substituted for the corresponding
+                symbols. Defaults to all ones.
+            n_particles: If specified, the program acts on the states with
+                this number of qubits in the state 1.
+            fuse: Whether to fuse runs of kernels acting on the same one or
+                two qubits, and layers of diagonal kernels, into single passes
+                over the state.
+            relabel_swaps: Whether to replace SWAP and FSWAP gates by a
+                relabeling of the axes of the state.
+
+        Raises:
+            ValueError: The circuit contains a non-terminal measurement, or a
+                symbol that is not one of `params`, or `n_particles` is
+                specified and the circuit contains an operation that does not
+                conserve the number of particles.
+            TypeError: The circuit contains an operation without a unitary
+                matrix.
+        """
+        if not circuit.are_all_measurements_terminal():
+            raise ValueError('Circuit contains a non-terminal measurement.')
+
+        self.qubits = tuple(
+                cirq.QubitOrder.as_qubit_order(qubit_order).order_for(
+                    circuit.all_qubits()))
+        self.params = tuple(params)
+
+        if scale_factors is None:
+            scale_factors = [1.0] * len(self.params)
+        self._scale_factors = numpy.array(scale_factors, dtype=float)
+        self._slots = {str(param): i for i, param in enumerate(self.params)}
+
+        self.n_particles = n_particles
+        self._sector = None  # type: Optional[NumberSector]
+        self.sector_indices = None  # type: Optional[numpy.ndarray]
+        if n_particles is not None:
+            self._sector = NumberSector(len(self.qubits), n_particles)
+            self.sector_indices = self._sector.basis
+
+        axis_of = {qubit: i for i, qubit in enumerate(self.qubits)}
+        self._kernels = []  # type: List[_Kernel]
+        for op in circuit.all_operations():
+            if cirq.is_measurement(op) or not op.qubits:
+                continue
+            axes = tuple(axis_of[qubit] for qubit in op.qubits)
+            if relabel_swaps and op.gate in (cirq.SWAP, FSWAP):
+                if op.gate == FSWAP:
+                    self._kernels.append(
+                            self._compile_operation(cirq.CZ(*op.qubits),
+                                                    axes))
+                p, q = op.qubits
+                axis_of[p], axis_of[q] = axis_of[q], axis_of[p]
+                continue
+            self._kernels.append(self._compile_operation(op, axes))
+
+        # The axis holding each qubit at the end of the program, and for a
+        # number sector, the positions of the amplitudes of the basis states
+        # in that layout
+        self._axis_permutation = None  # type: Optional[Tuple[int, ...]]
+        self._sector_permutation = None  # type: Optional[numpy.ndarray]
+        axis_permutation = tuple(axis_of[qubit] for qubit in self.qubits)
+        if axis_permutation != tuple(range(self.num_qubits)):
+            self._axis_permutation = axis_permutation
+            if self._sector is not None:
+                self._sector_permutation = self._relabeled_positions(
+                        axis_permutation)
+
+        # The kernels run by final_states, each with the index of its
+        # unfused kernel or None if it was fused
+        self._passes = (
+                self._layer_diagonal_passes(self._fuse_kernels()) if fuse
+                else list(enumerate(self._kernels))
+        )  # type: List[Tuple[Optional[int], _Kernel]]
+
+        self._buffers = None  # type: Optional[Tuple[numpy.ndarray, ...]]
+
+    @property
+    def num_qubits(self) -> int:
+        return len(self.qubits)
+
+    @property
+    def dimension(self) -> int:
+        """The number of amplitudes of the state vectors of the program."""
+        if self._sector is not None:
+            return len(self._sector.basis)
+        return 1 << self.num_qubits
+
+    @property
+    def num_kernels(self) -> int:
+        """The number of kernels, one for each operation of the circuit
+        other than the relabeled SWAP gates."""
+        return len(self._kernels)
+
+    @property
+    def num_passes(self) -> int:
+        """The number of passes over the state made by one evaluation, which
+        is less than the number of kernels if some of them were fused."""
+        return len(self._passes)
+
+    def final_state(self,
+                    param_values: Sequence[float]=(),
+                    initial_state: Union[int, numpy.ndarray]=0,
+                    copy: bool=True) -> numpy.ndarray:
+        """Runs the program and returns the final state vector.
+
+        Args:
+            param_values: The values of the parameters, in the order of
+                `params`.
+            initial_state: The initial state, either as the integer index of a
+                computational basis state or as a state vector.
+            copy: Whether to return a new array. If False, the returned array
+                is a buffer owned by this object that is overwritten the next
+                time the program is run.
+
+        Returns:
+            The final state vector as a flat array of length `dimension`.
+        """
+        param_values = numpy.asarray(param_values, dtype=float)
+        return self.final_states(param_values[numpy.newaxis],
+                                 initial_state,
+                                 copy)[0]
+
+    def final_states(self,
+                     param_values: numpy.ndarray,
+                     initial_state: Union[int, numpy.ndarray]=0,
+                     copy: bool=True,
+                     exponent_shifts: Optional[numpy.ndarray]=None
+                     ) -> numpy.ndarray:
+        """Runs the program on a batch of parameter vectors.
+
+        All of the parameter vectors are simulated together, as a single array
+        holding one state vector per parameter vector.
+
+        Args:
+            param_values: A two-dimensional array whose rows are the values of
+                the parameters, in the order of `params`.
+            initial_state: The initial state, either as the integer index of a
+                computational basis state or as a state vector. A
+                two-dimensional array gives a different initial state vector
+                for each row of `param_values`.
+            copy: Whether to return a new array. If False, the returned array
+                is a buffer owned by this object that is overwritten the next
+                time the program is run.
+            exponent_shifts: An optional array of shape
+                (batch size, num_kernels) whose entries are added to the
+                exponents of the individual kernels, for each row of
+                `param_values`. Only kernels of eigengates whose exponents are
+                bound to a parameter are shifted; other entries are ignored.
+
+        Returns:
+            An array of shape (batch size, dimension) whose rows are the
+            final state vectors.
+        """
+        param_values = numpy.asarray(param_values, dtype=float)
+        if (param_values.ndim != 2 or
+                param_values.shape[1] != len(self.params)):
+            raise ValueError(
+                    'Expected rows of {} parameter values but got an array of '
+                    'shape {}.'.format(len(self.params), param_values.shape))
+
+        if exponent_shifts is not None:
+            exponent_shifts = numpy.asarray(exponent_shifts, dtype=float)
+            if exponent_shifts.shape != (len(param_values), self.num_kernels):
+                raise ValueError(
+                        'Expected exponent shifts of shape {} but got an '
+                        'array of shape {}.'.format(
+                            (len(param_values), self.num_kernels),
+                            exponent_shifts.shape))
+
+        state, buffer = self._load_state(initial_state, len(param_values))
+        for i, kernel in self._passes:
+            if exponent_shifts is not None and isinstance(
+                    kernel, (_FusedKernel, _DiagonalLayerKernel)):
+                result = kernel.apply(state, buffer, param_values,
+                                      exponent_shifts)
+            elif exponent_shifts is not None and isinstance(kernel,
+                                                            _EigenKernel):
+                result = kernel.apply(state, buffer, param_values,
+                                      exponent_shifts[:, i])
+            else:
+                result = kernel.apply(state, buffer, param_values)
+            if result is buffer:
+                state, buffer = buffer, state
+        if self._axis_permutation is not None:
+            state = self._permute_axes(state, buffer)
+
+        final_states = state.reshape(len(param_values), self.dimension)
+        return final_states.copy() if copy else final_states
+
+    def expectation_gradient(self,
+                             param_values: Sequence[float],
+                             observable: Callable[[numpy.ndarray],
+                                                  numpy.ndarray],
+                             initial_state: Union[int, numpy.ndarray]=0
+                             ) -> Tuple[float, numpy.ndarray]:
+        """Computes an expectation value and its gradient.
+
+        The gradient is computed with adjoint (reverse-mode) differentiation:
+        after the final state is computed, it is uncomputed kernel by kernel
+        alongside the observable applied to the final state, and each
+        parameterized kernel contributes its derivative along the way. The
+        cost is about three runs of the program regardless of the number of
+        parameters. The uncomputation does not use fused kernels, since it
+        needs the state between the kernels of a run.
+
+        Args:
+            param_values: The values of the parameters, in the order of
+                `params`.
+            observable: A function that multiplies a flat state vector by a
+                Hermitian operator.
+            initial_state: The initial state, either as the integer index of a
+                computational basis state or as a state vector.
+
+        Returns:
+            A tuple whose first element is the expectation value of the
+            operator in the final state and whose second element is the
+            gradient of the expectation value with respect to the parameters.
+
+        Raises:
+            TypeError: The program has a parameterized kernel without an
+                analytic derivative, i.e. an operation whose gate is not an
+                eigengate with an exponent linear in one parameter.
+        """
+        if any(isinstance(kernel, _ResolvedKernel)
+               for kernel in self._kernels):
+            raise TypeError('Adjoint differentiation requires every '
+                            'parameterized gate to be an eigengate with an '
+                            'exponent linear in one parameter.')
+        param_values = numpy.asarray(param_values, dtype=float)[numpy.newaxis]
+        state = self.final_states(param_values, initial_state)
+        shape = self._state_shape(len(state))
+
+        # The adjoint state is the observable applied to the final state,
+        # uncomputed together with the state
+        adjoint = observable(state[0]).reshape(shape)
+        value = numpy.vdot(state, adjoint).real
+        state = state.reshape(shape)
+        state_buffer = numpy.empty_like(state)
+        adjoint_buffer = numpy.empty_like(state)
+        derivative = numpy.empty_like(state)
+        if self._axis_permutation is not None:
+            state, state_buffer = (
+                    self._permute_axes(state, state_buffer, inverse=True),
+                    state)
+            adjoint, adjoint_buffer = (
+                    self._permute_axes(adjoint, adjoint_buffer, inverse=True),
+                    adjoint)
+
+        gradient = numpy.zeros(len(self.params))
+        for kernel in reversed(self._kernels):
+            result = kernel.apply_adjoint(state, state_buffer, param_values)
+            if result is state_buffer:
+                state, state_buffer = state_buffer, state
+            if isinstance(kernel, _EigenKernel):
+                kernel.apply_derivative(state, derivative, param_values)
+                gradient[kernel.slot] += 2 * kernel.coefficient * numpy.vdot(
+                        adjoint, derivative).real
+            result = kernel.apply_adjoint(adjoint, adjoint_buffer,
+                                          param_values)
+            if result is adjoint_buffer:
+                adjoint, adjoint_buffer = adjoint_buffer, adjoint
+
+        return value, gradient
+
+    def parameter_shift_rule(self) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """Returns the shifted programs whose values give exact gradients.
+
+        The phases of a kernel of an eigengate are exp(i pi t h_k), where t is
+        the exponent and h_k are the half turns of the eigenvalues, so the
+        expectation value of an observable in the final state is a
+        trigonometric polynomial of t whose frequencies are the gaps
+        pi |h_k - h_l|. When the gaps are multiples m * d of a base gap d with
+        m <= R, the derivative with respect to t is the combination
+
+            pi d sum_{mu=1}^{2R} (-1)^(mu - 1) f(t + x_mu / (pi d)) /
+                (4 R sin(x_mu / 2)^2),   x_mu = (2 mu - 1) pi / (2 R),
+
+        of 2R values at shifted exponents. For gates with eigenvalues
+        {0, 1}, such as CZPowGate and ZPowGate, this is the familiar two-term
+        rule; XXYYPowGate has the gaps {1/2, 1} and takes four terms. The
+        derivative with respect to a parameter sums the rule over every
+        kernel bound to it, by the product rule.
+
+        Returns:
+            A tuple (exponent_shifts, weights). Each row of exponent_shifts is
+            an argument to `final_states` that shifts the exponent of one
+            kernel. If values is the array of objective values of the
+            corresponding final states at a given point, the gradient at that
+            point is values.dot(weights).
+
+        Raises:
+            TypeError: The program has a parameterized kernel without a
+                parameter-shift rule, i.e. an operation whose gate is not an
+                eigengate with an exponent linear in one parameter, or an
+                eigengate whose eigenvalue gaps are not multiples of a common
+                gap.
+        """
+        shift_rows = []  # type: List[numpy.ndarray]
+        weight_rows = []  # type: List[numpy.ndarray]
+        for i, kernel in enumerate(self._kernels):
+            if isinstance(kernel, _ResolvedKernel):
+                raise TypeError('Parameter-shift gradients require every '
+                                'parameterized gate to be an eigengate with '
+                                'an exponent linear in one parameter.')
+            if not isinstance(kernel, _EigenKernel):
+                continue
+            for shift, weight in kernel.shift_rule():
+                shift_row = numpy.zeros(self.num_kernels)
+                shift_row[i] = shift
+                weight_row = numpy.zeros(len(self.params))
+                weight_row[kernel.slot] = kernel.coefficient * weight
+                shift_rows.append(shift_row)
+                weight_rows.append(weight_row)
+        return (numpy.array(shift_rows).reshape(-1, self.num_kernels),
+                numpy.array(weight_rows).reshape(-1, len(self.params)))
+
+    def _state_shape(self, batch_size: int) -> Tuple[int, ...]:
+        if self._sector is not None:
+            return (batch_size, self.dimension)
+        return (batch_size,) + (2,) * self.num_qubits
+
+    def _load_state(self,
+                    initial_state: Union[int, numpy.ndarray],
+                    batch_size: int
+                    ) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        n_qubits = self.num_qubits
+        shape = self._state_shape(batch_size)
+        if self._buffers is None or self._buffers[0].shape != shape:
+            self._buffers = (numpy.zeros(shape, dtype=numpy.complex128),
+                             numpy.zeros(shape, dtype=numpy.complex128))
+        state, buffer = self._buffers
+        flat_state = state.reshape(batch_size, self.dimension)
+
+        if isinstance(initial_state, (int, numpy.integer)):
+            if not 0 <= initial_state < 1 << n_qubits:
+                raise ValueError(
+                        'Initial state index {} out of range for {} '
+                        'qubits.'.format(initial_state, n_qubits))
+            if self._sector is not None:
+                initial_state = self._sector.position(initial_state)
+            state.fill(0)
+            flat_state[:, initial_state] = 1
+        else:
+            initial_state = numpy.asarray(initial_state)
+            if initial_state.shape[-1] != self.dimension:
+                raise ValueError(
+                        'Initial state has {} amplitudes but the program '
+                        'acts on states with {}.'.format(
+                            initial_state.shape[-1], self.dimension))
+            flat_state[:] = initial_state
+
+        return state, buffer
+
+    def _permute_axes(self,
+                      state: numpy.ndarray,
+                      out: numpy.ndarray,
+                      inverse: bool=False) -> numpy.ndarray:
+        """Moves each qubit from the axis it was relabeled to back to its
+        axis in the qubit order, or the other way around if inverse is True,
+        and writes the result into `out`."""
+        if self._sector_permutation is not None:
+            if inverse:
+                out[:, self._sector_permutation] = state
+            else:
+                out[...] = state[:, self._sector_permutation]
+            return out
+        permutation = cast(Tuple[int, ...], self._axis_permutation)
+        if inverse:
+            permutation = tuple(numpy.argsort(permutation))
+        out[...] = state.transpose(
+                (0,) + tuple(1 + axis for axis in permutation))
+        return out
+
+    def _relabeled_positions(self,
+                             axis_permutation: Tuple[int, ...]
+                             ) -> numpy.ndarray:
+        """The position in the sector of each basis state with its qubits
+        moved to the relabeled axes."""
+        basis = cast(NumberSector, self._sector).basis
+        n_qubits = self.num_qubits
+        relabeled = numpy.zeros_like(basis)
+        for i, axis in enumerate(axis_permutation):
+            relabeled |= ((basis >> (n_qubits - 1 - i)) & 1) << (
+                    n_qubits - 1 - axis)
+        return numpy.searchsorted(basis, relabeled)
+
+    def _compile_operation(self,
+                           op: cirq.Operation,
+                           axes: Tuple[int, ...]) -> '_Kernel':
+        n_axes = self.num_qubits
+        if not cirq.is_parameterized(op):
+            matrix = cirq.unitary(op, None)
+            if matrix is None:
+                raise TypeError(
+                        'Operation {!r} does not have a unitary.'.format(op))
+            return _ConstantKernel(axes, n_axes, self._sector, matrix)
+
+        gate = getattr(op, 'gate', None)
+        if isinstance(gate, cirq.EigenGate):
+            linear_form = self._linear_form(gate.exponent)
+            if linear_form is not None:
+                slot, coefficient, offset = linear_form
+                # pylint: disable=protected-access
+                half_turns, projectors = zip(*gate._eigen_components())
+                half_turns = (numpy.array(half_turns, dtype=float) +
+                              gate._global_shift)
+                # pylint: enable=protected-access
+                return _EigenKernel(axes, n_axes, self._sector,
+                                    numpy.array(projectors), half_turns,
+                                    slot, coefficient, offset)
+
+        kernel = _ResolvedKernel(axes, n_axes, self._sector, op,
+                                 [str(param) for param in self.params],
+                                 self._scale_factors)
+        resolved_op = cirq.resolve_parameters(
+                op, kernel.param_resolver(numpy.zeros(len(self.params))))
+        if cirq.is_parameterized(resolved_op):
+            raise ValueError(
+                    'Operation {!r} has a symbol that is not a '
+                    'parameter.'.format(op))
+        if self._sector is not None:
+            self._sector.check_conserves_number(cirq.unitary(resolved_op))
+        return kernel
+
+    def _fuse_kernels(self) -> List[Tuple[Optional[int], '_Kernel']]:
+        """Groups the kernels into runs acting on at most two qubits.
+
+        A kernel joins the latest run acting on any of its qubits if the
+        qubits of the run and of the kernel together number at most two. No
+        kernel after that run acts on those qubits, so the kernel commutes
+        with everything in between.
+        """
+        runs = []  # type: List[Tuple[Tuple[int, ...], List[int]]]
+        latest_run = {}  # type: Dict[int, int]
+        for i, kernel in enumerate(self._kernels):
+            touched = [latest_run[axis] for axis in kernel.axes
+                       if axis in latest_run]
+            run = max(touched) if touched else None
+            if run is not None and len(kernel.axes) <= 2:
+                axes, members = runs[run]
+                merged_axes = axes + tuple(axis for axis in kernel.axes
+                                           if axis not in axes)
+                if len(merged_axes) <= 2:
+                    runs[run] = (merged_axes, members + [i])
+                    for axis in kernel.axes:
+                        latest_run[axis] = run
+                    continue
+            runs.append((kernel.axes, [i]))
+            for axis in kernel.axes:
+                latest_run[axis] = len(runs) - 1
+
+        passes = []  # type: List[Tuple[Optional[int], _Kernel]]
+        for axes, members in runs:
+            if len(members) == 1:
+                i, = members
+                passes.append((i, self._kernels[i]))
+                continue
+            kernel = _FusedKernel(axes, self.num_qubits, self._sector,
+                                  members,
+                                  [self._kernels[i] for i in members])
+            if all(isinstance(self._kernels[i], _ConstantKernel)
+                   for i in members):
+                matrix = kernel.local_matrices(
+                        numpy.zeros((1, len(self.params))))[0]
+                kernel = _ConstantKernel(axes, self.num_qubits, self._sector,
+                                         matrix)
+            passes.append((None, kernel))
+        return passes
+
+    def _layer_diagonal_passes(self,
+                               passes: List[Tuple[Optional[int], '_Kernel']]
+                               ) -> List[Tuple[Optional[int], '_Kernel']]:
+        """Merges diagonal passes into layers.
+
+        A diagonal pass joins the latest layer unless a pass since that layer
+        acts on one of its qubits and is not diagonal.
+        """
+        groups = []  # type: List[List[Tuple[Optional[int], _Kernel]]]
+        is_layer = []  # type: List[bool]
+        blocked = set()  # type: Set[int]
+        for i, kernel in passes:
+            if _layer_members(i, kernel) is None:
+                groups.append([(i, kernel)])
+                is_layer.append(False)
+                blocked.update(kernel.axes)
+                continue
+            if not any(is_layer) or blocked.intersection(kernel.axes):
+                groups.append([])
+                is_layer.append(True)
+                blocked = set()
+            # The latest layer
+            layer = len(is_layer) - 1 - is_layer[::-1].index(True)
+            groups[layer].append((i, kernel))
+
+        if self._sector is not None:
+            basis = self._sector.basis
+        else:
+            basis = numpy.arange(1 << self.num_qubits)
+        layered = []  # type: List[Tuple[Optional[int], _Kernel]]
+        for group, layer in zip(groups, is_layer):
+            if not layer or len(group) == 1:
+                layered.extend(group)
+                continue
+            # Every pass of a layer has members
+            members = []  # type: List[Tuple[Optional[int], _Kernel]]
+            for i, kernel in group:
+                members.extend(_layer_members(i, kernel) or ())
+            layered.append((None, _DiagonalLayerKernel(
+                self.num_qubits, basis, members)))
+        return layered
+
+    def _linear_form(self,
+                     exponent: Union[sympy.Basic, float]
+                     ) -> Optional[Tuple[int, float, float]]:
+        """Writes an exponent as coefficient * values[slot] + offset."""
+        if not isinstance(exponent, sympy.Basic):
+            return None
+        symbols = exponent.free_symbols
+        if len(symbols) != 1:
+            return None
+        symbol, = symbols
+        if str(symbol) not in self._slots:
+            raise ValueError('Symbol {} is not a parameter.'.format(symbol))
+        coefficient = sympy.diff(exponent, symbol)
+        offset = exponent.subs(symbol, 0)
+        if coefficient.free_symbols or offset.free_symbols:
+            return None
+        slot = self._slots[str(symbol)]
+        return (slot,
+                float(coefficient) * self._scale_factors[slot],
+                float(offset))
+
+    def __getstate__(self) -> Dict:
+        # Don't pickle the state buffers
+        state = self.__dict__.copy()
+        state['_buffers'] = None
+        return state
+
+
+class _Kernel:
+    """A unitary acting on some axes of a batch of state tensors.
+
+    The first axis of the state array indexes the batch, and the remaining
+    axes correspond to qubits. Diagonal kernels are applied in place by an
+    elementwise multiplication. Other kernels write their output into a
+    separate buffer.
+
+    If the kernel acts on a number sector, the state array instead has a
+    second axis indexing the basis states of the sector, and all kernels are
+    applied in place through the index tables of the sector.
+    """
+
+    def __init__(self,
+                 axes: Tuple[int, ...],
+                 n_axes: int,
+                 sector: Optional[NumberSector],
+                 diagonal: bool) -> None:
+        self.axes = axes
+        self.diagonal = diagonal
+        self._tensor_shape = (2,) * (2 * len(axes))
+        self._sector_tables = (
+                None if sector is None
+                else sector.tables(axes)
+        )  # type: Optional[Tuple[numpy.ndarray, List]]
+
+        # Transposes a diagonal to match the order of the axes in the state,
+        # and reshapes it to broadcast against the state
+        self._axis_order = (0,) + tuple(numpy.argsort(axes) + 1)
+        broadcast_shape = [1] * n_axes
+        for axis in axes:
+            broadcast_shape[axis] = 2
+        self._broadcast_shape = tuple(broadcast_shape)
+
+        # Subscripts of numpy.einsum for a batch of matrices, one per state,
+        # in the same form as cirq.targeted_left_multiply
+        k = len(axes)
+        batch_index = 0
+        work_indices = tuple(range(1, k + 1))
+        data_indices = tuple(range(k + 1, k + n_axes + 1))
+        used_data_indices = tuple(data_indices[axis] for axis in axes)
+        output_indices = list(data_indices)
+        for w, axis in zip(work_indices, axes):
+            output_indices[axis] = w
+        self._einsum_indices = (
+                (batch_index,) + work_indices + used_data_indices,
+                (batch_index,) + data_indices,
+                [batch_index] + output_indices)
+        self._shared_matrix_indices = work_indices + used_data_indices
+
+    def matrices(self,
+                 param_values: numpy.ndarray,
+                 exponent_shifts: Optional[numpy.ndarray]=None
+                 ) -> numpy.ndarray:
+        """The matrices of the kernel for each row of parameter values.
+
+        Diagonal kernels return diagonals instead of matrices.
+        """
+        raise NotImplementedError()  # coverage: ignore
+
+    def local_matrices(self,
+                       param_values: numpy.ndarray,
+                       exponent_shifts: Optional[numpy.ndarray]=None
+                       ) -> numpy.ndarray:
+        """The matrices of the kernel as an array of shape
+        (batch size, 2**k, 2**k), where k is the number of axes."""
+        matrices = self.matrices(param_values, exponent_shifts)
+        if self.diagonal:
+            return matrices[:, :, numpy.newaxis] * numpy.eye(matrices.shape[1])
+        dimension = 1 << len(self.axes)
+        return matrices.reshape(len(matrices), dimension, dimension)
+
+    def apply(self,
+              state: numpy.ndarray,
+              buffer: numpy.ndarray,
+              param_values: numpy.ndarray,
+              exponent_shifts: Optional[numpy.ndarray]=None) -> numpy.ndarray:
+        """Applies the kernel and returns the array holding the result."""
+        return self._multiply(self.matrices(param_values, exponent_shifts),
+                              state,
+                              buffer)
+
+    def apply_adjoint(self,
+                      state: numpy.ndarray,
+                      buffer: numpy.ndarray,
+                      param_values: numpy.ndarray) -> numpy.ndarray:
+        """Applies the inverse of the kernel and returns the array holding
+        the result."""
+        matrices = self.matrices(param_values)
+        if self.diagonal:
+            adjoints = matrices.conj()
+        else:
+            dimension = 1 << len(self.axes)
+            adjoints = matrices.reshape(
+                    len(matrices), dimension, dimension).conj().transpose(
+                            0, 2, 1)
+        return self._multiply(adjoints, state, buffer)
+
+    def _multiply(self,
+                  matrices: numpy.ndarray,
+                  state: numpy.ndarray,
+                  buffer: numpy.ndarray,
+                  in_place: bool=True) -> numpy.ndarray:
+        """Multiplies each state of the batch by its matrix.
+
+        Diagonal kernels multiply in place unless `in_place` is False.
+        """
+        if self._sector_tables is not None:
+            return self._multiply_sector(matrices, state, buffer, in_place)
+        batch_size = len(matrices)
+        if self.diagonal:
+            diagonals = self._broadcast(matrices)
+            if in_place:
+                state *= diagonals
+                return state
+            return numpy.multiply(state, diagonals, out=buffer)
+        matrix_indices, state_indices, output_indices = self._einsum_indices
+        return numpy.einsum(
+                matrices.reshape((batch_size,) + self._tensor_shape),
+                matrix_indices,
+                state,
+                state_indices,
+                output_indices,
+                out=buffer)
+
+    def _multiply_sector(self,
+                         matrices: numpy.ndarray,
+                         state: numpy.ndarray,
+                         buffer: numpy.ndarray,
+                         in_place: bool) -> numpy.ndarray:
+        """Multiplies each state of a batch of number sector states by its
+        matrix, in place unless `in_place` is False."""
+        if not in_place:
+            buffer[...] = state
+            state = buffer
+        local_states, blocks = self._sector_tables  # type: ignore
+        if self.diagonal:
+            state *= matrices.reshape(len(matrices), -1)[:, local_states]
+            return state
+
+        dimension = 1 << len(self.axes)
+        matrices = matrices.reshape(len(matrices), dimension, dimension)
+        for block_states, indices in blocks:
+            if len(block_states) == 1:
+                local_state, = block_states
+                state[:, indices[:, 0]] *= matrices[
+                        :, local_state, local_state, numpy.newaxis]
+            else:
+                block = matrices[:, block_states][:, :, block_states]
+                state[:, indices] = numpy.matmul(state[:, indices],
+                                                 block.transpose(0, 2, 1))
+        return state
+
+    def _broadcast(self, diagonals: numpy.ndarray) -> numpy.ndarray:
+        batch_size = len(diagonals)
+        return diagonals.reshape(
+                (batch_size,) + (2,) * len(self.axes)).transpose(
+                        self._axis_order).reshape(
+                                (batch_size,) + self._broadcast_shape)
+
+
+class _ConstantKernel(_Kernel):
+    """A kernel with a fixed matrix shared by the whole batch."""
+
+    def __init__(self,
+                 axes: Tuple[int, ...],
+                 n_axes: int,
+                 sector: Optional[NumberSector],
+                 matrix: numpy.ndarray) -> None:
+        diagonal = _is_diagonal(matrix)
+        if sector is not None:
+            sector.check_conserves_number(matrix)
+        super().__init__(axes, n_axes, sector, diagonal)
+        self._local_matrix = numpy.diag(matrix) if diagonal else matrix
+        self._matrix = self._shared_form(matrix)
+        self._adjoint_matrix = self._shared_form(matrix.conj().T)
+
+    def _shared_form(self, matrix: numpy.ndarray) -> numpy.ndarray:
+        if self._sector_tables is not None:
+            # A batch of one matrix, broadcast against the batch of states
+            if self.diagonal:
+                return numpy.diag(matrix)[numpy.newaxis]
+            return matrix[numpy.newaxis]
+        if self.diagonal:
+            return self._broadcast(numpy.diag(matrix)[numpy.newaxis])
+        return matrix.reshape(self._tensor_shape)
+
+    def matrices(self,
+                 param_values: numpy.ndarray,
+                 exponent_shifts: Optional[numpy.ndarray]=None
+                 ) -> numpy.ndarray:
+        return self._local_matrix[numpy.newaxis]
+
+    def apply(self,
+              state: numpy.ndarray,
+              buffer: numpy.ndarray,
+              param_values: numpy.ndarray,
+              exponent_shifts: Optional[numpy.ndarray]=None) -> numpy.ndarray:
+        return self._multiply_shared(self._matrix, state, buffer)
+
+    def apply_adjoint(self,
+                      state: numpy.ndarray,
+                      buffer: numpy.ndarray,
+                      param_values: numpy.ndarray) -> numpy.ndarray:
+        return self._multiply_shared(self._adjoint_matrix, state, buffer)
+
+    def _multiply_shared(self,
+                         matrix: numpy.ndarray,
+                         state: numpy.ndarray,
+                         buffer: numpy.ndarray) -> numpy.ndarray:
+        if self._sector_tables is not None:
+            return self._multiply_sector(matrix, state, buffer, True)
+        if self.diagonal:
+            state *= matrix
+            return state
+        _, state_indices, output_indices = self._einsum_indices
+        return numpy.einsum(matrix,
+                            self._shared_matrix_indices,
+                            state,
+                            state_indices,
+                            output_indices,
+                            out=buffer)
+
+
+class _EigenKernel(_Kernel):
+    """A kernel for an eigengate whose exponent is bound to a parameter.
+
+    The matrix is sum_k exp(i pi t h_k) P_k where t is the exponent, h_k are
+    the half turns of the eigenvalues (including the global shift) and P_k
+    are the projectors onto the eigenspaces.
+    """
+
+    def __init__(self,
+                 axes: Tuple[int, ...],
+                 n_axes: int,
+                 sector: Optional[NumberSector],
+                 projectors: numpy.ndarray,
+                 half_turns: numpy.ndarray,
+                 slot: int,
+                 coefficient: float,
+                 offset: float) -> None:
+        diagonal = all(_is_diagonal(projector) for projector in projectors)
+        if sector is not None:
+            for projector in projectors:
+                sector.check_conserves_number(projector)
+        super().__init__(axes, n_axes, sector, diagonal)
+        if diagonal:
+            projectors = numpy.array(
+                    [numpy.diag(projector) for projector in projectors])
+        self._projectors = projectors.reshape(len(projectors), -1)
+        self._half_turns = half_turns
+        self.slot = slot
+        self.coefficient = coefficient
+        self.offset = offset
+
+    def exponents(self,
+                  param_values: numpy.ndarray,
+                  exponent_shifts: Optional[numpy.ndarray]=None
+                  ) -> numpy.ndarray:
+        exponents = self.coefficient * param_values[:, self.slot] + self.offset
+        if exponent_shifts is not None:
+            exponents = exponents + exponent_shifts
+        return exponents
+
+    def matrices(self,
+                 param_values: numpy.ndarray,
+                 exponent_shifts: Optional[numpy.ndarray]=None
+                 ) -> numpy.ndarray:
+        phases = numpy.exp(1j * numpy.pi *
+                           numpy.outer(self.exponents(param_values,
+                                                      exponent_shifts),
+                                       self._half_turns))
+        return phases.dot(self._projectors)
+
+    def local_half_turns(self) -> Optional[numpy.ndarray]:
+        """The half turns h(s) of the eigenvalue of each local state s, or
+        None if the kernel is not diagonal in the computational basis."""
+        if not self.diagonal or numpy.any(
+                (self._projectors != 0) & (self._projectors != 1)):
+            return None
+        return self._half_turns.dot(self._projectors.real)
+
+    def shift_rule(self) -> List[Tuple[float, float]]:
+        """The (exponent shift, weight) pairs of the parameter-shift rule for
+        the derivative with respect to the exponent."""
+        gaps = numpy.abs(numpy.subtract.outer(self._half_turns,
+                                              self._half_turns))
+        gaps = gaps[gaps > _GAP_TOLERANCE]
+        if not len(gaps):
+            return []
+        base_gap = numpy.min(gaps)
+        multiples = gaps / base_gap
+        if not numpy.allclose(multiples, numpy.round(multiples)):
+            raise TypeError('The eigenvalue gaps {} of a parameterized gate '
+                            'are not multiples of a common gap.'.format(
+                                sorted(set(gaps))))
+        r = int(numpy.round(numpy.max(multiples)))
+        rule = []
+        for mu in range(1, 2 * r + 1):
+            x = (2 * mu - 1) * numpy.pi / (2 * r)
+            weight = ((-1) ** (mu - 1) * numpy.pi * base_gap /
+                      (4 * r * numpy.sin(x / 2) ** 2))
+            rule.append((x / (numpy.pi * base_gap), weight))
+        return rule
+
+    def apply_derivative(self,
+                         state: numpy.ndarray,
+                         out: numpy.ndarray,
+                         param_values: numpy.ndarray) -> numpy.ndarray:
+        """Writes the derivative of the kernel with respect to its exponent,
+        applied to the state, into `out`."""
+        phases = numpy.exp(1j * numpy.pi *
+                           numpy.outer(self.exponents(param_values),
+                                       self._half_turns))
+        derivatives = (1j * numpy.pi * self._half_turns * phases).dot(
+                self._projectors)
+        return self._multiply(derivatives, state, out, in_place=False)
+
+
+class _ResolvedKernel(_Kernel):
+    """A kernel for an operation that has to be resolved by cirq."""
+
+    def __init__(self,
+                 axes: Tuple[int, ...],
+                 n_axes: int,
+                 sector: Optional[NumberSector],
+                 op: cirq.Operation,
+                 names: Sequence[str],
+                 scale_factors: numpy.ndarray) -> None:
+        super().__init__(axes, n_axes, sector, False)
+        self._op = op
+        self._names = names
+        self._scale_factors = scale_factors
+
+    def param_resolver(self,
+                       param_values: numpy.ndarray) -> cirq.ParamResolver:
+        return cirq.ParamResolver(
+                dict(zip(self._names, self._scale_factors * param_values)))
+
+    def matrices(self,
+                 param_values: numpy.ndarray,
+                 exponent_shifts: Optional[numpy.ndarray]=None
+                 ) -> numpy.ndarray:
+        return numpy.array([
+            cirq.unitary(cirq.resolve_parameters(
+                self._op, self.param_resolver(values)))
+            for values in param_values])
+
+
+class _FusedKernel(_Kernel):
+    """A kernel for a run of kernels acting on at most two qubits.
+
+    For each row of parameter values, the matrices of the kernels of the run
+    are embedded in the qubits of the run and multiplied together, so the
+    whole run is applied in a single pass over the state. Exponent shifts are
+    given as an array with one column for each unfused kernel of the program.
+    """
+
+    def __init__(self,
+                 axes: Tuple[int, ...],
+                 n_axes: int,
+                 sector: Optional[NumberSector],
+                 indices: Sequence[int],
+                 kernels: Sequence[_Kernel]) -> None:
+        super().__init__(axes, n_axes, sector,
+                         all(kernel.diagonal for kernel in kernels))
+        self.indices = tuple(indices)
+        self._kernels = tuple(kernels)
+
+    def matrices(self,
+                 param_values: numpy.ndarray,
+                 exponent_shifts: Optional[numpy.ndarray]=None
+                 ) -> numpy.ndarray:
+        product = None  # type: Optional[numpy.ndarray]
+        for i, kernel in zip(self.indices, self._kernels):
+            shifts = None
+            if exponent_shifts is not None and isinstance(kernel,
+                                                          _EigenKernel):
+                shifts = exponent_shifts[:, i]
+            matrices = _embed(kernel.local_matrices(param_values, shifts),
+                              kernel.axes,
+                              self.axes)
+            product = (matrices if product is None
+                       else numpy.matmul(matrices, product))
+        if self.diagonal:
+            return numpy.diagonal(product, axis1=1, axis2=2)
+        return product
+
+
+_GAP_TOLERANCE = 1e-8
+
+
+class _DiagonalLayerKernel(_Kernel):
+    """A kernel for a layer of diagonal kernels acting on any qubits.
+
+    The diagonal of the layer is a phase vector with one entry for each basis
+    state of the program. The diagonal of a kernel of an eigengate with
+    exponent t is exp(i pi t h(s)) on the basis states whose local state on
+    the qubits of the kernel is s, and t is a linear function of one
+    parameter, so the phases of the layer are exp(i (values . G + c)) for a
+    matrix G with one row for each parameter of the layer, times the product
+    of the diagonals of the constant kernels. Both are computed once, using
+    bit arithmetic on the indices of the basis states.
+    """
+
+    def __init__(self,
+                 n_axes: int,
+                 basis: numpy.ndarray,
+                 members: Sequence[Tuple[Optional[int], _Kernel]]) -> None:
+        super().__init__(tuple(range(n_axes)), n_axes, None, True)
+        self._basis = basis
+        self._n_axes = n_axes
+
+        constant_phases = numpy.ones(len(basis), dtype=complex)
+        constant_angles = numpy.zeros(len(basis))
+        generators = {}  # type: Dict[int, numpy.ndarray]
+        # (index, axes, pi * h(s)) for each kernel of an eigengate
+        self._eigen_members = [
+        ]  # type: List[Tuple[int, Tuple[int, ...], numpy.ndarray]]
+        for i, kernel in members:
+            local_states = self._local_states(kernel.axes)
+            if isinstance(kernel, _ConstantKernel):
+                # pylint: disable=protected-access
+                constant_phases *= kernel._local_matrix[local_states]
+                # pylint: enable=protected-access
+                continue
+            kernel = cast(_EigenKernel, kernel)
+            half_turns = numpy.pi * kernel.local_half_turns()
+            angles = half_turns[local_states]
+            if kernel.slot not in generators:
+                generators[kernel.slot] = numpy.zeros(len(basis))
+            generators[kernel.slot] += kernel.coefficient * angles
+            constant_angles += kernel.offset * angles
+            self._eigen_members.append((cast(int, i), kernel.axes,
+                                        half_turns))
+
+        self._slots = numpy.array(sorted(generators), dtype=numpy.intp)
+        self._generators = numpy.array(
+                [generators[slot] for slot in sorted(generators)]).reshape(
+                        len(generators), len(basis))
+        self._constant = constant_phases * numpy.exp(1j * constant_angles)
+
+    def _local_states(self, axes: Tuple[int, ...]) -> numpy.ndarray:
+        """The local state of some qubits in each basis state."""
+        local_states = numpy.zeros(len(self._basis), dtype=numpy.intp)
+        for axis in axes:
+            local_states <<= 1
+            local_states |= (self._basis >> (self._n_axes - 1 - axis)) & 1
+        return local_states
+
+    def matrices(self,
+                 param_values: numpy.ndarray,
+                 exponent_shifts: Optional[numpy.ndarray]=None
+                 ) -> numpy.ndarray:
+        if not len(self._slots):
+            return self._constant[numpy.newaxis]
+        angles = param_values[:, self._slots].dot(self._generators)
+        if exponent_shifts is not None:
+            for i, axes, half_turns in self._eigen_members:
+                shifts = exponent_shifts[:, i]
+                rows = numpy.flatnonzero(shifts)
+                if len(rows):
+                    angles[rows] += numpy.outer(
+                            shifts[rows],
+                            half_turns[self._local_states(axes)])
+        return self._constant * numpy.exp(1j * angles)
+
+    def apply(self,
+              state: numpy.ndarray,
+              buffer: numpy.ndarray,
+              param_values: numpy.ndarray,
+              exponent_shifts: Optional[numpy.ndarray]=None) -> numpy.ndarray:
+        phases = self.matrices(param_values, exponent_shifts)
+        state *= phases.reshape((len(phases),) + state.shape[1:])
+        return state
+
+    def apply_adjoint(self,
+                      state: numpy.ndarray,
+                      buffer: numpy.ndarray,
+                      param_values: numpy.ndarray) -> numpy.ndarray:
+        phases = self.matrices(param_values).conj()
+        state *= phases.reshape((len(phases),) + state.shape[1:])
+        return state
+
+
+def _layer_members(index: Optional[int],
+                   kernel: _Kernel
+                   ) -> Optional[List[Tuple[Optional[int], _Kernel]]]:
+    """The unfused kernels of a pass that can be part of a diagonal layer,
+    or None if the pass cannot."""
+    if isinstance(kernel, _FusedKernel):
+        # pylint: disable=protected-access
+        members = list(zip(kernel.indices, kernel._kernels)
+                       )  # type: List[Tuple[Optional[int], _Kernel]]
+        # pylint: enable=protected-access
+    else:
+        members = [(index, kernel)]
+    if all(isinstance(member, _ConstantKernel) and member.diagonal or
+           isinstance(member, _EigenKernel) and
+           member.local_half_turns() is not None
+           for _, member in members):
+        return members
+    return None
+
+
+def _embed(matrices: numpy.ndarray,
+           axes: Tuple[int, ...],
+           run_axes: Tuple[int, ...]) -> numpy.ndarray:
+    """Writes a batch of matrices acting on some axes in terms of the axes of
+    a run of at most two axes containing them."""
+    if axes == run_axes:
+        return matrices
+    if len(axes) == 2:
+        # The same two axes in the opposite order
+        return matrices.reshape(-1, 2, 2, 2, 2).transpose(
+                0, 2, 1, 4, 3).reshape(-1, 4, 4)
+    identity = numpy.eye(2)
+    if axes[0] == run_axes[0]:
+        return numpy.einsum('bij,kl->bikjl', matrices, identity).reshape(
+                -1, 4, 4)
+    return numpy.einsum('kl,bij->bkilj', identity, matrices).reshape(-1, 4, 4)
+
+
+def _is_diagonal(matrix: numpy.ndarray) -> bool:
+    return not numpy.any(matrix - numpy.diag(numpy.diag(matrix)))
@@ -0,0 +1,436 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pickle
+
+import numpy
+import pytest
+import sympy
+
+import cirq
+import openfermion
+
+from openfermioncirq import (
+        FSWAP, Rxxyy, Ryxxy, XXYYPowGate, YXXYPowGate, rot111,
+        simulate_trotter, swap_network)
+from openfermioncirq.simulation import CompiledCircuit
+from openfermioncirq.trotter import LINEAR_SWAP_NETWORK
+
+
+a, b, c = cirq.LineQubit.range(3)
+theta, phi = sympy.Symbol('theta'), sympy.Symbol('phi')
+
+
+def resolved_final_state(circuit, params, values, initial_state=0,
+                         qubit_order=cirq.QubitOrder.DEFAULT):
+    resolver = cirq.ParamResolver(
+            {str(param): value for param, value in zip(params, values)})
+    return cirq.resolve_parameters(
+            circuit, resolver).apply_unitary_effect_to_state(
+                    initial_state, qubit_order=qubit_order)
+
+
+@pytest.mark.parametrize('values', [(0.3, -1.2), (1.7, 0.25)])
+def test_compiled_circuit_matches_cirq(values):
+    circuit = cirq.Circuit.from_ops(
+            [cirq.H(q) for q in (a, b, c)],
+            XXYYPowGate(exponent=theta).on(a, b),
+            YXXYPowGate(exponent=phi).on(b, c),
+            cirq.CZPowGate(exponent=phi).on(a, c),
+            cirq.ZPowGate(exponent=theta).on(b),
+            Ryxxy(theta).on(a, b),
+            Rxxyy(2 * phi).on(c, a),
+            cirq.Rz(theta).on(c),
+            FSWAP(b, c),
+            rot111(0.4).on(a, b, c),
+            cirq.CNOT(c, a),
+            cirq.measure(a, b, c))
+    compiled = CompiledCircuit(circuit, params=[theta, phi])
+
+    assert compiled.num_qubits == 3
+    assert compiled.num_kernels == 13
+    numpy.testing.assert_allclose(
+            compiled.final_state(values),
+            resolved_final_state(circuit, [theta, phi], values),
+            atol=1e-8)
+
+
+def test_compiled_circuit_scale_factors_and_qubit_order():
+    circuit = cirq.Circuit.from_ops(
+            cirq.X(a),
+            XXYYPowGate(exponent=theta).on(a, b),
+            cirq.CZPowGate(exponent=phi).on(b, c),
+            XXYYPowGate(exponent=phi).on(b, c))
+    qubit_order = [c, a, b]
+    compiled = CompiledCircuit(circuit,
+                               qubit_order=qubit_order,
+                               params=[theta, phi],
+                               scale_factors=[2.0, -0.5])
+    assert compiled.qubits == (c, a, b)
+    numpy.testing.assert_allclose(
+            compiled.final_state([0.2, 0.9], initial_state=1),
+            resolved_final_state(circuit, [theta, phi], [0.4, -0.45],
+                                 initial_state=1, qubit_order=qubit_order),
+            atol=1e-8)
+
+
+def test_compiled_circuit_nonlinear_exponent():
+    circuit = cirq.Circuit.from_ops(
+            cirq.H(a),
+            cirq.XPowGate(exponent=theta**2).on(a),
+            cirq.CZPowGate(exponent=theta * phi).on(a, b))
+    compiled = CompiledCircuit(circuit, params=[theta, phi])
+    initial_state = numpy.array([0.6, 0.0, 0.0, 0.8j])
+    numpy.testing.assert_allclose(
+            compiled.final_state([0.7, 1.3], initial_state),
+            resolved_final_state(circuit, [theta, phi], [0.7, 1.3],
+                                 initial_state=initial_state),
+            atol=1e-8)
+
+
+def test_compiled_circuit_fuses_kernels():
+    circuit = cirq.Circuit.from_ops(
+            XXYYPowGate(exponent=theta).on(a, b),
+            cirq.CZPowGate(exponent=phi).on(a, b),
+            FSWAP(a, b),
+            cirq.Z(c)**0.5,
+            cirq.X(c),
+            XXYYPowGate(exponent=phi).on(b, c),
+            FSWAP(c, b))
+    compiled = CompiledCircuit(circuit, params=[theta, phi])
+    unfused = CompiledCircuit(circuit, params=[theta, phi], fuse=False)
+    assert compiled.num_kernels == unfused.num_kernels == 7
+    assert compiled.num_passes == 2
+    assert unfused.num_passes == 7
+
+    values = numpy.array([[0.3, -1.2], [1.7, 0.25]])
+    initial_state = openfermion.haar_random_vector(8, seed=13)
+    expected = [resolved_final_state(circuit, [theta, phi], row,
+                                     initial_state=initial_state)
+                for row in values]
+    numpy.testing.assert_allclose(
+            compiled.final_states(values, initial_state), expected,
+            atol=1e-8)
+    numpy.testing.assert_allclose(
+            unfused.final_states(values, initial_state), expected,
+            atol=1e-8)
+
+    hermitian = openfermion.random_hermitian_matrix(8, seed=17)
+    value, gradient = compiled.expectation_gradient(
+            values[0], hermitian.dot, initial_state)
+    expected_value, expected_gradient = unfused.expectation_gradient(
+            values[0], hermitian.dot, initial_state)
+    numpy.testing.assert_allclose(value, expected_value, atol=1e-8)
+    numpy.testing.assert_allclose(gradient, expected_gradient, atol=1e-8)
+
+
+def test_compiled_circuit_diagonal_layers():
+    circuit = cirq.Circuit.from_ops(
+            cirq.Rz(rads=theta).on(a),
+            cirq.ZPowGate(exponent=phi).on(b),
+            cirq.CZPowGate(exponent=theta, global_shift=-0.5).on(a, c),
+            rot111(0.3).on(a, b, c),
+            cirq.H(b),
+            cirq.Z(c)**0.3,
+            cirq.CZ(a, b))
+    compiled = CompiledCircuit(circuit, params=[theta, phi])
+    unfused = CompiledCircuit(circuit, params=[theta, phi], fuse=False)
+    # Everything but the H and CZ acting on b is one layer, because the
+    # Z on c commutes with them
+    assert compiled.num_passes == 2
+
+    values = numpy.array([[0.3, -1.2], [1.7, 0.25]])
+    initial_state = openfermion.haar_random_vector(8, seed=29)
+    numpy.testing.assert_allclose(
+            compiled.final_states(values, initial_state),
+            [resolved_final_state(circuit, [theta, phi], row,
+                                  initial_state=initial_state)
+             for row in values],
+            atol=1e-8)
+
+    exponent_shifts, weights = compiled.parameter_shift_rule()
+    hermitian = openfermion.random_hermitian_matrix(8, seed=31)
+    final_states = compiled.final_states(
+            numpy.tile(values[0], (len(exponent_shifts), 1)),
+            initial_state,
+            exponent_shifts=exponent_shifts)
+    expectations = numpy.einsum(
+            'ij,ij->i', final_states.conj(),
+            hermitian.dot(final_states.T).T).real
+    _, expected_gradient = unfused.expectation_gradient(
+            values[0], hermitian.dot, initial_state)
+    numpy.testing.assert_allclose(expectations.dot(weights),
+                                  expected_gradient,
+                                  atol=1e-8)
+
+    sector_circuit = circuit[:3]
+    compiled = CompiledCircuit(sector_circuit, params=[theta, phi],
+                               n_particles=2)
+    assert compiled.num_passes == 1
+    full_state = resolved_final_state(sector_circuit, [theta, phi],
+                                      values[0], initial_state=0b101)
+    numpy.testing.assert_allclose(
+            compiled.final_state(values[0], initial_state=0b101),
+            full_state[compiled.sector_indices],
+            atol=1e-8)
+
+
+def test_compiled_circuit_fuses_simulate_trotter_output():
+    qubits = cirq.LineQubit.range(4)
+    hamiltonian = openfermion.random_diagonal_coulomb_hamiltonian(
+            4, real=True, seed=19)
+    circuit = cirq.Circuit.from_ops(simulate_trotter(
+        qubits, hamiltonian, 0.5, n_steps=2, order=1,
+        algorithm=LINEAR_SWAP_NETWORK))
+    compiled = CompiledCircuit(circuit, qubit_order=qubits)
+    assert compiled.num_passes < compiled.num_kernels
+
+    initial_state = openfermion.haar_random_vector(16, seed=23)
+    numpy.testing.assert_allclose(
+            compiled.final_state(initial_state=initial_state),
+            circuit.apply_unitary_effect_to_state(initial_state,
+                                                  qubit_order=qubits),
+            atol=1e-7)
+
+
+@pytest.mark.parametrize('fermionic, n_particles', [
+    (True, None), (False, None), (True, 2)])
+def test_compiled_circuit_relabel_swaps(fermionic, n_particles):
+    qubits = cirq.LineQubit.range(4)
+    circuit = cirq.Circuit.from_ops(
+            swap_network(
+                qubits,
+                lambda p, q, a, b: (
+                    XXYYPowGate(exponent=theta if p < q else phi).on(a, b),
+                    cirq.CZPowGate(exponent=phi).on(a, b)),
+                fermionic=fermionic),
+            cirq.ZPowGate(exponent=theta).on(qubits[1]))
+    compiled = CompiledCircuit(circuit, qubit_order=qubits,
+                               params=[theta, phi], n_particles=n_particles,
+                               relabel_swaps=True)
+    unrelabeled = CompiledCircuit(circuit, qubit_order=qubits,
+                                  params=[theta, phi], n_particles=n_particles)
+    n_swaps = 6
+    if fermionic:
+        # Each FSWAP leaves a CZ behind
+        assert compiled.num_kernels == unrelabeled.num_kernels
+    else:
+        assert compiled.num_kernels == unrelabeled.num_kernels - n_swaps
+
+    values = numpy.array([0.3, -1.2])
+    initial_state = 0b1010
+    numpy.testing.assert_allclose(
+            compiled.final_state(values, initial_state),
+            unrelabeled.final_state(values, initial_state),
+            atol=1e-8)
+
+    hermitian = openfermion.random_hermitian_matrix(compiled.dimension,
+                                                    seed=37)
+    value, gradient = compiled.expectation_gradient(
+            values, hermitian.dot, initial_state)
+    expected_value, expected_gradient = unrelabeled.expectation_gradient(
+            values, hermitian.dot, initial_state)
+    numpy.testing.assert_allclose(value, expected_value, atol=1e-8)
+    numpy.testing.assert_allclose(gradient, expected_gradient, atol=1e-8)
+
+
+def test_compiled_circuit_reuses_buffers():
+    circuit = cirq.Circuit.from_ops(XXYYPowGate(exponent=theta).on(a, b))
+    compiled = CompiledCircuit(circuit, params=[theta])
+
+    state = compiled.final_state([0.5], initial_state=1, copy=False)
+    expected = state.copy()
+    assert compiled.final_state([0.5], initial_state=1, copy=False) is not None
+    numpy.testing.assert_allclose(state, expected)
+
+    copied = compiled.final_state([0.5], initial_state=1)
+    compiled.final_state([0.0], initial_state=1)
+    numpy.testing.assert_allclose(copied, expected)
+
+
+def test_compiled_circuit_pickle_drops_buffers():
+    circuit = cirq.Circuit.from_ops(XXYYPowGate(exponent=theta).on(a, b))
+    compiled = CompiledCircuit(circuit, params=[theta])
+    expected = compiled.final_state([0.3], initial_state=2)
+
+    unpickled = pickle.loads(pickle.dumps(compiled))
+    assert unpickled._buffers is None
+    numpy.testing.assert_allclose(
+            unpickled.final_state([0.3], initial_state=2), expected)
+
+
+def test_compiled_circuit_errors():
+    with pytest.raises(ValueError):
+        _ = CompiledCircuit(cirq.Circuit.from_ops(cirq.measure(a), cirq.X(a)))
+    with pytest.raises(ValueError):
+        _ = CompiledCircuit(cirq.Circuit.from_ops(
+            cirq.XPowGate(exponent=phi).on(a)), params=[theta])
+    with pytest.raises(ValueError):
+        _ = CompiledCircuit(cirq.Circuit.from_ops(
+            cirq.XPowGate(exponent=phi**2).on(a)), params=[theta])
+
+    compiled = CompiledCircuit(
+            cirq.Circuit.from_ops(cirq.XPowGate(exponent=theta).on(a)),
+            params=[theta])
+    with pytest.raises(ValueError):
+        _ = compiled.final_state([0.1, 0.2])
+    with pytest.raises(ValueError):
+        _ = compiled.final_state([0.1], initial_state=2)
+    with pytest.raises(ValueError):
+        _ = compiled.final_state([0.1], initial_state=numpy.ones(4))
+
+
+def test_compiled_circuit_expectation_gradient():
+    circuit = cirq.Circuit.from_ops(
+            [cirq.H(q) for q in (a, b, c)],
+            XXYYPowGate(exponent=theta).on(a, b),
+            cirq.CZPowGate(exponent=-phi, global_shift=-0.5).on(b, c),
+            YXXYPowGate(exponent=2 * phi + 0.1).on(c, a),
+            cirq.CNOT(a, b),
+            cirq.XPowGate(exponent=theta).on(c))
+    compiled = CompiledCircuit(circuit,
+                               params=[theta, phi],
+                               scale_factors=[1.5, -0.5])
+    hermitian = openfermion.random_hermitian_matrix(8, seed=5)
+    initial_state = openfermion.haar_random_vector(8, seed=3)
+
+    def expectation(values):
+        state = compiled.final_state(values, initial_state)
+        return numpy.vdot(state, hermitian.dot(state)).real
+
+    values = numpy.array([0.3, -0.8])
+    value, gradient = compiled.expectation_gradient(
+            values, hermitian.dot, initial_state)
+
+    step = 1e-6
+    finite_differences = [
+            (expectation(values + step * unit) -
+             expectation(values - step * unit)) / (2 * step)
+            for unit in numpy.eye(2)]
+    numpy.testing.assert_allclose(value, expectation(values))
+    numpy.testing.assert_allclose(gradient, finite_differences, atol=1e-6)
+
+
+def test_compiled_circuit_expectation_gradient_nonlinear_exponent():
+    compiled = CompiledCircuit(
+            cirq.Circuit.from_ops(cirq.XPowGate(exponent=theta**2).on(a)),
+            params=[theta])
+    with pytest.raises(TypeError):
+        _ = compiled.expectation_gradient([0.5], lambda state: state)
+
+
+def test_compiled_circuit_parameter_shift_rule():
+    circuit = cirq.Circuit.from_ops(
+            [cirq.H(q) for q in (a, b, c)],
+            XXYYPowGate(exponent=theta).on(a, b),
+            cirq.CZPowGate(exponent=-phi, global_shift=-0.5).on(b, c),
+            XXYYPowGate(exponent=2 * phi + 0.1).on(c, a),
+            cirq.CNOT(a, b),
+            cirq.ZPowGate(exponent=theta).on(c),
+            cirq.XPowGate(exponent=theta).on(a))
+    compiled = CompiledCircuit(circuit,
+                               params=[theta, phi],
+                               scale_factors=[1.5, -0.5])
+    exponent_shifts, weights = compiled.parameter_shift_rule()
+    # Four terms for each XXYYPowGate and two for each other gate
+    assert exponent_shifts.shape == (14, compiled.num_kernels)
+    assert weights.shape == (14, 2)
+
+    hermitian = openfermion.random_hermitian_matrix(8, seed=7)
+    initial_state = openfermion.haar_random_vector(8, seed=11)
+    values = numpy.array([0.3, -0.8])
+    final_states = compiled.final_states(
+            numpy.tile(values, (len(exponent_shifts), 1)),
+            initial_state,
+            exponent_shifts=exponent_shifts)
+    expectations = numpy.einsum(
+            'ij,ij->i', final_states.conj(),
+            hermitian.dot(final_states.T).T).real
+
+    _, expected_gradient = compiled.expectation_gradient(
+            values, hermitian.dot, initial_state)
+    numpy.testing.assert_allclose(expectations.dot(weights),
+                                  expected_gradient,
+                                  atol=1e-8)
+
+
+def test_compiled_circuit_parameter_shift_rule_errors():
+    compiled = CompiledCircuit(
+            cirq.Circuit.from_ops(cirq.XPowGate(exponent=theta**2).on(a)),
+            params=[theta])
+    with pytest.raises(TypeError):
+        _ = compiled.parameter_shift_rule()
+
+    compiled = CompiledCircuit(
+            cirq.Circuit.from_ops(rot111(theta).on(a, b, c)),
+            params=[theta])
+    with pytest.raises(ValueError):
+        _ = compiled.final_states([[0.5]], exponent_shifts=numpy.zeros((1, 2)))
+
+
+def test_compiled_circuit_number_sector():
+    d = cirq.LineQubit(3)
+    circuit = cirq.Circuit.from_ops(
+            XXYYPowGate(exponent=theta).on(a, b),
+            cirq.CZPowGate(exponent=phi).on(b, d),
+            YXXYPowGate(exponent=phi).on(c, a),
+            FSWAP(b, c),
+            cirq.ZPowGate(exponent=theta, global_shift=0.3).on(d),
+            cirq.ISWAP(d, a),
+            rot111(theta).on(a, c, d),
+            cirq.CNOT(a, b))
+    with pytest.raises(ValueError):
+        _ = CompiledCircuit(circuit, params=[theta, phi], n_particles=2)
+    with pytest.raises(ValueError):
+        _ = CompiledCircuit(
+                cirq.Circuit.from_ops(cirq.XPowGate(exponent=theta).on(a)),
+                params=[theta],
+                n_particles=1)
+
+    circuit = circuit[:-1]
+    full = CompiledCircuit(circuit, params=[theta, phi])
+    compiled = CompiledCircuit(circuit, params=[theta, phi], n_particles=2)
+    assert compiled.n_particles == 2
+    assert compiled.dimension == 6
+    numpy.testing.assert_array_equal(compiled.sector_indices,
+                                     [3, 5, 6, 9, 10, 12])
+
+    values = numpy.array([0.4, -1.1])
+    initial_state = numpy.zeros(16, dtype=complex)
+    initial_state[compiled.sector_indices] = openfermion.haar_random_vector(
+            6, seed=41)
+    numpy.testing.assert_allclose(
+            compiled.final_state(
+                values, initial_state[compiled.sector_indices]),
+            full.final_state(values, initial_state)[compiled.sector_indices],
+            atol=1e-8)
+    numpy.testing.assert_allclose(
+            compiled.final_state(values, 10),
+            full.final_state(values, 10)[compiled.sector_indices],
+            atol=1e-8)
+
+    hermitian = numpy.zeros((16, 16), dtype=complex)
+    hermitian[numpy.ix_(compiled.sector_indices, compiled.sector_indices)] = (
+            openfermion.random_hermitian_matrix(6, seed=8))
+    sector_hermitian = hermitian[numpy.ix_(compiled.sector_indices,
+                                           compiled.sector_indices)]
+    value, gradient = compiled.expectation_gradient(
+            values, sector_hermitian.dot, 9)
+    expected_value, expected_gradient = full.expectation_gradient(
+            values, hermitian.dot, 9)
+    numpy.testing.assert_allclose(value, expected_value, atol=1e-8)
+    numpy.testing.assert_allclose(gradient, expected_gradient, atol=1e-8)
+
+    with pytest.raises(ValueError):
+        _ = compiled.final_state(values, 7)
+    with pytest.raises(ValueError):
+        _ = compiled.final_state(values, initial_state)
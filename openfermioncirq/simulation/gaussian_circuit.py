@@ -0,0 +1,250 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Polynomial-time simulation of fermionic Gaussian circuits."""
+
+from typing import Tuple, TYPE_CHECKING
+
+import numpy
+
+import cirq
+import openfermion
+
+if TYPE_CHECKING:
+    # pylint: disable=unused-import
+    from typing import Dict, Hashable
+
+
+class GaussianCircuit:
+    r"""A fermionic Gaussian circuit compiled into its Majorana transformation.
+
+    Under the Jordan-Wigner Transform, with qubit i holding mode i, the
+    Majorana operators are
+
+    .. math::
+
+        \gamma_{2i} = a_i + a^\dagger_i, \quad
+        \gamma_{2i + 1} = -i (a_i - a^\dagger_i).
+
+    A Gaussian unitary :math:`U` maps them to linear combinations of
+    themselves, :math:`U^\dagger \gamma_a U = \sum_b R_{ab} \gamma_b` with
+    :math:`R` a real orthogonal matrix. Compiling a circuit multiplies the
+    matrices of its operations together in O(N) time per operation, so the
+    circuit is never simulated on the 2**N dimensional state space. The
+    operations produced by `bogoliubov_transform`, `prepare_gaussian_state`,
+    `prepare_slater_determinant`, `ffft` and `optimal_givens_decomposition`
+    are all of this kind: `Ryxxy`, `XXYYPowGate`, `FSwapPowGate` and
+    `cirq.Rz`, and the particle-hole transformation `cirq.X` on the last
+    qubit. Number-conserving circuits have a block structure that reduces to
+    the N x N transformation of the creation operators, but the 2N x 2N form
+    is used for all circuits.
+
+    Operations acting on more than two qubits are decomposed. Any operation
+    on one qubit, or on two qubits adjacent in the qubit order, whose
+    unitary maps Majorana operators to linear combinations of Majorana
+    operators is accepted.
+
+    Attributes:
+        qubits: The qubits of the circuit, in the order of the modes.
+        majorana_transformation: The 2N x 2N real orthogonal matrix :math:`R`.
+    """
+
+    def __init__(self,
+                 circuit: cirq.Circuit,
+                 qubit_order: cirq.QubitOrderOrList=cirq.QubitOrder.DEFAULT
+                 ) -> None:
+        """
+        Args:
+            circuit: The circuit to compile. It must not have parameters.
+            qubit_order: Determines the order of the modes.
+
+        Raises:
+            ValueError: The circuit is parameterized, or contains an operation
+                without a unitary matrix, or that is not Gaussian, or that
+                acts on two qubits that are not adjacent in the qubit order.
+        """
+        if any(cirq.is_parameterized(op) for op in circuit.all_operations()):
+            raise ValueError('Cannot compile a parameterized circuit.')
+
+        self.qubits = tuple(
+                cirq.QubitOrder.as_qubit_order(qubit_order).order_for(
+                    circuit.all_qubits()))
+        self.majorana_transformation = numpy.eye(2 * len(self.qubits))
+
+        mode_of = {qubit: i for i, qubit in enumerate(self.qubits)}
+        cache = {}  # type: Dict[Hashable, Tuple[numpy.ndarray, int]]
+        for op in cirq.decompose(
+                circuit.all_operations(),
+                keep=lambda op: (len(op.qubits) <= 2 and
+                                 cirq.has_unitary(op))):
+            if not op.qubits:
+                continue
+            modes = [mode_of[qubit] for qubit in op.qubits]
+            if len(modes) == 2 and abs(modes[0] - modes[1]) != 1:
+                raise ValueError(
+                        'Operation {!r} acts on qubits that are not adjacent '
+                        'in the qubit order.'.format(op))
+            reverse = len(modes) == 2 and modes[0] > modes[1]
+            key = (op.gate, reverse)
+            if op.gate is None or not _is_hashable(key):
+                local, parity = _local_transformation(op, reverse)
+            else:
+                if key not in cache:
+                    cache[key] = _local_transformation(op, reverse)
+                local, parity = cache[key]
+            self._apply(min(modes), local, parity)
+
+    @property
+    def num_qubits(self) -> int:
+        return len(self.qubits)
+
+    def covariance_matrix(self, initial_state: int=0) -> numpy.ndarray:
+        r"""The Majorana covariance matrix of the final state.
+
+        The covariance matrix is the real antisymmetric matrix with entries
+        :math:`\Gamma_{ab} = \frac{i}{2} \langle [\gamma_a, \gamma_b] \rangle`.
+        In the vacuum, :math:`\Gamma_{2i, 2i + 1} = -1`.
+
+        Args:
+            initial_state: The index of the computational basis state the
+                circuit is applied to, in big endian order.
+        """
+        n_modes = self.num_qubits
+        if not 0 <= initial_state < 1 << n_modes:
+            raise ValueError(
+                    'Initial state {} is not a computational basis state of '
+                    '{} qubits.'.format(initial_state, n_modes))
+        occupations = numpy.array(
+                [initial_state >> (n_modes - 1 - i) & 1
+                 for i in range(n_modes)])
+        initial = numpy.zeros((2 * n_modes, 2 * n_modes))
+        initial[0::2, 1::2] = numpy.diag(2 * occupations - 1)
+        initial[1::2, 0::2] = -numpy.diag(2 * occupations - 1)
+        transformation = self.majorana_transformation
+        return transformation.dot(initial).dot(transformation.T)
+
+    def correlation_matrices(self, initial_state: int=0
+                             ) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        r"""The one-body correlation matrices of the final state.
+
+        Args:
+            initial_state: The index of the computational basis state the
+                circuit is applied to, in big endian order.
+
+        Returns:
+            A tuple (C, D) of N x N matrices with entries
+            :math:`C_{pq} = \langle a^\dagger_p a_q \rangle` and
+            :math:`D_{pq} = \langle a_p a_q \rangle`.
+        """
+        # The expectation values of products of two Majorana operators
+        products = (numpy.eye(2 * self.num_qubits) -
+                    1j * self.covariance_matrix(initial_state))
+        even_even = products[0::2, 0::2]
+        even_odd = products[0::2, 1::2]
+        odd_even = products[1::2, 0::2]
+        odd_odd = products[1::2, 1::2]
+        one_body = 0.25 * (even_even + 1j * even_odd - 1j * odd_even + odd_odd)
+        pairing = 0.25 * (even_even + 1j * even_odd + 1j * odd_even - odd_odd)
+        return one_body, pairing
+
+    def energy(self,
+               hamiltonian: openfermion.QuadraticHamiltonian,
+               initial_state: int=0) -> float:
+        """The energy of a quadratic Hamiltonian in the final state.
+
+        Args:
+            hamiltonian: A Hamiltonian on the modes of the circuit.
+            initial_state: The index of the computational basis state the
+                circuit is applied to, in big endian order.
+        """
+        if hamiltonian.n_qubits != self.num_qubits:
+            raise ValueError(
+                    'Expected a Hamiltonian on {} modes but got one on '
+                    '{}.'.format(self.num_qubits, hamiltonian.n_qubits))
+        one_body, pairing = self.correlation_matrices(initial_state)
+        energy = numpy.sum(hamiltonian.combined_hermitian_part * one_body)
+        if not hamiltonian.conserves_particle_number:
+            energy += numpy.sum(hamiltonian.antisymmetric_part *
+                                numpy.conjugate(pairing.T))
+        return float(numpy.real(energy) + hamiltonian.constant)
+
+    def _apply(self, mode: int, local: numpy.ndarray, parity: int) -> None:
+        rows = slice(2 * mode, 2 * mode + len(local))
+        transformation = self.majorana_transformation
+        transformation[rows] = local.dot(transformation[rows])
+        if parity < 0:
+            # The Jordan-Wigner strings of the later modes go through the
+            # qubits acted on
+            transformation[rows.stop:] *= -1
+
+
+def _local_transformation(op: cirq.Operation,
+                          reverse: bool) -> Tuple[numpy.ndarray, int]:
+    """The action of an operation on the Majorana operators of its modes.
+
+    Returns:
+        A tuple (local, parity). local is the orthogonal matrix mapping the
+        Majorana operators of the modes acted on, and parity is 1 if the
+        operation commutes with the parity of those modes and -1 if it
+        anticommutes with it.
+
+    Raises:
+        ValueError: The operation is not Gaussian.
+    """
+    unitary = cirq.unitary(op)
+    if reverse:
+        swap = cirq.unitary(cirq.SWAP)
+        unitary = swap.dot(unitary).dot(swap)
+    majoranas, parity_operator = _LOCAL_MAJORANAS[len(op.qubits)]
+
+    adjoint = unitary.conj().T
+    local = numpy.array(
+            [[numpy.trace(adjoint.dot(m_a).dot(unitary).dot(m_b))
+              for m_b in majoranas]
+             for m_a in majoranas]) / len(unitary)
+    parity = numpy.trace(adjoint.dot(parity_operator).dot(unitary).dot(
+        parity_operator)) / len(unitary)
+
+    if (not numpy.allclose(local.imag, 0, atol=_GAUSSIAN_TOLERANCE) or
+            not numpy.allclose(local.real.dot(local.real.T),
+                               numpy.eye(len(local)),
+                               atol=_GAUSSIAN_TOLERANCE) or
+            not numpy.isclose(abs(parity), 1, atol=_GAUSSIAN_TOLERANCE)):
+        raise ValueError('Operation {!r} is not Gaussian.'.format(op))
+    return local.real, 1 if parity.real > 0 else -1
+
+
+def _is_hashable(value) -> bool:
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+
+_PAULI_X = numpy.array([[0, 1], [1, 0]], dtype=complex)
+_PAULI_Y = numpy.array([[0, -1j], [1j, 0]], dtype=complex)
+_PAULI_Z = numpy.array([[1, 0], [0, -1]], dtype=complex)
+
+# The Majorana operators of the modes acted on by an operation on one or two
+# adjacent qubits, omitting the Jordan-Wigner string of the earlier modes, and
+# the parity of those modes
+_LOCAL_MAJORANAS = {
+    1: ([_PAULI_X, _PAULI_Y], _PAULI_Z),
+    2: ([numpy.kron(_PAULI_X, numpy.eye(2)),
+         numpy.kron(_PAULI_Y, numpy.eye(2)),
+         numpy.kron(_PAULI_Z, _PAULI_X),
+         numpy.kron(_PAULI_Z, _PAULI_Y)],
+        numpy.kron(_PAULI_Z, _PAULI_Z)),
+}
+
+_GAUSSIAN_TOLERANCE = 1e-8
@@ -0,0 +1,156 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy
+import pytest
+import sympy
+
+import cirq
+import openfermion
+
+from openfermioncirq import (
+        FSWAP,
+        XXYYPowGate,
+        Ryxxy,
+        bogoliubov_transform,
+        ffft,
+        prepare_gaussian_state,
+        prepare_slater_determinant)
+from openfermioncirq.primitives.optimal_givens_decomposition import (
+        optimal_givens_decomposition)
+from openfermioncirq.simulation import GaussianCircuit
+
+
+def correlation_matrices_of_state(state, n_modes):
+    one_body = numpy.zeros((n_modes, n_modes), dtype=complex)
+    pairing = numpy.zeros((n_modes, n_modes), dtype=complex)
+    for p in range(n_modes):
+        for q in range(n_modes):
+            for matrix, action in ((one_body, 1), (pairing, 0)):
+                operator = openfermion.get_sparse_operator(
+                        openfermion.jordan_wigner(openfermion.FermionOperator(
+                            ((p, action), (q, 0)))),
+                        n_qubits=n_modes)
+                matrix[p, q] = numpy.vdot(state, operator.dot(state))
+    return one_body, pairing
+
+
+def assert_matches_state_vector(circuit, qubits, initial_state=0):
+    gaussian = GaussianCircuit(circuit, qubit_order=qubits)
+    state = circuit.apply_unitary_effect_to_state(initial_state,
+                                                  qubit_order=qubits)
+    one_body, pairing = gaussian.correlation_matrices(initial_state)
+    expected_one_body, expected_pairing = correlation_matrices_of_state(
+            state, len(qubits))
+    numpy.testing.assert_allclose(one_body, expected_one_body, atol=1e-7)
+    numpy.testing.assert_allclose(pairing, expected_pairing, atol=1e-7)
+
+
+@pytest.mark.parametrize('initial_state', [0, 0b1010, 0b0111])
+def test_gaussian_circuit_gates(initial_state):
+    a, b, c, d = qubits = cirq.LineQubit.range(4)
+    circuit = cirq.Circuit.from_ops(
+            Ryxxy(0.3).on(a, b),
+            XXYYPowGate(exponent=0.7).on(c, b),
+            cirq.Rz(1.1).on(c),
+            FSWAP(c, d),
+            FSWAP(a, b)**0.4,
+            cirq.X(d),
+            Ryxxy(-0.8).on(c, d),
+            cirq.X(b),
+            cirq.Z(a)**0.25)
+    assert_matches_state_vector(circuit, qubits, initial_state)
+
+    gaussian = GaussianCircuit(circuit, qubit_order=qubits)
+    transformation = gaussian.majorana_transformation
+    numpy.testing.assert_allclose(transformation.dot(transformation.T),
+                                  numpy.eye(8), atol=1e-8)
+    covariance = gaussian.covariance_matrix(initial_state)
+    numpy.testing.assert_allclose(covariance, -covariance.T, atol=1e-8)
+
+
+@pytest.mark.parametrize('n_qubits, real, particle_conserving', [
+    (4, True, True), (5, False, True), (4, False, False), (5, True, False)])
+def test_gaussian_circuit_bogoliubov_transform(
+        n_qubits, real, particle_conserving):
+    qubits = cirq.LineQubit.range(n_qubits)
+    if particle_conserving:
+        matrix = openfermion.random_unitary_matrix(n_qubits, real=real)
+    else:
+        quad_ham = openfermion.random_quadratic_hamiltonian(
+                n_qubits, real=real)
+        _, matrix, _ = quad_ham.diagonalizing_bogoliubov_transform()
+    circuit = cirq.Circuit.from_ops(bogoliubov_transform(qubits, matrix))
+    assert_matches_state_vector(circuit, qubits, initial_state=0b1001)
+
+
+def test_gaussian_circuit_optimal_givens_decomposition():
+    qubits = cirq.LineQubit.range(4)
+    unitary = openfermion.random_unitary_matrix(4, real=False)
+    circuit = cirq.Circuit.from_ops(
+            optimal_givens_decomposition(qubits, unitary))
+    assert_matches_state_vector(circuit, qubits, initial_state=0b1100)
+
+
+def test_gaussian_circuit_ffft():
+    qubits = cirq.LineQubit.range(4)
+    circuit = cirq.Circuit.from_ops(cirq.X(qubits[1]), ffft(qubits))
+    assert_matches_state_vector(circuit, qubits)
+
+
+@pytest.mark.parametrize('n_qubits, conserves_particle_number', [
+    (6, True), (6, False), (40, True), (40, False)])
+def test_gaussian_circuit_ground_energy(n_qubits, conserves_particle_number):
+    qubits = cirq.LineQubit.range(n_qubits)
+    quad_ham = openfermion.random_quadratic_hamiltonian(
+            n_qubits, conserves_particle_number, real=False, seed=n_qubits)
+    circuit = cirq.Circuit.from_ops(prepare_gaussian_state(qubits, quad_ham))
+    gaussian = GaussianCircuit(circuit, qubit_order=qubits)
+    numpy.testing.assert_allclose(gaussian.energy(quad_ham),
+                                  quad_ham.ground_energy(),
+                                  atol=1e-7)
+
+
+def test_gaussian_circuit_slater_determinant():
+    n_qubits, n_occupied = 30, 12
+    qubits = cirq.LineQubit.range(n_qubits)
+    orbitals = openfermion.random_unitary_matrix(n_qubits, real=False,
+                                                 seed=5)[:n_occupied]
+    circuit = cirq.Circuit.from_ops(
+            prepare_slater_determinant(qubits, orbitals))
+    one_body, pairing = GaussianCircuit(
+            circuit, qubit_order=qubits).correlation_matrices()
+    # The one-body density matrix projects onto the occupied orbitals
+    numpy.testing.assert_allclose(one_body.dot(one_body), one_body, atol=1e-7)
+    numpy.testing.assert_allclose(one_body, one_body.conj().T, atol=1e-7)
+    numpy.testing.assert_allclose(numpy.trace(one_body), n_occupied)
+    numpy.testing.assert_allclose(pairing, 0, atol=1e-7)
+
+
+def test_gaussian_circuit_errors():
+    a, b, c = cirq.LineQubit.range(3)
+    with pytest.raises(ValueError):
+        _ = GaussianCircuit(cirq.Circuit.from_ops(cirq.CZ(a, b)))
+    with pytest.raises(ValueError):
+        _ = GaussianCircuit(cirq.Circuit.from_ops(cirq.H(a)))
+    with pytest.raises(ValueError):
+        _ = GaussianCircuit(cirq.Circuit.from_ops(FSWAP(a, c)),
+                            qubit_order=[a, b, c])
+    with pytest.raises(ValueError):
+        _ = GaussianCircuit(cirq.Circuit.from_ops(
+            Ryxxy(sympy.Symbol('theta')).on(a, b)))
+
+    gaussian = GaussianCircuit(cirq.Circuit.from_ops(FSWAP(a, b)))
+    with pytest.raises(ValueError):
+        _ = gaussian.covariance_matrix(initial_state=4)
+    with pytest.raises(ValueError):
+        _ = gaussian.energy(openfermion.random_quadratic_hamiltonian(3))
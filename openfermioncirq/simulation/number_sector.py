@@ -0,0 +1,141 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Subspaces of states with a fixed number of particles."""
+
+from typing import List, Tuple, TYPE_CHECKING
+
+import itertools
+
+import numpy
+
+if TYPE_CHECKING:
+    # pylint: disable=unused-import
+    from typing import Dict
+
+
+class NumberSector:
+    """The computational basis states with a fixed number of particles.
+
+    A particle is a qubit in the state 1. Bit n_qubits - 1 - i of the index of
+    a basis state is the value of qubit i, as in openfermion, and the basis
+    states are sorted by index, so a state vector of the sector is the
+    restriction of a state vector to the entries in `basis`. Note that
+    openfermion.jw_number_restrict_operator orders basis states differently.
+
+    Attributes:
+        n_qubits: The number of qubits.
+        n_particles: The number of particles.
+        basis: The sorted indices of the computational basis states with
+            n_particles particles.
+    """
+
+    def __init__(self, n_qubits: int, n_particles: int) -> None:
+        """
+        Raises:
+            ValueError: The number of particles is negative or larger than
+                the number of qubits.
+        """
+        if not 0 <= n_particles <= n_qubits:
+            raise ValueError('Cannot have {} particles on {} qubits.'.format(
+                n_particles, n_qubits))
+        self.n_qubits = n_qubits
+        self.n_particles = n_particles
+        self.basis = numpy.sort(numpy.array(
+            [sum(1 << (n_qubits - 1 - axis) for axis in axes)
+             for axes in itertools.combinations(range(n_qubits), n_particles)],
+            dtype=numpy.int64))
+        self._tables = {}  # type: Dict[Tuple[int, ...], _Tables]
+
+    @property
+    def dimension(self) -> int:
+        return len(self.basis)
+
+    def position(self, index: int) -> int:
+        """The position of a computational basis state in the basis.
+
+        Raises:
+            ValueError: The basis state does not have n_particles particles.
+        """
+        position = numpy.searchsorted(self.basis, index)
+        if position == len(self.basis) or self.basis[position] != index:
+            raise ValueError(
+                    'Basis state {} does not have {} particles.'.format(
+                        index, self.n_particles))
+        return int(position)
+
+    def check_conserves_number(self, matrix: numpy.ndarray) -> None:
+        """Checks that a matrix acting on some of the qubits conserves the
+        number of particles.
+
+        Raises:
+            ValueError: The matrix maps a computational basis state to states
+                with a different number of particles.
+        """
+        weights = numpy.array([bin(i).count('1') for i in range(len(matrix))])
+        if numpy.any(numpy.abs(matrix[weights[:, numpy.newaxis] !=
+                                      weights]) > _NUMBER_TOLERANCE):
+            raise ValueError(
+                    'Operation does not conserve the number of particles.')
+
+    def tables(self, axes: Tuple[int, ...]) -> '_Tables':
+        """Index tables for an operation acting on some of the qubits.
+
+        Args:
+            axes: The indices of the qubits acted on, in the order of the
+                matrix of the operation.
+
+        Returns:
+            A tuple (local_states, blocks). The i-th entry of local_states is
+            the index of the state of the qubits acted on, in the i-th basis
+            state. Each entry of blocks is a pair (block_states,
+            indices) for the local states with a given number of particles:
+            block_states lists the local states, and each row of indices
+            holds the positions of the basis states that only differ in
+            their local state, in the order of block_states. Tables are
+            computed once for each tuple of axes.
+        """
+        if axes not in self._tables:
+            self._tables[axes] = self._compute_tables(axes)
+        return self._tables[axes]
+
+    def _compute_tables(self, axes: Tuple[int, ...]) -> '_Tables':
+        n_local = len(axes)
+        bits = [1 << (self.n_qubits - 1 - axis) for axis in axes]
+        local_states = numpy.zeros(len(self.basis), dtype=numpy.intp)
+        for bit in bits:
+            local_states <<= 1
+            local_states |= (self.basis & bit) != 0
+        other_qubits = self.basis & ~sum(bits)
+
+        blocks = []
+        for weight in range(n_local + 1):
+            block_states = [state for state in range(1 << n_local)
+                            if bin(state).count('1') == weight]
+            rows = other_qubits[local_states == block_states[0]]
+            if not len(rows):
+                continue
+            indices = numpy.empty((len(rows), len(block_states)),
+                                  dtype=numpy.intp)
+            for column, block_state in enumerate(block_states):
+                local_bits = sum(bit for i, bit in enumerate(bits)
+                                 if block_state >> (n_local - 1 - i) & 1)
+                indices[:, column] = numpy.searchsorted(
+                        self.basis, rows | local_bits)
+            blocks.append((numpy.array(block_states), indices))
+        return local_states.astype(numpy.intp), blocks
+
+
+# The index tables of an operation, as returned by NumberSector.tables
+_Tables = Tuple[numpy.ndarray, List[Tuple[numpy.ndarray, numpy.ndarray]]]
+
+_NUMBER_TOLERANCE = 1e-8
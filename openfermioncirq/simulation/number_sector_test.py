@@ -0,0 +1,59 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy
+import pytest
+
+import cirq
+
+from openfermioncirq.simulation import NumberSector
+
+
+def test_number_sector_basis():
+    sector = NumberSector(4, 2)
+    numpy.testing.assert_array_equal(sector.basis, [3, 5, 6, 9, 10, 12])
+    assert sector.dimension == 6
+    assert sector.position(9) == 3
+    assert NumberSector(3, 0).dimension == 1
+    assert NumberSector(3, 3).dimension == 1
+
+    with pytest.raises(ValueError):
+        _ = sector.position(7)
+    with pytest.raises(ValueError):
+        _ = sector.position(16)
+    with pytest.raises(ValueError):
+        _ = NumberSector(3, 4)
+
+
+def test_number_sector_tables():
+    sector = NumberSector(4, 2)
+    local_states, blocks = sector.tables((2, 0))
+    # Bit 1 of the local state is qubit 2 and bit 0 is qubit 0
+    numpy.testing.assert_array_equal(local_states, [2, 0, 2, 1, 3, 1])
+    assert sector.tables((2, 0)) is sector.tables((2, 0))
+
+    block_states = [list(states) for states, _ in blocks]
+    assert block_states == [[0], [1, 2], [3]]
+    _, indices = blocks[1]
+    # 1001 and 0011 differ only in qubits 0 and 2, as do 1100 and 0110
+    numpy.testing.assert_array_equal(sorted(map(list, indices)),
+                                     [[3, 0], [5, 2]])
+
+
+def test_number_sector_check_conserves_number():
+    sector = NumberSector(4, 2)
+    sector.check_conserves_number(cirq.unitary(cirq.ISWAP))
+    sector.check_conserves_number(cirq.unitary(cirq.CZ))
+    with pytest.raises(ValueError):
+        sector.check_conserves_number(cirq.unitary(cirq.CNOT))
+    with pytest.raises(ValueError):
+        sector.check_conserves_number(cirq.unitary(cirq.H))
@@ -0,0 +1,247 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A matrix-free linear operator for sums of Pauli strings."""
+
+from typing import Iterator, Optional, Tuple, TYPE_CHECKING
+
+import numpy
+import scipy.linalg
+import scipy.sparse
+import scipy.sparse.linalg
+
+import openfermion
+
+from openfermioncirq.simulation.number_sector import NumberSector
+
+if TYPE_CHECKING:
+    # pylint: disable=unused-import
+    from typing import Dict, List
+
+
+class PauliMaskOperator(scipy.sparse.linalg.LinearOperator):
+    """A QubitOperator compiled into bitmasks of its Pauli strings.
+
+    A Pauli string maps the computational basis state with index k to
+    phase(k) times the basis state with index k ^ x, where the bits of x mark
+    the qubits acted on by X or Y, and the phase only depends on the parity of
+    k & z, where the bits of z mark the qubits acted on by Y or Z. The terms
+    of the operator are grouped by x, so applying the operator to a state
+    vector amounts to one gather of the state at the indices k ^ x for each
+    group, multiplied by the diagonal obtained by summing the phases of the
+    group. The diagonals are computed on the fly rather than stored: writing
+    indices as pairs of their high and low bits, the sign
+    (-1)**parity(k & z) is the product of entries of two Hadamard matrices of
+    dimension about 2**(n_qubits / 2), so the diagonal of a group with t
+    terms is a product of a t by 2**(n_qubits / 2) matrix with another. The
+    scratch memory is a few vectors of length 2**n_qubits.
+
+    If the number of particles is specified, the operator is restricted to the
+    subspace of states with that number of qubits in the state 1, which it
+    must conserve, and acts on the state vectors of a `NumberSector`. The
+    phases are then computed from the parities of the basis states of the
+    sector, so no array of length 2**n_qubits is created.
+
+    Qubits are ordered as in openfermion: qubit 0 is the most significant bit
+    of the index of a basis state.
+
+    Attributes:
+        n_qubits: The number of qubits acted on.
+        n_particles: The number of particles of the states acted on, or None
+            if the operator acts on the whole state space.
+        x_masks: The X masks of the groups of terms.
+    """
+
+    def __init__(self,
+                 qubit_operator: openfermion.QubitOperator,
+                 n_qubits: Optional[int]=None,
+                 n_particles: Optional[int]=None) -> None:
+        """
+        Args:
+            qubit_operator: The operator to compile.
+            n_qubits: The number of qubits. Defaults to the number of qubits
+                acted on by the operator.
+            n_particles: If specified, the operator acts on the states with
+                this number of particles.
+
+        Raises:
+            ValueError: The operator acts on a qubit whose index is not
+                smaller than `n_qubits`.
+        """
+        if n_qubits is None:
+            n_qubits = openfermion.count_qubits(qubit_operator)
+        self.n_qubits = n_qubits
+        self.n_particles = n_particles
+        self._sector = (None if n_particles is None
+                        else NumberSector(n_qubits, n_particles))
+
+        groups = {}  # type: Dict[int, Dict[int, complex]]
+        for term, coefficient in qubit_operator.terms.items():
+            x_mask, z_mask, n_y = 0, 0, 0
+            for qubit, pauli in term:
+                if qubit >= n_qubits:
+                    raise ValueError(
+                            'Qubit {} is out of range for {} qubits.'.format(
+                                qubit, n_qubits))
+                bit = 1 << (n_qubits - 1 - qubit)
+                if pauli in 'XY':
+                    x_mask |= bit
+                if pauli in 'YZ':
+                    z_mask |= bit
+                if pauli == 'Y':
+                    n_y += 1
+            # Y = iXZ, and the Z part acts before the X part, on k ^ x, so
+            # the parity of x & z is absorbed into the phase
+            phase = coefficient * 1j**n_y * (-1)**_parity(x_mask & z_mask)
+            group = groups.setdefault(x_mask, {})
+            group[z_mask] = group.get(z_mask, 0) + phase
+
+        self.x_masks = tuple(sorted(groups))
+        self._n_low_qubits = n_qubits - n_qubits // 2
+        low_mask = (1 << self._n_low_qubits) - 1
+        self._groups = []  # type: List[Tuple[numpy.ndarray, ...]]
+        self._z_masks = []  # type: List[numpy.ndarray]
+        for x_mask in self.x_masks:
+            z_masks = numpy.array(list(groups[x_mask].keys()),
+                                  dtype=numpy.int64)
+            phases = numpy.array(list(groups[x_mask].values()),
+                                 dtype=complex)
+            self._groups.append((z_masks >> self._n_low_qubits,
+                                 z_masks & low_mask,
+                                 phases))
+            self._z_masks.append(z_masks)
+
+        if self._sector is None:
+            self._high_signs = scipy.linalg.hadamard(
+                    1 << (n_qubits // 2), dtype=float)
+            self._low_signs = scipy.linalg.hadamard(
+                    1 << self._n_low_qubits, dtype=float)
+
+        dimension = (1 << n_qubits if self._sector is None
+                     else self._sector.dimension)
+        super().__init__(dtype=complex, shape=(dimension, dimension))
+
+    @property
+    def num_terms(self) -> int:
+        return sum(len(phases) for _, _, phases in self._groups)
+
+    def _matvec(self, x: numpy.ndarray) -> numpy.ndarray:
+        return self._apply(x.reshape(-1))
+
+    def _matmat(self, x: numpy.ndarray) -> numpy.ndarray:
+        return self._apply(x)
+
+    def _apply(self, states: numpy.ndarray) -> numpy.ndarray:
+        """Applies the operator to a vector or to the columns of a matrix."""
+        if self._sector is not None:
+            return self._apply_sector(states)
+        dimension = self.shape[0]
+        indices = numpy.arange(dimension, dtype=numpy.int64)
+        gathered_indices = numpy.empty_like(indices)
+        result = numpy.zeros(states.shape, dtype=complex)
+        broadcast_shape = (dimension,) + (1,) * (states.ndim - 1)
+
+        for x_mask, group in zip(self.x_masks, self._groups):
+            diagonal = self._diagonal(*group).reshape(broadcast_shape)
+            if x_mask:
+                numpy.bitwise_xor(indices, x_mask, out=gathered_indices)
+                result += diagonal * states[gathered_indices]
+            else:
+                result += diagonal * states
+        return result
+
+    def _apply_sector(self, states: numpy.ndarray) -> numpy.ndarray:
+        """Applies the operator to vectors of the number sector."""
+        result = numpy.zeros(states.shape, dtype=complex)
+        for rows, columns, values in self._sector_entries():
+            values = values.reshape((len(rows),) + (1,) * (states.ndim - 1))
+            result[rows] += values * states[columns]
+        return result
+
+    def _sector_entries(self) -> Iterator[Tuple[numpy.ndarray,
+                                                numpy.ndarray,
+                                                numpy.ndarray]]:
+        """Yields the nonzero matrix entries of each group of terms on the
+        number sector, as arrays of rows, columns and values."""
+        basis = self._sector.basis  # type: ignore
+        for x_mask, z_masks, (_, _, phases) in zip(
+                self.x_masks, self._z_masks, self._groups):
+            targets = basis ^ x_mask
+            positions = numpy.searchsorted(basis, targets)
+            positions[positions == len(basis)] = 0
+            rows = numpy.flatnonzero(basis[positions] == targets)
+            if not len(rows):
+                continue
+
+            # The diagonal at the basis states of the rows, summed over
+            # chunks of terms
+            row_states = basis[rows]
+            chunk_size = max(1, _SCRATCH_SIZE // len(rows))
+            values = numpy.zeros(len(rows), dtype=complex)
+            for start in range(0, len(phases), chunk_size):
+                end = start + chunk_size
+                values += phases[start:end].dot(_parity_signs(
+                        z_masks[start:end, numpy.newaxis] & row_states))
+            yield rows, positions[rows], values
+
+    def sparse_matrix(self) -> scipy.sparse.csc_matrix:
+        """The matrix of the operator as a sparse matrix.
+
+        On a number sector, the entries are computed on the sector directly,
+        without building the matrix on the whole state space.
+        """
+        if self._sector is None:
+            indices = numpy.arange(self.shape[0], dtype=numpy.int64)
+            entries = ((indices, indices ^ x_mask,
+                        self._diagonal(*group).reshape(-1))
+                       for x_mask, group in zip(self.x_masks, self._groups)
+                       )  # type: Iterator[Tuple[numpy.ndarray, ...]]
+        else:
+            entries = self._sector_entries()
+        rows, columns, values = [], [], []  # type: Tuple[List, List, List]
+        for group_rows, group_columns, group_values in entries:
+            rows.append(group_rows)
+            columns.append(group_columns)
+            values.append(group_values)
+        if not values:
+            return scipy.sparse.csc_matrix(self.shape, dtype=complex)
+        return scipy.sparse.csc_matrix(
+                (numpy.concatenate(values),
+                 (numpy.concatenate(rows), numpy.concatenate(columns))),
+                shape=self.shape)
+
+    def _diagonal(self,
+                  high_z_masks: numpy.ndarray,
+                  low_z_masks: numpy.ndarray,
+                  phases: numpy.ndarray) -> numpy.ndarray:
+        """Returns sum_z phase_z (-1)**parity(k & z) for every index k."""
+        high_signs = self._high_signs[high_z_masks] * phases[:, numpy.newaxis]
+        low_signs = self._low_signs[low_z_masks]
+        return high_signs.T.dot(low_signs)
+
+
+# The number of entries of the largest temporary array used to compute the
+# diagonal of a group of terms on a number sector
+_SCRATCH_SIZE = 1 << 20
+
+
+def _parity(mask: int) -> int:
+    return bin(mask).count('1') & 1
+
+
+def _parity_signs(masks: numpy.ndarray) -> numpy.ndarray:
+    """Returns (-1)**parity(mask) for each entry of an array of nonnegative
+    64-bit integers."""
+    masks = masks.copy()
+    for shift in (32, 16, 8, 4, 2, 1):
+        masks ^= masks >> shift
+    return 1.0 - 2.0 * (masks & 1)
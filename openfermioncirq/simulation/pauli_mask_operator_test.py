@@ -0,0 +1,106 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy
+import pytest
+
+import openfermion
+
+from openfermioncirq.simulation import NumberSector, PauliMaskOperator
+
+
+@pytest.mark.parametrize('qubit_operator, n_qubits', [
+    (openfermion.QubitOperator('Y0', 0.5j) +
+     openfermion.QubitOperator('', -1.0), None),
+    (openfermion.QubitOperator('X0 Y1 Z2', 0.3) +
+     openfermion.QubitOperator('Y0 Y2', -0.7) +
+     openfermion.QubitOperator('Z1 X3', 1.1 - 0.2j), 5),
+    (openfermion.jordan_wigner(
+        openfermion.random_interaction_operator(5, seed=20571)), None),
+    (openfermion.jordan_wigner(
+        openfermion.random_diagonal_coulomb_hamiltonian(6, seed=3418)), None),
+])
+def test_pauli_mask_operator_matches_sparse_operator(qubit_operator, n_qubits):
+    operator = PauliMaskOperator(qubit_operator, n_qubits)
+    sparse_operator = openfermion.get_sparse_operator(qubit_operator, n_qubits)
+    assert operator.shape == sparse_operator.shape
+    assert operator.num_terms == len(qubit_operator.terms)
+
+    numpy.random.seed(6421)
+    dimension = operator.shape[0]
+    vector = numpy.random.randn(dimension) + 1j * numpy.random.randn(dimension)
+    matrix = numpy.random.randn(dimension, 3)
+    numpy.testing.assert_allclose(operator.dot(vector),
+                                  sparse_operator.dot(vector),
+                                  atol=1e-10)
+    numpy.testing.assert_allclose(operator.dot(matrix),
+                                  sparse_operator.dot(matrix),
+                                  atol=1e-10)
+    numpy.testing.assert_allclose(
+            openfermion.expectation(operator, vector),
+            openfermion.expectation(sparse_operator, vector))
+
+
+@pytest.mark.parametrize('n_qubits, n_particles', [(5, 2), (6, 3), (6, 0)])
+def test_pauli_mask_operator_number_sector(n_qubits, n_particles):
+    qubit_operator = openfermion.jordan_wigner(
+            openfermion.random_interaction_operator(n_qubits, seed=9127))
+    operator = PauliMaskOperator(qubit_operator, n_particles=n_particles)
+    basis = NumberSector(n_qubits, n_particles).basis
+    sparse_operator = openfermion.get_sparse_operator(
+            qubit_operator)[basis][:, basis]
+    assert operator.shape == sparse_operator.shape
+
+    numpy.random.seed(23)
+    vector = (numpy.random.randn(len(basis)) +
+              1j * numpy.random.randn(len(basis)))
+    matrix = numpy.random.randn(len(basis), 2)
+    numpy.testing.assert_allclose(operator.dot(vector),
+                                  sparse_operator.dot(vector),
+                                  atol=1e-10)
+    numpy.testing.assert_allclose(operator.dot(matrix),
+                                  sparse_operator.dot(matrix),
+                                  atol=1e-10)
+
+
+@pytest.mark.parametrize('n_qubits, n_particles', [
+    (5, 2), (6, 3), (6, 0), (4, None)])
+def test_pauli_mask_operator_sparse_matrix(n_qubits, n_particles):
+    qubit_operator = openfermion.jordan_wigner(
+            openfermion.random_interaction_operator(n_qubits, seed=5531))
+    operator = PauliMaskOperator(qubit_operator, n_particles=n_particles)
+    expected = openfermion.get_sparse_operator(qubit_operator)
+    if n_particles is not None:
+        basis = NumberSector(n_qubits, n_particles).basis
+        expected = expected[basis][:, basis]
+    numpy.testing.assert_allclose(operator.sparse_matrix().toarray(),
+                                  expected.toarray(),
+                                  atol=1e-10)
+
+    empty = PauliMaskOperator(openfermion.QubitOperator('X0 X1'),
+                              n_particles=0)
+    assert empty.sparse_matrix().nnz == 0
+
+
+def test_pauli_mask_operator_groups_terms_by_x_mask():
+    operator = PauliMaskOperator(
+            openfermion.QubitOperator('X0 X1') +
+            openfermion.QubitOperator('Y0 Y1') +
+            openfermion.QubitOperator('Z0') +
+            openfermion.QubitOperator('Z1'))
+    assert operator.n_qubits == 2
+    assert operator.x_masks == (0, 3)
+
+
+def test_pauli_mask_operator_qubit_out_of_range():
+    with pytest.raises(ValueError):
+        _ = PauliMaskOperator(openfermion.QubitOperator('X3'), 2)
@@ -13,6 +13,8 @@
 from openfermioncirq.testing.example_classes import (
     ExampleAlgorithm,
     ExampleAnsatz,
+    ExampleAskTellAlgorithm,
+    ExampleAskTellOptimizer,
     ExampleBlackBox,
     ExampleBlackBoxNoisy,
     ExampleStatefulBlackBox,
@@ -12,7 +12,7 @@
 
 """Subclasses of abstract classes for use in tests."""
 
-from typing import Iterable, Optional, Sequence, Union, cast
+from typing import Iterable, List, Optional, Sequence, Union, cast
 
 import numpy
 import sympy
@@ -20,6 +20,9 @@ import sympy
 import cirq
 
 from openfermioncirq.optimization.algorithm import OptimizationAlgorithm
+from openfermioncirq.optimization.ask_tell import (
+        AskTellAlgorithm,
+        AskTellOptimizer)
 from openfermioncirq.optimization.black_box import BlackBox, StatefulBlackBox
 from openfermioncirq.optimization.result import OptimizationResult
 from openfermioncirq.variational.ansatz import VariationalAnsatz
@@ -72,6 +75,49 @@ class LazyAlgorithm(OptimizationAlgorithm):
                 message='success')
 
 
+class ExampleAskTellAlgorithm(AskTellAlgorithm):
+    """Proposes 5 random points and returns the best answer found."""
+
+    def optimizer(self,
+                  black_box: BlackBox,
+                  initial_guess: Optional[numpy.ndarray]=None,
+                  initial_guess_array: Optional[numpy.ndarray]=None
+                  ) -> AskTellOptimizer:
+        return ExampleAskTellOptimizer(black_box.dimension)
+
+
+class ExampleAskTellOptimizer(AskTellOptimizer):
+    """Proposes 5 random points and returns the best answer found."""
+
+    def __init__(self, dimension: int) -> None:
+        self.unasked = list(numpy.random.randn(5, dimension))
+        self.num_told = 0
+        self.opt = numpy.inf
+        self.opt_params = None  # type: Optional[numpy.ndarray]
+
+    def ask(self, n: int=1) -> List[numpy.ndarray]:
+        asked, self.unasked = self.unasked[:n], self.unasked[n:]
+        return asked
+
+    def tell(self, x: numpy.ndarray, value: float) -> None:
+        self.num_told += 1
+        if value < self.opt:
+            self.opt = value
+            self.opt_params = x
+
+    @property
+    def done(self) -> bool:
+        return self.num_told == 5
+
+    def result(self) -> OptimizationResult:
+        return OptimizationResult(
+                optimal_value=self.opt,
+                optimal_parameters=cast(numpy.ndarray, self.opt_params),
+                num_evaluations=self.num_told,
+                status=0,
+                message='success')
+
+
 class ExampleBlackBox(BlackBox):
     """Returns the sum of the squares of the inputs."""
 
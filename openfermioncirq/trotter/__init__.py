@@ -25,3 +25,5 @@ from openfermioncirq.trotter.algorithms import (
 from openfermioncirq.trotter.trotter_algorithm import (
     TrotterStep,
     TrotterAlgorithm)
+
+from openfermioncirq.trotter.trotter_evolution import TrotterEvolution
@@ -63,6 +63,7 @@ LINEAR_SWAP_NETWORK = LinearSwapNetworkTrotterAlgorithm()
 
 
 class SymmetricLinearSwapNetworkTrotterStep(TrotterStep):
+    depends_only_on_qubit_positions = True
 
     def trotter_step(
             self,
@@ -105,6 +106,7 @@ class SymmetricLinearSwapNetworkTrotterStep(TrotterStep):
 
 
 class ControlledSymmetricLinearSwapNetworkTrotterStep(TrotterStep):
+    depends_only_on_qubit_positions = True
 
     def trotter_step(
             self,
@@ -156,6 +158,7 @@ class ControlledSymmetricLinearSwapNetworkTrotterStep(TrotterStep):
                 -self.hamiltonian.constant * time).on(control_qubit)
 
 class AsymmetricLinearSwapNetworkTrotterStep(TrotterStep):
+    depends_only_on_qubit_positions = True
 
     def trotter_step(
             self,
@@ -202,6 +205,7 @@ class AsymmetricLinearSwapNetworkTrotterStep(TrotterStep):
 
 
 class ControlledAsymmetricLinearSwapNetworkTrotterStep(TrotterStep):
+    depends_only_on_qubit_positions = True
 
     def trotter_step(
             self,
@@ -100,6 +100,7 @@ LOW_RANK = LowRankTrotterAlgorithm()
 
 
 class LowRankTrotterStep(TrotterStep):
+    depends_only_on_qubit_positions = True
 
     def __init__(self,
                  hamiltonian: openfermion.InteractionOperator,
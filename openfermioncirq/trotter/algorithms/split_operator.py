@@ -59,6 +59,7 @@ SPLIT_OPERATOR = SplitOperatorTrotterAlgorithm()
 
 
 class SplitOperatorTrotterStep(TrotterStep):
+    depends_only_on_qubit_positions = True
 
     def __init__(self, hamiltonian: DiagonalCoulombHamiltonian) -> None:
         quad_ham = QuadraticHamiltonian(hamiltonian.one_body)
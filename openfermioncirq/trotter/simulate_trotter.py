@@ -12,7 +12,7 @@
 
 """Perform Hamiltonian simulation via a Trotter-Suzuki product formula."""
 
-from typing import Optional, Sequence
+from typing import Iterator, Optional, Sequence, Tuple, TYPE_CHECKING
 
 import cirq
 from openfermion import DiagonalCoulombHamiltonian, InteractionOperator
@@ -25,6 +25,10 @@ from openfermioncirq.trotter.algorithms import (
         LINEAR_SWAP_NETWORK,
         LOW_RANK)
 
+if TYPE_CHECKING:
+    # pylint: disable=unused-import
+    from typing import Dict, Hashable
+
 
 def simulate_trotter(qubits: Sequence[cirq.Qid],
                      hamiltonian: Hamiltonian,
@@ -80,6 +84,19 @@ def simulate_trotter(qubits: Sequence[cirq.Qid],
             reversed in the final wavefunction.
     """
     # TODO Document gate complexities of algorithm options
+    trotter_step = _trotter_step_for(
+            hamiltonian, order, algorithm,
+            controlled = control_qubit is not None)
+    yield _trotter_segments(qubits, time, n_steps, order, trotter_step,
+                            control_qubit, omit_final_swaps)
+
+
+def _trotter_step_for(hamiltonian: Hamiltonian,
+                      order: int,
+                      algorithm: Optional[TrotterAlgorithm],
+                      controlled: bool) -> TrotterStep:
+    """Checks the arguments of simulate_trotter and selects the Trotter step
+    to use."""
     if order < 0:
         raise ValueError('The order of the Trotter formula must be at least 0.')
 
@@ -93,19 +110,31 @@ def simulate_trotter(qubits: Sequence[cirq.Qid],
                     type(hamiltonian).__name__,
                     {cls.__name__ for cls in algorithm.supported_types}))
 
-    # Select the Trotter step to use
-    trotter_step = _select_trotter_step(
-            hamiltonian, order, algorithm,
-            controlled = control_qubit is not None)
+    return _select_trotter_step(hamiltonian, order, algorithm, controlled)
+
+
+def _trotter_segments(qubits: Sequence[cirq.Qid],
+                      time: float,
+                      n_steps: int,
+                      order: int,
+                      trotter_step: TrotterStep,
+                      control_qubit: Optional[cirq.Qid],
+                      omit_final_swaps: bool
+                      ) -> Iterator[cirq.OP_TREE]:
+    """Yields the preparation, then the operations of each Trotter step as
+    a tuple, then the finishing operations.
 
+    Trotter steps that are repeated yield the same tuple every time.
+    """
     # Get ready to perform Trotter steps
     yield trotter_step.prepare(qubits, control_qubit)
 
     # Perform Trotter steps
     step_time = time / n_steps
+    templates = _TrotterStepTemplates(trotter_step)
     for _ in range(n_steps):
-        yield _perform_trotter_step(
-                qubits, step_time, order, trotter_step, control_qubit)
+        yield from _perform_trotter_step(
+                qubits, step_time, order, templates, control_qubit)
         qubits, control_qubit = trotter_step.step_qubit_permutation(
                 qubits, control_qubit)
 
@@ -116,36 +145,90 @@ def simulate_trotter(qubits: Sequence[cirq.Qid],
 def _perform_trotter_step(qubits: Sequence[cirq.Qid],
                           time: float,
                           order: int,
-                          trotter_step: TrotterStep,
+                          templates: '_TrotterStepTemplates',
                           control_qubit: Optional[cirq.Qid]
-                          ) -> cirq.OP_TREE:
-    """Perform a Trotter step."""
+                          ) -> Iterator[Tuple[cirq.Operation, ...]]:
+    """Perform a Trotter step, yielding the operations of each of the
+    Trotter steps it is split into."""
+    trotter_step = templates.trotter_step
     if order <= 1:
-        yield trotter_step.trotter_step(qubits, time, control_qubit)
+        yield templates.operations(qubits, time, control_qubit)
     else:
         # Recursively split this Trotter step into five smaller steps.
         # The first two and last two steps use this amount of time
         split_time = time / (4 - 4**(1 / (2 * order - 1)))
 
         for _ in range(2):
-            yield _perform_trotter_step(
-                    qubits, split_time, order - 1, trotter_step, control_qubit)
+            yield from _perform_trotter_step(
+                    qubits, split_time, order - 1, templates, control_qubit)
             qubits, control_qubit = trotter_step.step_qubit_permutation(
                     qubits, control_qubit)
 
-        yield _perform_trotter_step(
+        yield from _perform_trotter_step(
                 qubits, time - 4 * split_time, order - 1,
-                trotter_step, control_qubit)
+                templates, control_qubit)
         qubits, control_qubit = trotter_step.step_qubit_permutation(
                 qubits, control_qubit)
 
         for _ in range(2):
-            yield _perform_trotter_step(
-                    qubits, split_time, order - 1, trotter_step, control_qubit)
+            yield from _perform_trotter_step(
+                    qubits, split_time, order - 1, templates, control_qubit)
             qubits, control_qubit = trotter_step.step_qubit_permutation(
                     qubits, control_qubit)
 
 
+# The qubits, control qubit and operations of a Trotter step
+_Template = Tuple[Tuple[cirq.Qid, ...],
+                  Optional[cirq.Qid],
+                  Tuple[cirq.Operation, ...]]
+
+
+class _TrotterStepTemplates:
+    """Builds the operations of each distinct Trotter step once.
+
+    A simulation repeats Trotter steps of only a few different times, on the
+    few orderings of the qubits produced by the step's qubit permutation.
+    Since operations are immutable, the operations of each (time, qubit
+    ordering) pair are kept and yielded again every time that step comes
+    up. If the Trotter step declares that its operations depend only on
+    the positions of the qubits, the operations of a step of a given time
+    are also generated only once, as a template, and are mapped onto other
+    orderings of the qubits by relabeling.
+    """
+
+    def __init__(self, trotter_step: TrotterStep) -> None:
+        self.trotter_step = trotter_step
+        self._templates = {}  # type: Dict[float, _Template]
+        self._steps = {}  # type: Dict[Hashable, Tuple[cirq.Operation, ...]]
+
+    def operations(self,
+                   qubits: Sequence[cirq.Qid],
+                   time: float,
+                   control_qubit: Optional[cirq.Qid]
+                   ) -> Tuple[cirq.Operation, ...]:
+        key = (time, tuple(qubits), control_qubit)
+        if key in self._steps:
+            return self._steps[key]
+
+        if (self.trotter_step.depends_only_on_qubit_positions and
+                time in self._templates):
+            template_qubits, template_control, template = (
+                    self._templates[time])
+            mapping = dict(zip(template_qubits, qubits))
+            if template_control is not None:
+                mapping[template_control] = control_qubit
+            operations = tuple(
+                    op.transform_qubits(lambda q: mapping.get(q, q))
+                    for op in template)
+        else:
+            operations = tuple(cirq.flatten_op_tree(
+                self.trotter_step.trotter_step(qubits, time, control_qubit)))
+            self._templates[time] = (tuple(qubits), control_qubit, operations)
+
+        self._steps[key] = operations
+        return operations
+
+
 def _select_trotter_algorithm(hamiltonian: Hamiltonian) -> TrotterAlgorithm:
     if isinstance(hamiltonian, DiagonalCoulombHamiltonian):
         return LINEAR_SWAP_NETWORK
@@ -10,7 +10,7 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
-from typing import Optional, Tuple
+from typing import Optional, Tuple, TYPE_CHECKING
 
 import numpy
 import pytest
@@ -26,7 +26,11 @@ from openfermioncirq.trotter import (
         LOW_RANK,
         LowRankTrotterAlgorithm,
         TrotterAlgorithm)
-from openfermioncirq.trotter.trotter_algorithm import Hamiltonian
+from openfermioncirq.trotter.trotter_algorithm import Hamiltonian, TrotterStep
+
+if TYPE_CHECKING:
+    # pylint: disable=unused-import
+    from typing import Sequence
 
 
 def fidelity(state1, state2):
@@ -267,6 +271,56 @@ def test_simulate_trotter_omit_final_swaps():
     assert len(circuit_without_swaps) < len(circuit_with_swaps)
 
 
+def test_simulate_trotter_relabels_trotter_steps():
+    n_qubits, n_steps = 4, 3
+    qubits = cirq.LineQubit.range(n_qubits)
+    hamiltonian = openfermion.random_diagonal_coulomb_hamiltonian(
+            n_qubits, seed=29817)
+    control = cirq.LineQubit(-1)
+    trotter_step = LINEAR_SWAP_NETWORK.controlled_symmetric(hamiltonian)
+
+    expected = list(cirq.flatten_op_tree(
+        trotter_step.prepare(qubits, control)))
+    step_qubits = qubits  # type: Sequence[cirq.Qid]
+    for _ in range(n_steps):
+        expected.extend(cirq.flatten_op_tree(trotter_step.trotter_step(
+            step_qubits, 1.0 / n_steps, control)))
+        step_qubits, control = trotter_step.step_qubit_permutation(
+                step_qubits, control)
+    expected.extend(cirq.flatten_op_tree(
+        trotter_step.finish(step_qubits, n_steps, control)))
+
+    assert list(cirq.flatten_op_tree(simulate_trotter(
+        qubits, hamiltonian, 1.0, n_steps=n_steps, order=1,
+        algorithm=LINEAR_SWAP_NETWORK,
+        control_qubit=cirq.LineQubit(-1)))) == expected
+
+
+def test_simulate_trotter_only_relabels_positional_trotter_steps():
+
+    class LabelDependentTrotterStep(TrotterStep):
+        def trotter_step(self, qubits, time, control_qubit=None):
+            gate = cirq.Z if qubits[0] == cirq.LineQubit(0) else cirq.X
+            yield gate(qubits[0])**time
+
+        def step_qubit_permutation(self, qubits, control_qubit=None):
+            return qubits[::-1], control_qubit
+
+    class LabelDependentTrotterAlgorithm(TrotterAlgorithm):
+        supported_types = {openfermion.DiagonalCoulombHamiltonian}
+
+        def asymmetric(self, hamiltonian):
+            return LabelDependentTrotterStep(hamiltonian)
+
+    qubits = cirq.LineQubit.range(2)
+    hamiltonian = openfermion.random_diagonal_coulomb_hamiltonian(2, seed=0)
+    circuit = cirq.Circuit.from_ops(simulate_trotter(
+        qubits, hamiltonian, 1.0, n_steps=2, order=0,
+        algorithm=LabelDependentTrotterAlgorithm()))
+    assert list(circuit.all_operations()) == [
+            cirq.Z(qubits[0])**0.5, cirq.X(qubits[1])**0.5]
+
+
 def test_simulate_trotter_bad_order_raises_error():
     qubits = cirq.LineQubit.range(2)
     hamiltonian = openfermion.random_diagonal_coulomb_hamiltonian(2, seed=0)
@@ -44,7 +44,14 @@ class TrotterStep(metaclass=abc.ABCMeta):
 
     Attributes:
         hamiltonian: The Hamiltonian being simulated.
+        depends_only_on_qubit_positions: Whether the operations of a Trotter
+            step depend only on the positions of the qubits in the sequence,
+            and not on the qubits themselves. If so, simulate_trotter
+            generates the operations of a step once and relabels their
+            qubits to perform the same step on another ordering of the
+            qubits. Defaults to False.
     """
+    depends_only_on_qubit_positions = False
 
     def __init__(self, hamiltonian: Hamiltonian) -> None:
         self.hamiltonian = hamiltonian
@@ -0,0 +1,138 @@
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Evolve state vectors by a Trotter-Suzuki product formula."""
+
+from typing import Optional, Sequence, TYPE_CHECKING, Union
+
+import numpy
+
+import cirq
+
+from openfermioncirq.simulation import CompiledCircuit
+from openfermioncirq.trotter.simulate_trotter import (
+        _trotter_segments,
+        _trotter_step_for)
+from openfermioncirq.trotter.trotter_algorithm import (
+        Hamiltonian,
+        TrotterAlgorithm)
+
+if TYPE_CHECKING:
+    # pylint: disable=unused-import
+    from typing import Dict, List, Tuple
+
+
+class TrotterEvolution:
+    """Evolves state vectors as the circuit of `simulate_trotter` would.
+
+    When only the final state is needed, building the circuit of a long
+    evolution and simulating it is wasteful: the circuit repeats a few
+    distinct Trotter steps many times. Instead, the preparation, each
+    distinct Trotter step and the finishing operations are compiled once
+    into a `CompiledCircuit`, and evolving a state runs these programs in
+    turn. Compiling fuses the Givens rotations of basis changes and swap
+    networks into 4x4 kernels, merges the Rz, CZ and rot111 gates of the
+    density-density terms into phase vectors over the basis states, and
+    replaces SWAP and FSWAP gates by a relabeling of the qubits.
+
+    The operations are exactly those of the circuit, so the final state is
+    that of the circuit up to rounding, including the global phase.
+
+    Attributes:
+        qubits: The qubits, in the order used to index the state vector.
+        n_particles: The number of particles of the states evolved, or None
+            if states on the whole space are evolved.
+        sector_indices: If `n_particles` is specified, the sorted indices of
+            the computational basis states with that number of particles,
+            which index the amplitudes of the state vectors. Otherwise, None.
+    """
+
+    def __init__(self,
+                 qubits: Sequence[cirq.Qid],
+                 hamiltonian: Hamiltonian,
+                 time: float,
+                 n_steps: int=1,
+                 order: int=0,
+                 algorithm: Optional[TrotterAlgorithm]=None,
+                 omit_final_swaps: bool=False,
+                 n_particles: Optional[int]=None) -> None:
+        """
+        Args:
+            qubits: The qubits on which the circuit would act. They should be
+                sorted so that the j-th qubit in the Sequence holds the
+                occupation of the j-th fermionic mode.
+            hamiltonian: The Hamiltonian to simulate.
+            time: The evolution time.
+            n_steps: The number of Trotter steps to use. Default is 1.
+            order: The order of the product formula, as in
+                `simulate_trotter`. Default is 0.
+            algorithm: The algorithm to use to simulate a single Trotter step,
+                as in `simulate_trotter`.
+            omit_final_swaps: Whether to omit the SWAP or FSWAP gates at the
+                end of the circuit, as in `simulate_trotter`.
+            n_particles: If specified, only states with this number of
+                particles are evolved, which is much faster. The Hamiltonian
+                must then conserve the number of particles.
+        """
+        self.qubits = tuple(qubits)
+        self.n_particles = n_particles
+
+        trotter_step = _trotter_step_for(hamiltonian, order, algorithm,
+                                         controlled=False)
+
+        # Repeated Trotter steps are the same tuple of operations, which is
+        # compiled once. The tuples are kept so that their ids stay unique.
+        programs = {}  \
+            # type: Dict[int, Tuple[cirq.OP_TREE, CompiledCircuit]]
+        self._schedule = []  # type: List[CompiledCircuit]
+        for segment in _trotter_segments(qubits, time, n_steps, order,
+                                         trotter_step, None,
+                                         omit_final_swaps):
+            if id(segment) not in programs:
+                programs[id(segment)] = (segment, self._compile(segment))
+            self._schedule.append(programs[id(segment)][1])
+        self.sector_indices = self._schedule[0].sector_indices
+
+    @property
+    def num_programs(self) -> int:
+        """The number of distinct compiled programs."""
+        return len({id(program) for program in self._schedule})
+
+    @property
+    def dimension(self) -> int:
+        """The number of amplitudes of the state vectors."""
+        return self._schedule[0].dimension
+
+    def final_state(self,
+                    initial_state: Union[int, numpy.ndarray]=0
+                    ) -> numpy.ndarray:
+        """Evolves an initial state and returns the final state vector.
+
+        Args:
+            initial_state: The initial state, either as the integer index of a
+                computational basis state or as a state vector. If
+                `n_particles` is specified, a state vector has one amplitude
+                for each of the basis states in `sector_indices`.
+
+        Returns:
+            The final state vector as a flat array of length `dimension`.
+        """
+        state = initial_state
+        for program in self._schedule:
+            state = program.final_state(initial_state=state, copy=False)
+        return numpy.array(state)
+
+    def _compile(self, operations: cirq.OP_TREE) -> CompiledCircuit:
+        return CompiledCircuit(cirq.Circuit.from_ops(operations),
+                               qubit_order=self.qubits,
+                               n_particles=self.n_particles,
+                               relabel_swaps=True)
@@ -0,0 +1,92 @@
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import numpy
+import pytest
+
+import cirq
+import openfermion
+
+from openfermioncirq import simulate_trotter
+from openfermioncirq.simulation import NumberSector
+from openfermioncirq.trotter import (
+        LINEAR_SWAP_NETWORK,
+        LOW_RANK,
+        SPLIT_OPERATOR,
+        TrotterEvolution)
+
+
+diag_coul_hamiltonian = openfermion.random_diagonal_coulomb_hamiltonian(
+        4, real=False, seed=20391)
+
+bond_length = 0.7414
+geometry = [('H', (0., 0., 0.)), ('H', (0., 0., bond_length))]
+h2_hamiltonian = openfermion.load_molecular_hamiltonian(
+        geometry, 'sto-3g', 1, format(bond_length), 2, 2)
+
+
+@pytest.mark.parametrize(
+        'hamiltonian, algorithm, order, n_steps, omit_final_swaps', [
+            (diag_coul_hamiltonian, LINEAR_SWAP_NETWORK, 0, 3, False),
+            (diag_coul_hamiltonian, LINEAR_SWAP_NETWORK, 2, 2, True),
+            (diag_coul_hamiltonian, SPLIT_OPERATOR, 0, 3, False),
+            (diag_coul_hamiltonian, SPLIT_OPERATOR, 1, 2, True),
+            (h2_hamiltonian, LOW_RANK, 0, 3, False),
+            (h2_hamiltonian, LOW_RANK, 0, 2, True),
+])
+def test_trotter_evolution_matches_circuit(
+        hamiltonian, algorithm, order, n_steps, omit_final_swaps):
+    qubits = cirq.LineQubit.range(4)
+    time = 0.7
+    circuit = cirq.Circuit.from_ops(simulate_trotter(
+        qubits, hamiltonian, time, n_steps, order, algorithm,
+        omit_final_swaps=omit_final_swaps))
+    evolution = TrotterEvolution(qubits, hamiltonian, time, n_steps, order,
+                                 algorithm, omit_final_swaps)
+
+    initial_state = openfermion.haar_random_vector(16, seed=7102)
+    numpy.testing.assert_allclose(
+            evolution.final_state(initial_state),
+            circuit.apply_unitary_effect_to_state(initial_state,
+                                                  qubit_order=qubits),
+            atol=1e-7)
+    numpy.testing.assert_allclose(
+            evolution.final_state(0b0110),
+            circuit.apply_unitary_effect_to_state(0b0110,
+                                                  qubit_order=qubits),
+            atol=1e-7)
+
+
+def test_trotter_evolution_number_sector():
+    qubits = cirq.LineQubit.range(4)
+    circuit = cirq.Circuit.from_ops(simulate_trotter(
+        qubits, h2_hamiltonian, 1.0, n_steps=4, algorithm=LOW_RANK))
+    evolution = TrotterEvolution(qubits, h2_hamiltonian, 1.0, n_steps=4,
+                                 algorithm=LOW_RANK, n_particles=2)
+    assert evolution.dimension == 6
+    # The preparation, the finish, and a Trotter step on each of the two
+    # orderings of the qubits
+    assert evolution.num_programs <= 4
+    numpy.testing.assert_array_equal(evolution.sector_indices,
+                                     NumberSector(4, 2).basis)
+
+    final_state = circuit.apply_unitary_effect_to_state(0b1100,
+                                                        qubit_order=qubits)
+    numpy.testing.assert_allclose(evolution.final_state(0b1100),
+                                  final_state[evolution.sector_indices],
+                                  atol=1e-7)
+
+
+def test_trotter_evolution_bad_hamiltonian_type_raises_error():
+    with pytest.raises(TypeError):
+        _ = TrotterEvolution(cirq.LineQubit.range(4), h2_hamiltonian, 1.0,
+                             algorithm=LINEAR_SWAP_NETWORK)
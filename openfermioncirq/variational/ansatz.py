@@ -12,15 +12,61 @@
 
 """The variational ansatz class."""
 
-from typing import Iterable, Optional, Sequence, Tuple
+from typing import (
+        Any, Iterable, List, Optional, Sequence, Tuple, TYPE_CHECKING, cast)
 
 import abc
+import types
 
 import numpy
 import sympy
 
 import cirq
 
+if TYPE_CHECKING:
+    # pylint: disable=unused-import
+    from typing import Dict, Mapping
+
+
+class ParamTable:
+    """The parameters of an ansatz and their metadata, computed once.
+
+    Attributes:
+        symbols: The parameters, in the order yielded by `params`.
+        names: The names of the parameters.
+        index: A read-only mapping from the name of each parameter to its
+            position.
+        scale_factors: A read-only array of the scale factors of the
+            parameters.
+        bounds: A read-only array of shape (number of parameters, 2) holding
+            the lower and upper bound on each parameter, or None if the
+            parameters are not bounded.
+    """
+
+    def __init__(self,
+                 symbols: Sequence[sympy.Symbol],
+                 scale_factors: Iterable[float],
+                 bounds: Optional[Sequence[Tuple[float, float]]]) -> None:
+        self.symbols = tuple(symbols)
+        self.names = tuple(symbol.name for symbol in self.symbols)
+        self.index = types.MappingProxyType(
+                {name: i for i, name in enumerate(self.names)}
+        )  # type: Mapping[str, int]
+        self.scale_factors = numpy.array(list(scale_factors), dtype=float)
+        self.scale_factors.flags.writeable = False
+        self.bounds = None  # type: Optional[numpy.ndarray]
+        if bounds is not None:
+            self.bounds = numpy.array(bounds, dtype=float).reshape(
+                    len(self.symbols), 2)
+            self.bounds.flags.writeable = False
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        # Mapping proxies can't be pickled, so the table is built again
+        return ParamTable, (self.symbols, self.scale_factors, self.bounds)
+
 
 class VariationalAnsatz(metaclass=abc.ABCMeta):
     """A variational ansatz.
@@ -39,6 +85,11 @@ class VariationalAnsatz(metaclass=abc.ABCMeta):
             with the same name.
         circuit: The ansatz circuit.
         qubits: A list containing the qubits used by the ansatz circuit.
+
+    The parameters yielded by `params`, and their scale factors and bounds,
+    are computed once and stored in `param_table`, which the simulation and
+    optimization code reads instead of calling these methods again.
+    Subclasses should iterate over `param_symbols` rather than `params()`.
     """
 
     def __init__(self, qubits: Optional[Sequence[cirq.Qid]]=None) -> None:
@@ -48,18 +99,41 @@ class VariationalAnsatz(metaclass=abc.ABCMeta):
                 then qubits will automatically be generated by the
                 `_generate_qubits` method.
         """
+        self._param_symbols = None  # type: Optional[Tuple[sympy.Symbol, ...]]
+        self._param_table = None  # type: Optional[ParamTable]
         self.qubits = qubits or self._generate_qubits()
 
         # Generate the ansatz circuit
-        self.circuit = cirq.Circuit.from_ops(
-                self.operations(self.qubits),
-                strategy=cirq.InsertStrategy.EARLIEST)
+        self.circuit = cirq.Circuit(
+                _earliest_moments(self.operations(self.qubits)))
 
     @abc.abstractmethod
     def params(self) -> Iterable[sympy.Symbol]:
         """The parameters of the ansatz."""
         pass
 
+    @property
+    def param_symbols(self) -> Tuple[sympy.Symbol, ...]:
+        """The parameters yielded by `params`, computed once."""
+        if getattr(self, '_param_symbols', None) is None:
+            self._param_symbols = tuple(self.params())
+        return cast(Tuple[sympy.Symbol, ...], self._param_symbols)
+
+    @property
+    def param_table(self) -> ParamTable:
+        """The parameters with their scale factors and bounds, computed
+        once."""
+        if getattr(self, '_param_table', None) is None:
+            self._param_table = ParamTable(self.param_symbols,
+                                           self.param_scale_factors(),
+                                           self.param_bounds())
+        return cast(ParamTable, self._param_table)
+
+    @property
+    def num_params(self) -> int:
+        """The number of parameters of the ansatz."""
+        return len(self.param_symbols)
+
     def param_scale_factors(self) -> Iterable[float]:
         """Coefficients to scale parameters by during optimization.
 
@@ -67,7 +141,7 @@ class VariationalAnsatz(metaclass=abc.ABCMeta):
         each entry of x will be multiplied by the corresponding scaling factor
         and the resulting values will be used to resolve Symbols.
         """
-        for _ in self.params():
+        for _ in self.param_symbols:
             yield 1.0
 
     def param_bounds(self) -> Optional[Sequence[Tuple[float, float]]]:
@@ -82,21 +156,16 @@ class VariationalAnsatz(metaclass=abc.ABCMeta):
 
     def param_resolver(self, param_values: numpy.ndarray) -> cirq.ParamResolver:
         """Interprets parameters input as an array of real numbers."""
+        table = self.param_table
         return cirq.ParamResolver(
-                dict(
-                    (param.name, s*param_value)
-                    for param, param_value, s in zip(
-                        self.params(),
-                        param_values,
-                        self.param_scale_factors())
-                )
-        )
-
+                dict(zip(table.names,
+                         table.scale_factors *
+                         numpy.asarray(param_values, dtype=float))))
 
     def default_initial_params(self) -> numpy.ndarray:
         """Suggested initial parameter settings."""
         # Default: zeros
-        return numpy.zeros(len(list(self.params())))
+        return numpy.zeros(self.num_params)
 
     @abc.abstractmethod
     def operations(self, qubits: Sequence[cirq.Qid]) -> cirq.OP_TREE:
@@ -125,3 +194,25 @@ class VariationalAnsatz(metaclass=abc.ABCMeta):
         """
         # Default: identity permutation
         return qubits
+
+
+def _earliest_moments(operations: cirq.OP_TREE) -> List[cirq.Moment]:
+    """Packs operations into moments as cirq.InsertStrategy.EARLIEST does.
+
+    Appending an operation with the EARLIEST strategy puts it in the moment
+    after the latest moment acting on one of its qubits. Keeping track of
+    that moment for each qubit takes constant time per operation, whereas
+    `cirq.Circuit.from_ops` scans back through the moments for each of them.
+    """
+    moments = []  # type: List[List[cirq.Operation]]
+    latest_moment = {}  # type: Dict[cirq.Qid, int]
+    for op in cirq.flatten_op_tree(operations):
+        index = max((latest_moment[qubit] + 1 for qubit in op.qubits
+                     if qubit in latest_moment),
+                    default=0)
+        if index == len(moments):
+            moments.append([])
+        moments[index].append(op)
+        for qubit in op.qubits:
+            latest_moment[qubit] = index
+    return [cirq.Moment(ops) for ops in moments]
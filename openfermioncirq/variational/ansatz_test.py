@@ -10,10 +10,15 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+import pickle
+
 import numpy
 import pytest
 
+import cirq
+
 from openfermioncirq import VariationalAnsatz
+from openfermioncirq.variational.ansatz import _earliest_moments
 from openfermioncirq.testing import ExampleAnsatz
 
 
@@ -26,6 +31,15 @@ def test_variational_ansatz_circuit():
 """.strip()
 
 
+def test_variational_ansatz_earliest_moments():
+    a, b, c = cirq.LineQubit.range(3)
+    operations = [cirq.H(a), cirq.CZ(a, b), cirq.X(c), cirq.Y(b),
+                  [cirq.CNOT(b, c), cirq.Z(a)], cirq.measure(a, b, c)]
+    assert cirq.Circuit(_earliest_moments(operations)) == (
+            cirq.Circuit.from_ops(operations,
+                                  strategy=cirq.InsertStrategy.EARLIEST))
+
+
 def test_variational_ansatz_param_bounds():
     ansatz = ExampleAnsatz()
     assert ansatz.param_bounds() is None
@@ -38,6 +52,28 @@ def test_variational_ansatz_param_resolver():
     assert resolver['theta1'] == 1
 
 
+def test_variational_ansatz_param_table():
+    ansatz = ExampleAnsatz()
+    table = ansatz.param_table
+    assert ansatz.param_table is table
+    assert table.symbols == tuple(ansatz.params()) == ansatz.param_symbols
+    assert table.names == ('theta0', 'theta1')
+    assert table.index['theta1'] == 1
+    assert len(table) == ansatz.num_params == 2
+    numpy.testing.assert_array_equal(table.scale_factors, [1.0, 1.0])
+    assert table.bounds is None
+    with pytest.raises(ValueError):
+        table.scale_factors[0] = 2.0
+    with pytest.raises(TypeError):
+        table.index['theta2'] = 2
+
+    copy = pickle.loads(pickle.dumps(table))
+    assert copy.symbols == table.symbols
+    assert copy.index == {'theta0': 0, 'theta1': 1}
+    with pytest.raises(TypeError):
+        copy.index['theta2'] = 2
+
+
 def test_variational_ansatz_default_initial_params():
     ansatz = ExampleAnsatz()
     numpy.testing.assert_allclose(ansatz.default_initial_params(),
@@ -200,7 +200,7 @@ class LowRankTrotterAnsatz(VariationalAnsatz):
 
     def param_bounds(self) -> Optional[Sequence[Tuple[float, float]]]:
         """Bounds on the parameters."""
-        return [(-1.0, 1.0)] * len(list(self.params()))
+        return [(-1.0, 1.0)] * self.num_params
 
     def _generate_qubits(self) -> Sequence[cirq.Qid]:
         """Produce qubits that can be used by the ansatz circuit."""
@@ -210,7 +210,7 @@ class LowRankTrotterAnsatz(VariationalAnsatz):
         """Produce the operations of the ansatz circuit."""
 
         n_qubits = len(qubits)
-        param_set = set(self.params())
+        param_set = set(self.param_symbols)
 
         for i in range(self.iterations):
 
@@ -296,7 +296,7 @@ class LowRankTrotterAnsatz(VariationalAnsatz):
 
         params = []
 
-        for param in self.params():
+        for param in self.param_symbols:
 
             i = param.subscripts[-1]
             # Use the midpoint of the time segment
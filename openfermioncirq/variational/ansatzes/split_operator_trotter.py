@@ -207,7 +207,7 @@ class SplitOperatorTrotterAnsatz(VariationalAnsatz):
 
     def param_bounds(self) -> Optional[Sequence[Tuple[float, float]]]:
         """Bounds on the parameters."""
-        return [(-1.0, 1.0)] * len(list(self.params()))
+        return [(-1.0, 1.0)] * self.num_params
 
     def _generate_qubits(self) -> Sequence[cirq.Qid]:
         """Produce qubits that can be used by the ansatz circuit."""
@@ -217,7 +217,7 @@ class SplitOperatorTrotterAnsatz(VariationalAnsatz):
         """Produce the operations of the ansatz circuit."""
         # TODO implement asymmetric ansatz
 
-        param_set = set(self.params())
+        param_set = set(self.param_symbols)
 
         # Change to the basis in which the one-body term is diagonal
         yield cirq.inverse(
@@ -293,7 +293,7 @@ class SplitOperatorTrotterAnsatz(VariationalAnsatz):
         hamiltonian = self.hamiltonian
 
         params = []
-        for param in self.params():
+        for param in self.param_symbols:
             if param.letter == 'U':
                 p, i = param.subscripts
                 params.append(_canonicalize_exponent(
@@ -206,7 +206,7 @@ class SwapNetworkTrotterAnsatz(VariationalAnsatz):
     def param_bounds(self) -> Optional[Sequence[Tuple[float, float]]]:
         """Bounds on the parameters."""
         bounds = []
-        for param in self.params():
+        for param in self.param_symbols:
             if param.letter == 'U' or param.letter == 'V':
                 bounds.append((-1.0, 1.0))
             elif param.letter == 'T' or param.letter == 'W':
@@ -221,7 +221,7 @@ class SwapNetworkTrotterAnsatz(VariationalAnsatz):
         """Produce the operations of the ansatz circuit."""
         # TODO implement asymmetric ansatz
 
-        param_set = set(self.params())
+        param_set = set(self.param_symbols)
 
         for i in range(self.iterations):
 
@@ -293,7 +293,7 @@ class SwapNetworkTrotterAnsatz(VariationalAnsatz):
         hamiltonian = self.hamiltonian
 
         params = []
-        for param in self.params():
+        for param in self.param_symbols:
             if param.letter == 'U':
                 p, _ = param.subscripts
                 params.append(_canonicalize_exponent(
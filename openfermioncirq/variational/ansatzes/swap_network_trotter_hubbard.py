@@ -84,7 +84,7 @@ class SwapNetworkTrotterHubbardAnsatz(VariationalAnsatz):
     def param_bounds(self) -> Optional[Sequence[Tuple[float, float]]]:
         """Bounds on the parameters."""
         bounds = []
-        for param in self.params():
+        for param in self.param_symbols:
             s = 1.0 if param.letter == 'V' else 2.0
             bounds.append((-s, s))
         return bounds
@@ -164,8 +164,8 @@ class SwapNetworkTrotterHubbardAnsatz(VariationalAnsatz):
         step_time = total_time / self.iterations
 
         params = []
-        for param, scale_factor in zip(self.params(),
-                                       self.param_scale_factors()):
+        for param, scale_factor in zip(self.param_symbols,
+                                       self.param_table.scale_factors):
             if param.letter == 'Th' or param.letter == 'Tv':
                 params.append(_canonicalize_exponent(
                     -self.tunneling * step_time / numpy.pi, 4) / scale_factor)
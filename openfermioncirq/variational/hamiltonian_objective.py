@@ -12,7 +12,7 @@
 
 """A class for studying variational ansatzes with an associated Hamiltonian."""
 
-from typing import Optional, Tuple, Union
+from typing import Optional, Sequence, Tuple, Union
 
 import numpy
 import scipy.special
@@ -20,6 +20,7 @@ import scipy.special
 import cirq
 import openfermion
 
+from openfermioncirq.simulation import PauliMaskOperator
 from openfermioncirq.variational.objective import VariationalObjective
 
 
@@ -44,6 +45,9 @@ class HamiltonianObjective(VariationalObjective):
             This gives an estimate of the variance of an energy measurement
             with a certain measurement strategy; see arXiv:1801.03524 for
             a derivation.
+        n_particles: If not None, the Hamiltonian is restricted to the states
+            with this number of particles, and state vectors passed to the
+            objective are state vectors of the corresponding NumberSector.
     """
 
     def __init__(self,
@@ -52,7 +56,9 @@ class HamiltonianObjective(VariationalObjective):
                      openfermion.FermionOperator,
                      openfermion.InteractionOperator,
                      openfermion.QubitOperator],
-                 use_linear_op: bool=False) -> None:
+                 use_linear_op: bool=False,
+                 use_pauli_masks: bool=False,
+                 n_particles: Optional[int]=None) -> None:
         """
         Args:
             hamiltonian: The Hamiltonian.
@@ -60,8 +66,29 @@ class HamiltonianObjective(VariationalObjective):
                 matrix to compute expectation values. Using a LinearOperator
                 is more memory-efficient but results in much slower expectation
                 value computation.
+            use_pauli_masks: Whether to use a PauliMaskOperator instead of a
+                sparse matrix to compute expectation values. Like a
+                LinearOperator, it stores no matrix, but it applies the
+                Hamiltonian with vectorized operations and is much faster.
+            n_particles: If specified, the Hamiltonian, which must conserve
+                the number of particles, is restricted to the states with
+                this number of particles. This is used by black boxes that
+                simulate circuits in a number sector.
+
+        Raises:
+            ValueError: Both use_linear_op and use_pauli_masks are True, or
+                use_linear_op is True and n_particles is specified.
         """
+        if use_linear_op and use_pauli_masks:
+            raise ValueError(
+                    'At most one of use_linear_op and use_pauli_masks can be '
+                    'True.')
+        if use_linear_op and n_particles is not None:
+            raise ValueError(
+                    'A LinearOperator cannot be restricted to a number '
+                    'sector.')
         self.hamiltonian = hamiltonian
+        self.n_particles = n_particles
 
         if isinstance(hamiltonian, openfermion.QubitOperator):
             hamiltonian_qubit_op = hamiltonian
@@ -71,6 +98,14 @@ class HamiltonianObjective(VariationalObjective):
         if use_linear_op:
             self._hamiltonian_linear_op = openfermion.LinearQubitOperator(
                     hamiltonian_qubit_op)
+        elif use_pauli_masks:
+            self._hamiltonian_linear_op = PauliMaskOperator(
+                    hamiltonian_qubit_op, n_particles=n_particles)
+        elif n_particles is not None:
+            # Build the matrix on the sector only, not on the whole space
+            self._hamiltonian_linear_op = PauliMaskOperator(
+                    hamiltonian_qubit_op,
+                    n_particles=n_particles).sparse_matrix()
         else:
             self._hamiltonian_linear_op = openfermion.get_sparse_operator(
                     hamiltonian_qubit_op)
@@ -102,6 +137,29 @@ class HamiltonianObjective(VariationalObjective):
                     "Don't know how to compute the value of a TrialResult that "
                     "is not an SimulationTrialResult.")
 
+    def apply_hamiltonian(self, state: numpy.ndarray) -> numpy.ndarray:
+        """Multiplies a state vector by the Hamiltonian."""
+        return self._hamiltonian_linear_op.dot(state)
+
+    def value_batch(self,
+                    circuit_outputs: Sequence[Union[cirq.TrialResult,
+                                                    cirq.SimulationTrialResult,
+                                                    numpy.ndarray]]
+                    ) -> numpy.ndarray:
+        """The evaluation function for a batch of circuit outputs.
+
+        A two-dimensional array of state vectors, one per row, is evaluated
+        with a single multiplication by the Hamiltonian.
+        """
+        if not (isinstance(circuit_outputs, numpy.ndarray) and
+                circuit_outputs.ndim == 2):
+            return super().value_batch(circuit_outputs)
+        # Rows of the product are the Hamiltonian applied to each state
+        products = self._hamiltonian_linear_op.dot(circuit_outputs.T).T
+        return numpy.einsum('ij,ij->i',
+                            circuit_outputs.conj(),
+                            products).real
+
     def noise(self, cost: Optional[float]=None) -> float:
         """A sample from a normal distribution with mean 0.
 
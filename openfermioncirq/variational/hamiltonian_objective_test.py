@@ -18,6 +18,7 @@ import openfermion
 from openfermion import random_diagonal_coulomb_hamiltonian
 
 from openfermioncirq import HamiltonianObjective
+from openfermioncirq.simulation import NumberSector
 
 
 # Construct a Hamiltonian for testing
@@ -29,6 +30,8 @@ def test_hamiltonian_objective_value():
 
     obj = HamiltonianObjective(test_hamiltonian)
     obj_linear_op = HamiltonianObjective(test_hamiltonian, use_linear_op=True)
+    obj_pauli_masks = HamiltonianObjective(test_hamiltonian,
+                                           use_pauli_masks=True)
     hamiltonian_sparse = openfermion.get_sparse_operator(test_hamiltonian)
 
     simulator = cirq.Simulator()
@@ -48,6 +51,61 @@ def test_hamiltonian_objective_value():
             obj_linear_op.value(result), correct_val, 1e-5)
     numpy.testing.assert_allclose(
             obj_linear_op.value(result.final_state), correct_val, 1e-5)
+    numpy.testing.assert_allclose(
+            obj_pauli_masks.value(result), correct_val, 1e-5)
+    numpy.testing.assert_allclose(
+            obj_pauli_masks.value(result.final_state), correct_val, 1e-5)
+
+    with pytest.raises(ValueError):
+        _ = HamiltonianObjective(test_hamiltonian,
+                                 use_linear_op=True,
+                                 use_pauli_masks=True)
+
+
+@pytest.mark.parametrize('use_linear_op, use_pauli_masks', [
+    (False, False), (True, False), (False, True)])
+def test_hamiltonian_objective_value_batch(use_linear_op, use_pauli_masks):
+
+    obj = HamiltonianObjective(test_hamiltonian,
+                               use_linear_op=use_linear_op,
+                               use_pauli_masks=use_pauli_masks)
+
+    numpy.random.seed(20817)
+    states = numpy.random.randn(3, 16) + 1j * numpy.random.randn(3, 16)
+    states /= numpy.linalg.norm(states, axis=1)[:, numpy.newaxis]
+
+    values = obj.value_batch(states)
+    assert values.shape == (3,)
+    numpy.testing.assert_allclose(
+            values, [obj.value(state) for state in states], atol=1e-8)
+    numpy.testing.assert_allclose(
+            obj.value_batch(list(states)), values, atol=1e-8)
+
+
+@pytest.mark.parametrize('use_pauli_masks', [False, True])
+def test_hamiltonian_objective_number_sector(use_pauli_masks):
+    obj = HamiltonianObjective(test_hamiltonian)
+    obj_sector = HamiltonianObjective(test_hamiltonian,
+                                      use_pauli_masks=use_pauli_masks,
+                                      n_particles=2)
+    assert obj_sector.n_particles == 2
+    basis = NumberSector(4, 2).basis
+
+    numpy.random.seed(8213)
+    states = numpy.zeros((3, 16), dtype=complex)
+    states[:, basis] = (numpy.random.randn(3, 6) +
+                        1j * numpy.random.randn(3, 6))
+    states /= numpy.linalg.norm(states, axis=1)[:, numpy.newaxis]
+
+    numpy.testing.assert_allclose(obj_sector.value(states[0, basis]),
+                                  obj.value(states[0]))
+    numpy.testing.assert_allclose(obj_sector.value_batch(states[:, basis]),
+                                  obj.value_batch(states))
+
+    with pytest.raises(ValueError):
+        _ = HamiltonianObjective(test_hamiltonian,
+                                 use_linear_op=True,
+                                 n_particles=2)
 
 
 def test_hamiltonian_objective_noise():
@@ -10,7 +10,10 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
-from typing import Union, List
+from typing import Union
+
+import itertools
+import weakref
 
 import sympy
 
@@ -21,27 +24,71 @@ def _name(letter: str, *subscripts: Union[str, int]) -> str:
 
 
 class LetterWithSubscripts(sympy.Symbol):
+    """A symbol named by a letter and subscripts, e.g. T_0_1.
+
+    Symbols are interned by name: constructing a symbol with the same name
+    while one is in use returns that instance, so that, e.g.,
+    LetterWithSubscripts('T', 0) and LetterWithSubscripts('T', '0') are the
+    same object. The registry only holds weak references, so a symbol is
+    freed once neither the program nor sympy's bounded cache refers to it.
+    Each symbol has an integer `symbol_id`, in
+    order of creation within the process; ids are not shared between
+    processes and are not preserved by pickling. The string form and hash
+    are computed once. The hash is that of the plain `sympy.Symbol` with the
+    same name, so symbols still compare and hash equal to plain symbols and
+    work with `cirq.ParamResolver`.
+    """
 
     def __new__(cls, letter: str, *subscripts: Union[str, int]):
-        return super().__new__(cls, _name(letter, *subscripts))
+        name = _name(letter, *subscripts)
+        symbol = _REGISTRY.get(name)
+        if symbol is None:
+            symbol = super().__new__(cls, name)
+            symbol.letter = letter
+            symbol.subscripts = subscripts
+            symbol.symbol_id = next(_SYMBOL_IDS)
+            symbol._name = name
+            symbol._hash = hash(sympy.Symbol(name))
+            _REGISTRY[name] = symbol
+            _SYMBOLS[symbol.symbol_id] = symbol
+        return symbol
 
     def __init__(self,
                  letter: str,
                  *subscripts: Union[str, int]) -> None:
-        self.letter = letter
-        self.subscripts = subscripts
+        # The attributes are set once, when the symbol is interned
         super().__init__()
 
+    @staticmethod
+    def from_id(symbol_id: int) -> 'LetterWithSubscripts':
+        """Returns the symbol with a given `symbol_id`.
+
+        Raises:
+            KeyError: No symbol with that id is in use in this process.
+        """
+        return _SYMBOLS[symbol_id]
+
+    def __reduce__(self):
+        # Unpickling goes through __new__, so it returns the interned symbol
+        return LetterWithSubscripts, (self.letter,) + tuple(self.subscripts)
+
     def __eq__(self, other):
+        if self is other:
+            return True
+        if isinstance(other, LetterWithSubscripts):
+            return self._name == other._name
         if not isinstance(other, sympy.Symbol):
             return NotImplemented
-        return str(self) == str(other)
+        return self._name == str(other)
 
     def __ne__(self, other):
         return not self == other
 
     def __hash__(self):
-        return hash(sympy.Symbol(str(self)))
+        return self._hash
+
+    def __str__(self):
+        return self._name
 
     def __repr__(self):
         return (
@@ -55,3 +102,11 @@ class LetterWithSubscripts(sympy.Symbol):
         if old == self:
             return new
         return super()._subs(old, new, **hints)
+
+
+# The interned symbols that are in use, by name and by symbol_id
+_REGISTRY = weakref.WeakValueDictionary(
+        )  # type: weakref.WeakValueDictionary[str, LetterWithSubscripts]
+_SYMBOLS = weakref.WeakValueDictionary(
+        )  # type: weakref.WeakValueDictionary[int, LetterWithSubscripts]
+_SYMBOL_IDS = itertools.count()
@@ -10,6 +10,10 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+import gc
+import pickle
+
+import pytest
 import sympy
 
 import cirq
@@ -35,6 +39,35 @@ def test_equality():
     eq.add_equality_group(LetterWithSubscripts('T', 0, 2))
 
 
+def test_letter_with_subscripts_interned():
+    symbol = LetterWithSubscripts('T', 3, 4)
+    assert LetterWithSubscripts('T', 3, 4) is symbol
+    assert LetterWithSubscripts.from_id(symbol.symbol_id) is symbol
+    assert LetterWithSubscripts('T', 4, 3).symbol_id != symbol.symbol_id
+    assert hash(symbol) == hash(sympy.Symbol('T_3_4'))
+    assert pickle.loads(pickle.dumps(symbol)) is symbol
+    # Symbols with the same name are the same instance
+    assert LetterWithSubscripts('T', '3', 4) is symbol
+    assert LetterWithSubscripts('T_3', 4) is symbol
+
+
+def test_letter_with_subscripts_registry_is_weak():
+    symbol_id = LetterWithSubscripts('U', 5, 6).symbol_id
+    sympy.core.cache.clear_cache()
+    gc.collect()
+    with pytest.raises(KeyError):
+        _ = LetterWithSubscripts.from_id(symbol_id)
+    assert LetterWithSubscripts('U', 5, 6).symbol_id != symbol_id
+
+
+def test_letter_with_subscripts_param_resolver():
+    symbol = LetterWithSubscripts('T', 0, 1)
+    resolver = cirq.ParamResolver({'T_0_1': 0.5})
+    assert resolver.value_of(symbol) == 0.5
+    assert cirq.resolve_parameters(
+            cirq.XPowGate(exponent=symbol), resolver) == cirq.X**0.5
+
+
 @cirq.testing.only_test_in_python3
 def test_substitute_works():
     assert LetterWithSubscripts('T', 1, 2).subs({'T_1_2': 5}) == 5
@@ -10,7 +10,7 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
-from typing import Optional, Tuple, Union
+from typing import Optional, Sequence, Tuple, Union
 
 import abc
 
@@ -47,6 +47,19 @@ class VariationalObjective(metaclass=abc.ABCMeta):
         """
         pass
 
+    def value_batch(self,
+                    circuit_outputs: Sequence[Union[cirq.TrialResult,
+                                                    cirq.SimulationTrialResult,
+                                                    numpy.ndarray]]
+                    ) -> numpy.ndarray:
+        """The evaluation function for a batch of circuit outputs.
+
+        A two-dimensional array is interpreted as a batch of state vectors,
+        one per row.
+        """
+        # Default: evaluate the circuit outputs one at a time
+        return numpy.array([self.value(output) for output in circuit_outputs])
+
     def noise(self, cost: Optional[float]=None) -> float:
         """Artificial noise that may be added to the true objective value.
 
@@ -13,8 +13,8 @@
 """The variational study class."""
 
 from typing import (
-        Any, Dict, Hashable, Iterable, List, Optional, Sequence, Type, Union,
-        cast)
+        Any, Callable, Dict, Hashable, Iterable, Iterator, List, Optional,
+        Sequence, TYPE_CHECKING, Tuple, Type, Union, cast)
 
 import collections
 import itertools
@@ -22,6 +22,7 @@ import multiprocessing
 import os
 import pickle
 import time
+import weakref
 
 import numpy
 
@@ -34,7 +35,12 @@ from openfermioncirq.optimization import (
         OptimizationParams,
         OptimizationResult,
         OptimizationTrialResult,
-        StatefulBlackBox)
+        StatefulBlackBox,
+        StopOptimization)
+
+if TYPE_CHECKING:
+    # pylint: disable=unused-import
+    import multiprocessing.pool
 
 
 class VariationalStudy:
@@ -44,6 +50,34 @@ class VariationalStudy:
     of a variational ansatz. It contains methods for performing optimizations
     and saving and loading the results.
 
+    Optimizations that use multiprocessing run in a pool of worker processes
+    that is kept by the study and reused by later optimizations. The ansatz
+    and objective, whose circuit and Hamiltonian matrix can be large, are
+    sent to each worker once, when the pool is started, and the tasks only
+    carry the optimization parameters, seeds and stopping criteria. Call
+    `close`, or use the study as a context manager, to stop the workers when
+    they are no longer needed; they are also stopped when the study is
+    garbage collected.
+
+    If `log_results` is set, each OptimizationResult is appended to the
+    file `<name>.results` in the data directory as soon as its run
+    finishes, so that a crash partway through a long sweep loses only the
+    runs in progress. Loading the study reads the runs recorded in that file
+    back into `trial_results`, even if the study was never saved, and
+    running a sweep again with the same identifiers and seeds skips the runs
+    that are already done.
+
+    If `stop_at_target` is set, a run whose black box evaluates a value at
+    most `target` stops there, and the repetitions of the sweep that have
+    not finished yet are cancelled: those that have not started are skipped
+    and those in progress stop at their next evaluation. A `stopping_rule`
+    stops individual runs without cancelling the others. Early stopping
+    needs a black box type that is a subclass of StatefulBlackBox, except
+    that a run of another type that reaches the target still cancels the
+    remaining ones once it finishes. Runs that were stopped have their
+    `stopped_early` attribute set, and the trial results count the
+    repetitions that were cancelled before they started.
+
     Example::
         ansatz = SomeVariationalAnsatz()
         objective = SomeVariationalObjective()
@@ -68,6 +102,12 @@ class VariationalStudy:
             optimization runs of the study. Key is the identifier used to
             label the run.
         num_params: The number of parameters in the circuit.
+        log_results: Whether finished runs are appended to the result log.
+        stop_at_target: Whether runs stop, and the remaining runs of a sweep
+            are cancelled, once a value reaches the target.
+        stopping_rule: An optional function that is called with the black
+            box of a run after each evaluation, and that returns True to stop
+            the run.
     """
 
     def __init__(self,
@@ -80,7 +120,11 @@ class VariationalStudy:
                  black_box_type: Type[
                      variational_black_box.VariationalBlackBox]=
                      variational_black_box.UNITARY_SIMULATE,
-                 datadir: Optional[str]=None) -> None:
+                 datadir: Optional[str]=None,
+                 log_results: bool=False,
+                 stop_at_target: bool=False,
+                 stopping_rule: Optional[
+                     Callable[[StatefulBlackBox], bool]]=None) -> None:
         """
         Args:
             name: The name of the study.
@@ -95,6 +139,16 @@ class VariationalStudy:
                 optimization.
             datadir: The directory to use when saving the study. The default
                 behavior is to use the current working directory.
+            log_results: Whether to append the result of each run to the
+                result log of the study as soon as it finishes.
+            stop_at_target: Whether to stop a run as soon as it evaluates a
+                value at most the target, and then cancel the runs of the
+                sweep that have not finished. Runs in progress only stop
+                early if the black box type is a StatefulBlackBox.
+            stopping_rule: A function that is called with the black box of a
+                run after each evaluation, and that returns True to stop the
+                run. It is only called for StatefulBlackBox types, and must
+                be picklable to use multiprocessing or to save the study.
         """
         # TODO store results as a pandas DataFrame?
         self.name = name
@@ -108,6 +162,18 @@ class VariationalStudy:
         self._circuit = self._preparation_circuit + self._ansatz.circuit
         self._black_box_type = black_box_type
         self.datadir = datadir
+        self.log_results = log_results
+        self.stop_at_target = stop_at_target
+        self.stopping_rule = stopping_rule
+        # The runs recorded in the result log, by identifier and seed
+        self._completed_runs = {} \
+            # type: Dict[Tuple[Hashable, Optional[int]], OptimizationResult]
+        self._pool = None  # type: Optional[multiprocessing.pool.Pool]
+        self._pool_key = None  # type: Optional[Tuple[int, int]]
+        # Stops the workers if the study is garbage collected
+        self._pool_finalizer = None  # type: Optional[weakref.finalize]
+        # Shared with the workers to cancel the tasks of earlier calls
+        self._cancel_counter = None  # type: Optional[Any]
 
     def optimize(self,
                  optimization_params: OptimizationParams,
@@ -209,8 +275,8 @@ class VariationalStudy:
             seeds: Random number generator seeds to use for the repetitions.
                 The default behavior is to randomly generate an independent seed
                 for each repetition.
-            use_multiprocessing: Whether to use multiprocessing to run
-                repetitions in different processes.
+            use_multiprocessing: Whether to use multiprocessing to run the
+                repetitions of all the runs in different processes.
             num_processes: The number of processes to use for multiprocessing.
                 The default behavior is to use the output of
                 `multiprocessing.cpu_count()`.
@@ -219,54 +285,93 @@ class VariationalStudy:
             Saves the returned OptimizationTrialResult into the results
             dictionary
         """
+        param_sweep = list(param_sweep)
+        identifiers = list(itertools.islice(
+            self._identifiers(identifiers), len(param_sweep)))
+        for _ in self.optimize_sweep_iter(param_sweep,
+                                          identifiers,
+                                          reevaluate_final_params,
+                                          save_x_vals,
+                                          repetitions,
+                                          seeds,
+                                          use_multiprocessing,
+                                          num_processes):
+            pass
+        return [self.trial_results[identifier] for identifier in identifiers]
+
+    def optimize_sweep_iter(self,
+                            param_sweep: Iterable[OptimizationParams],
+                            identifiers: Optional[Iterable[Hashable]]=None,
+                            reevaluate_final_params: bool=False,
+                            save_x_vals: bool=False,
+                            repetitions: int=1,
+                            seeds: Optional[Sequence[int]]=None,
+                            use_multiprocessing: bool=False,
+                            num_processes: Optional[int]=None
+                            ) -> Iterator[Tuple[Hashable, OptimizationResult]]:
+        """Perform multiple optimization runs, yielding results as they finish.
+
+        This is like `optimize_sweep`, but yields a tuple (identifier, result)
+        as soon as each repetition finishes, in the order in which they
+        finish. Once all of them have finished, the results are saved into
+        `trial_results` as by `optimize_sweep`. Stopping the iteration early
+        leaves `trial_results` unchanged, although the finished runs are in
+        the result log if `log_results` is set.
+
+        If `log_results` is set, repetitions whose identifier and seed match
+        a run in the result log are not run again; the logged result is used
+        instead. Pass the same seeds to resume an interrupted sweep.
+
+        Repetitions that are cancelled before they start because another run
+        reached the target are not yielded, and are counted by the
+        `cancelled_repetitions` attribute of the trial results.
+        """
         if seeds is not None and len(seeds) < repetitions:
             raise ValueError(
                     "Provided fewer RNG seeds than the number of repetitions.")
 
-        if identifiers is None:
-            # Choose a sequence of integers as identifiers
-            existing_integer_keys = {key for key in self.trial_results
-                                     if isinstance(key, int)}
-            if existing_integer_keys:
-                start = max(existing_integer_keys) + 1
-            else:
-                start = 0
-            identifiers = itertools.count(cast(int, start))  # type: ignore
-
-
-        if use_multiprocessing and repetitions == 1:
-            trial_results = self._get_trial_result_list(
-                    param_sweep,
-                    identifiers,
-                    reevaluate_final_params,
-                    save_x_vals,
-                    seeds,
-                    num_processes)
-            for identifier, trial_result in zip(identifiers, trial_results):
-                self.trial_results[identifier] = trial_result
-        else:
-            trial_results = []
-            for identifier, optimization_params in zip(
-                    identifiers, param_sweep):
-
-                result_list = self._get_result_list(
-                        optimization_params,
-                        reevaluate_final_params,
-                        save_x_vals,
-                        repetitions,
-                        seeds,
-                        use_multiprocessing,
-                        num_processes)
-
-                trial_result = OptimizationTrialResult(result_list,
-                                                       optimization_params)
-                trial_results.append(trial_result)
-
-                # Save the result into the trial_results dictionary
-                self.trial_results[identifier] = trial_result
-
-        return trial_results
+        param_sweep = list(param_sweep)
+        identifiers = list(itertools.islice(
+            self._identifiers(identifiers), len(param_sweep)))
+        param_sweep = param_sweep[:len(identifiers)]
 
+        result_lists = [[None] * repetitions for _ in param_sweep] \
+            # type: List[List[Any]]
+        for (i, j), result in self._run_repetitions(
+                param_sweep,
+                identifiers,
+                reevaluate_final_params,
+                save_x_vals,
+                repetitions,
+                seeds,
+                use_multiprocessing,
+                num_processes,
+                skip_completed=True):
+            result_lists[i][j] = result
+            yield identifiers[i], result
+
+        for identifier, optimization_params, result_list in zip(
+                identifiers, param_sweep, result_lists):
+            # Save the result into the trial_results dictionary
+            trial_result = OptimizationTrialResult(
+                    [result for result in result_list if result is not None],
+                    optimization_params)
+            trial_result.cancelled_repetitions = sum(
+                    result is None for result in result_list)
+            self.trial_results[identifier] = trial_result
+
+    def _identifiers(self, identifiers: Optional[Iterable[Hashable]]
+                     ) -> Iterable[Hashable]:
+        if identifiers is not None:
+            return identifiers
+        # Choose a sequence of integers as identifiers
+        existing_integer_keys = {key for key in self.trial_results
+                                 if isinstance(key, int)}
+        if existing_integer_keys:
+            start = max(existing_integer_keys) + 1
+        else:
+            start = 0
+        return itertools.count(cast(int, start))
 
     def extend_result(self,
                       identifier: Hashable,
@@ -319,115 +424,200 @@ class VariationalStudy:
 
         optimization_params = self.trial_results[identifier].params
 
-        result_list = self._get_result_list(
-                optimization_params,
+        result_list = [None] * repetitions  # type: List[Any]
+        for (_, j), result in self._run_repetitions(
+                [optimization_params],
+                [identifier],
                 reevaluate_final_params,
                 save_x_vals,
                 repetitions,
                 seeds,
                 use_multiprocessing,
-                num_processes)
+                num_processes):
+            result_list[j] = result
 
-        self.trial_results[identifier].extend(result_list)
+        trial_result = self.trial_results[identifier]
+        trial_result.extend(
+                [result for result in result_list if result is not None])
+        trial_result.cancelled_repetitions += sum(
+                result is None for result in result_list)
 
-    def _get_trial_result_list(
+    def _run_repetitions(
             self,
-            param_sweep: Iterable[OptimizationParams],
-            identifiers: Optional[Iterable[Hashable]],
+            param_sweep: Sequence[OptimizationParams],
+            identifiers: Sequence[Hashable],
             reevaluate_final_params: bool,
             save_x_vals: bool,
-            seeds: Optional[Sequence[int]],
-            num_processes: Optional[int]
-            ) -> List[OptimizationTrialResult]:
+            repetitions: int=1,
+            seeds: Optional[Sequence[int]]=None,
+            use_multiprocessing: bool=False,
+            num_processes: Optional[int]=None,
+            skip_completed: bool=False
+            ) -> Iterator[Tuple[Tuple[int, int], OptimizationResult]]:
+        """Runs the repetitions of each entry of a parameter sweep.
+
+        With multiprocessing, each repetition of each entry is a separate task
+        and the workers take the next task as soon as they finish one, so
+        that slow runs do not leave processes idle.
+
+        Yields:
+            Tuples ((i, j), result) with the result of the j-th repetition of
+            the i-th entry, in the order in which the runs finish. Repetitions
+            that are cancelled before they start are not yielded.
+        """
+        target_reached = False
+        # The stopping criteria are sent with each task rather than when the
+        # workers start, so that changes to them apply to a running pool
+        stopping_args = (self.target if self.stop_at_target else None,
+                         self.stopping_rule)  # type: Tuple
+        tasks = []
+        for i, optimization_params in enumerate(param_sweep):
+            for j in range(repetitions):
+                seed = (seeds[j] if seeds is not None
+                        else numpy.random.randint(4294967296))
+                completed = self._completed_runs.get((identifiers[i], seed))
+                if skip_completed and completed is not None:
+                    target_reached |= self._reached_target(completed)
+                    yield (i, j), completed
+                    continue
+                tasks.append(((i, j), stopping_args + (optimization_params,
+                                                       reevaluate_final_params,
+                                                       save_x_vals,
+                                                       seed)))
+
+        if use_multiprocessing and tasks:
+            pool = self._worker_pool(num_processes)
+            counter = cast(Any, self._cancel_counter)
+        else:
+            counter = multiprocessing.Value('l', 0)
+        cancellation = _Cancellation(counter, counter.value)
+        tasks = [(index, (cancellation.generation,) + task)
+                 for index, task in tasks]
+        if use_multiprocessing and tasks:
+            finished = pool.imap_unordered(
+                    _run_optimization_in_worker, tasks
+            )  # type: Iterator[_IndexedResult]
+        else:
+            worker_args = self._worker_state(counter)
+            finished = ((index, _run_optimization(worker_args + task))
+                        for index, task in tasks)
+        if target_reached:
+            cancellation.set()
 
-        if num_processes is None:
-            # coverage: ignore
-            num_processes = multiprocessing.cpu_count()
-        pool = multiprocessing.Pool(num_processes)
         try:
-            arg_tuples = (
-                (
-                    self.ansatz,
-                    self.objective,
-                    self._preparation_circuit,
-                    self.initial_state,
-                    optimization_params,
-                    reevaluate_final_params,
-                    save_x_vals,
-                    seeds[0] if seeds is not None
-                    else numpy.random.randint(4294967296),
-                    self.ansatz.default_initial_params(),
-                    self._black_box_type
-                )
-                for optimization_params in param_sweep
-            )
-            result_list = pool.map(_run_optimization, arg_tuples)
-            trial_results = [
-                    OptimizationTrialResult([result], optimization_params)
-                    for optimization_params, result in
-                    zip(param_sweep, result_list)
-            ]
+            for (i, j), result in finished:
+                if result is None:
+                    # The run was cancelled before it started
+                    continue
+                if self.log_results:
+                    self._log_result(identifiers[i], param_sweep[i], result)
+                yield (i, j), result
         finally:
-            pool.terminate()
+            # If the caller stopped early, the runs that are left would
+            # otherwise keep the workers busy
+            cancellation.set()
+
+    def _log_result(self,
+                    identifier: Hashable,
+                    optimization_params: OptimizationParams,
+                    result: OptimizationResult) -> None:
+        """Appends a finished run to the result log.
+
+        The log starts with the arguments needed to construct the study, so
+        that it can be loaded without having been saved, followed by one
+        record (identifier, optimization_params, result) for each run.
+        """
+        filename = self._filename('results')
+        if self.datadir is not None and not os.path.isdir(self.datadir):
+            os.mkdir(self.datadir)
+        is_new = not os.path.exists(filename)
+        with open(filename, 'ab') as f:
+            if is_new:
+                pickle.dump((type(self), self._init_kwargs()), f)
+            pickle.dump((identifier, optimization_params, result), f)
+        self._completed_runs[identifier, result.seed] = result
+
+    def _restore_logged_results(self, filename: str) -> None:
+        """Adds the runs recorded in a result log that are missing from
+        `trial_results`."""
+        _, records = _read_result_log(filename)
+        for identifier, optimization_params, result in records:
+            self._completed_runs[identifier, result.seed] = result
+            if identifier not in self.trial_results:
+                self.trial_results[identifier] = OptimizationTrialResult(
+                        [result], optimization_params)
+            elif result.seed not in {
+                    logged.seed
+                    for logged in self.trial_results[identifier].results}:
+                self.trial_results[identifier].extend([result])
+
+    def _reached_target(self, result: OptimizationResult) -> bool:
+        return (self.stop_at_target and self.target is not None and
+                result.optimal_value is not None and
+                result.optimal_value <= self.target)
+
+    def _filename(self, extension: str) -> str:
+        filename = '{}.{}'.format(self.name, extension)
+        if self.datadir is not None:
+            filename = os.path.join(self.datadir, filename)
+        return filename
 
-        return trial_results
+    def _worker_state(self, cancel_counter) -> Tuple:
+        """The arguments of optimization runs that are shared by all tasks.
 
-    def _get_result_list(
-            self,
-            optimization_params,
-            reevaluate_final_params: bool,
-            save_x_vals: bool,
-            repetitions: int=1,
-            seeds: Optional[Sequence[int]]=None,
-            use_multiprocessing: bool=False,
-            num_processes: Optional[int]=None
-            ) -> List[OptimizationResult]:
+        Args:
+            cancel_counter: A shared integer that is incremented to cancel
+                the runs of the tasks that have not finished.
+        """
+        return (self.ansatz,
+                self.objective,
+                self._preparation_circuit,
+                self.initial_state,
+                self.ansatz.default_initial_params(),
+                self._black_box_type,
+                cancel_counter)
 
-        if use_multiprocessing:
-            if num_processes is None:
-                num_processes = multiprocessing.cpu_count()
-            pool = multiprocessing.Pool(num_processes)
-            try:
-                arg_tuples = (
-                    (
-                        self.ansatz,
-                        self.objective,
-                        self._preparation_circuit,
-                        self.initial_state,
-                        optimization_params,
-                        reevaluate_final_params,
-                        save_x_vals,
-                        seeds[i] if seeds is not None
-                        else numpy.random.randint(4294967296),
-                        self.ansatz.default_initial_params(),
-                        self._black_box_type
-                    )
-                    for i in range(repetitions)
-                )
-                result_list = pool.map(_run_optimization, arg_tuples)
-            finally:
-                pool.terminate()
-        else:
-            result_list = []
-            for i in range(repetitions):
-                result = _run_optimization(
-                    (
-                        self.ansatz,
-                        self.objective,
-                        self._preparation_circuit,
-                        self.initial_state,
-                        optimization_params,
-                        reevaluate_final_params,
-                        save_x_vals,
-                        seeds[i] if seeds is not None
-                        else numpy.random.randint(4294967296),
-                        self.ansatz.default_initial_params(),
-                        self._black_box_type
-                    )
-                )
-                result_list.append(result)
-
-        return result_list
+    def _worker_pool(self, num_processes: Optional[int]
+                     ) -> 'multiprocessing.pool.Pool':
+        """The pool of worker processes, started if needed.
+
+        A new pool is started if the number of processes changed, or if the
+        initial state was replaced since the workers were started.
+        """
+        if num_processes is None:
+            # coverage: ignore
+            num_processes = multiprocessing.cpu_count()
+        key = (num_processes, id(self.initial_state))
+        if self._pool is None or self._pool_key != key:
+            self.close()
+            self._cancel_counter = multiprocessing.Value('l', 0)
+            self._pool = multiprocessing.Pool(
+                    num_processes,
+                    initializer=_initialize_worker,
+                    initargs=(self._worker_state(self._cancel_counter),))
+            self._pool_key = key
+            self._pool_finalizer = weakref.finalize(
+                    self, _stop_pool, self._pool)
+        return self._pool
+
+    def close(self) -> None:
+        """Stops the worker processes of the study, if any.
+
+        They are started again by the next optimization that uses
+        multiprocessing.
+        """
+        if self._pool_finalizer is not None:
+            self._pool_finalizer()
+            self._pool_finalizer = None
+        self._pool = None
+        self._pool_key = None
+        self._cancel_counter = None
+
+    def __enter__(self) -> 'VariationalStudy':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
 
     def __str__(self) -> str:
         header = []   # type: List[str]
@@ -516,7 +706,7 @@ class VariationalStudy:
     @property
     def num_params(self) -> int:
         """The number of parameters of the ansatz."""
-        return len(list(self.ansatz.params()))
+        return self.ansatz.num_params
 
     def value_of(self,
                  params: numpy.ndarray) -> float:
@@ -539,15 +729,16 @@ class VariationalStudy:
                 'preparation_circuit': self._preparation_circuit,
                 'initial_state': self.initial_state,
                 'target': self.target,
-                'black_box_type': self._black_box_type}
+                'black_box_type': self._black_box_type,
+                'log_results': self.log_results,
+                'stop_at_target': self.stop_at_target,
+                'stopping_rule': self.stopping_rule}
 
     def save(self) -> None:
         """Save the study to disk."""
-        filename = '{}.study'.format(self.name)
-        if self.datadir is not None:
-            filename = os.path.join(self.datadir, filename)
-            if not os.path.isdir(self.datadir):
-                os.mkdir(self.datadir)
+        filename = self._filename('study')
+        if self.datadir is not None and not os.path.isdir(self.datadir):
+            os.mkdir(self.datadir)
         with open(filename, 'wb') as f:
             pickle.dump(
                     (type(self), self._init_kwargs(), self.trial_results), f)
@@ -556,39 +747,127 @@ class VariationalStudy:
     def load(name: str, datadir: Optional[str]=None) -> 'VariationalStudy':
         """Load a study from disk.
 
+        The runs recorded in the result log of the study, if there is one,
+        are added to the trial results. If the study was never saved, it is
+        loaded from its result log alone.
+
         Args:
             name: The name of the study.
             datadir: The directory where the study file is saved.
         """
         if name.endswith('.study'):
-            filename = name
-        else:
-            filename = '{}.study'.format(name)
+            name = name[:-len('.study')]
+        filename = '{}.study'.format(name)
+        log_filename = '{}.results'.format(name)
         if datadir is not None:
             filename = os.path.join(datadir, filename)
-        with open(filename, 'rb') as f:
-            cls, kwargs, trial_results = pickle.load(f)
+            log_filename = os.path.join(datadir, log_filename)
+
+        if os.path.exists(filename) or not os.path.exists(log_filename):
+            with open(filename, 'rb') as f:
+                cls, kwargs, trial_results = pickle.load(f)
+        else:
+            (cls, kwargs), _ = _read_result_log(log_filename)
+            trial_results = {}
         study = cls(datadir=datadir, **kwargs)
         for key, val in trial_results.items():
             study.trial_results[key] = val
+        if os.path.exists(log_filename):
+            study._restore_logged_results(log_filename)
         return study
 
 
-def _run_optimization(args) -> OptimizationResult:
-    """Perform an optimization run and return the result."""
+def _read_result_log(filename: str) -> Tuple[Tuple, List[Tuple]]:
+    """Reads the header and the records of a result log.
+
+    A record cut short by a crash while it was being written is ignored.
+    """
+    records = []
+    with open(filename, 'rb') as f:
+        header = pickle.load(f)
+        while True:
+            try:
+                records.append(pickle.load(f))
+            except (EOFError, pickle.UnpicklingError):
+                break
+    return header, records
+
+
+# The arguments shared by the tasks run in a worker process, set when the
+# worker is started
+_worker_args = None  # type: Optional[Tuple]
+
+
+class _Cancellation:
+    """Cancels the runs of the tasks submitted by one call.
+
+    Tasks carry the value of a counter shared with the workers at the time
+    they were submitted, and are cancelled once the counter has moved on,
+    so that cancelling never affects the tasks of later calls.
+    """
+
+    def __init__(self, counter, generation: int) -> None:
+        self.counter = counter
+        self.generation = generation
+
+    def is_set(self) -> bool:
+        return self.counter.value != self.generation
+
+    def set(self) -> None:
+        with self.counter.get_lock():
+            if self.counter.value == self.generation:
+                self.counter.value += 1
+
+
+def _stop_pool(pool: 'multiprocessing.pool.Pool') -> None:
+    pool.terminate()
+    pool.join()
+
+
+def _initialize_worker(worker_args: Tuple) -> None:
+    global _worker_args
+    _worker_args = worker_args
+
+
+# The index (i, j) of the j-th repetition of the i-th entry of a sweep, with
+# the result of that run or None if it was cancelled
+_IndexedResult = Tuple[Tuple[int, int], Optional[OptimizationResult]]
+
+
+def _run_optimization_in_worker(indexed_task: Tuple[Tuple[int, int], Tuple]
+                                ) -> _IndexedResult:
+    index, task = indexed_task
+    return index, _run_optimization(cast(Tuple, _worker_args) + task)
+
+
+def _run_optimization(args) -> Optional[OptimizationResult]:
+    """Perform an optimization run and return the result, or None if the run
+    was cancelled before it started."""
     (
             ansatz,
             objective,
             preparation_circuit,
             initial_state,
+            default_initial_params,
+            black_box_type,
+            cancel_counter,
+            generation,
+            target,
+            stopping_rule,
             optimization_params,
             reevaluate_final_params,
             save_x_vals,
-            seed,
-            default_initial_params,
-            black_box_type
+            seed
     ) = args
 
+    cancellation = _Cancellation(cancel_counter, generation)
+    if cancellation.is_set():
+        return None
+
+    def should_stop(black_box: StatefulBlackBox) -> bool:
+        return cancellation.is_set() or (stopping_rule is not None and
+                                         stopping_rule(black_box))
+
     stateful = issubclass(black_box_type, StatefulBlackBox)
 
     if stateful:
@@ -598,7 +877,12 @@ def _run_optimization(args) -> OptimizationResult:
                 preparation_circuit=preparation_circuit,
                 initial_state=initial_state,
                 cost_of_evaluate=optimization_params.cost_of_evaluate,
-                save_x_vals=save_x_vals)
+                save_x_vals=save_x_vals,
+                evaluation_cache_size=optimization_params.evaluation_cache_size,
+                evaluation_cache_tolerance=(
+                    optimization_params.evaluation_cache_tolerance),
+                target=target,
+                stopping_rule=should_stop)
     else:
         black_box = black_box_type(  # type: ignore
                 ansatz=ansatz,
@@ -616,11 +900,23 @@ def _run_optimization(args) -> OptimizationResult:
 
     numpy.random.seed(seed)
     t0 = time.time()
-    result = optimization_params.algorithm.optimize(black_box,
-                                                    initial_guess,
-                                                    initial_guess_array)
+    try:
+        result = optimization_params.algorithm.optimize(black_box,
+                                                        initial_guess,
+                                                        initial_guess_array)
+    except StopOptimization:
+        result = OptimizationResult(
+                optimal_value=black_box.best_value,
+                optimal_parameters=black_box.best_point,
+                message='Stopped early.',
+                stopped_early=True)
     t1 = time.time()
 
+    if target is not None and (black_box.target_reached if stateful
+                               else result.optimal_value <= target):
+        # Cancel the other runs
+        cancellation.set()
+
     result.seed = seed
     result.time = t1 - t0
     if stateful:
@@ -628,6 +924,8 @@ def _run_optimization(args) -> OptimizationResult:
         result.cost_spent = black_box.cost_spent
         result.function_values = black_box.function_values
         result.wait_times = black_box.wait_times
+        result.cache_hits = black_box.cache_hits
+        result.cache_misses = black_box.cache_misses
     if reevaluate_final_params:
         result.optimal_value = black_box.evaluate_noiseless(
                 result.optimal_parameters)
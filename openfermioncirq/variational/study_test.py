@@ -10,6 +10,7 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+import gc
 import os
 
 import numpy
@@ -137,6 +138,29 @@ def test_variational_study_optimize_and_extend_and_summary():
     assert isinstance(study.trial_results['lazy'].params.algorithm,
                       LazyAlgorithm)
 
+    # The worker processes are kept for later optimizations
+    pool = study._pool
+    study.extend_result('test',
+                        repetitions=2,
+                        use_multiprocessing=True,
+                        num_processes=2)
+    assert study._pool is pool
+    assert study.trial_results['test'].repetitions == 3
+
+    # Every repetition of every run of a sweep is a separate task
+    trial_results = study.optimize_sweep(
+            [OptimizationParams(test_algorithm),
+                OptimizationParams(LazyAlgorithm())],
+            repetitions=2,
+            seeds=[3, 4],
+            use_multiprocessing=True,
+            num_processes=2)
+    assert [result.repetitions for result in trial_results] == [2, 2]
+    assert [result.seed for result in trial_results[1].results] == [3, 4]
+    assert study._pool is pool
+    study.close()
+    assert study._pool is None
+
     # Try extending non-existent run
     with pytest.raises(KeyError):
         study.extend_result('run100')
@@ -236,6 +260,147 @@ def test_variational_study_save_load():
     os.rmdir(datadir)
 
 
+def test_variational_study_result_log(tmpdir):
+    datadir = str(tmpdir)
+    study = VariationalStudy('log_study', test_ansatz, test_objective,
+                             datadir=datadir, log_results=True)
+    param_sweep = [OptimizationParams(LazyAlgorithm()),
+                   OptimizationParams(test_algorithm)]
+
+    # Stop after the first run, as if the sweep had been interrupted
+    for identifier, result in study.optimize_sweep_iter(
+            param_sweep, ['a', 'b'], repetitions=2, seeds=[5, 6]):
+        assert (identifier, result.seed) == ('a', 5)
+        break
+    assert not study.trial_results
+
+    # The study was never saved, so it is loaded from its result log
+    loaded_study = VariationalStudy.load('log_study', datadir=datadir)
+    assert loaded_study.log_results
+    first_run, = loaded_study.trial_results['a'].results
+    assert first_run.seed == 5
+
+    # Resuming the sweep skips the run that is already done
+    trial_results = loaded_study.optimize_sweep(
+            param_sweep, ['a', 'b'], repetitions=2, seeds=[5, 6])
+    assert trial_results[0].results[0] is first_run
+    assert [result.seed for trial_result in trial_results
+            for result in trial_result.results] == [5, 6, 5, 6]
+
+    loaded_study.save()
+    loaded_study = VariationalStudy.load('log_study', datadir=datadir)
+    assert [loaded_study.trial_results[identifier].repetitions
+            for identifier in ('a', 'b')] == [2, 2]
+
+
+def test_variational_study_result_log_closed_early(tmpdir):
+    datadir = str(tmpdir)
+    study = VariationalStudy('closed_study', test_ansatz, test_objective,
+                             datadir=datadir, log_results=True)
+    param_sweep = [OptimizationParams(test_algorithm)] * 2
+
+    # Stop consuming the sweep after the first run
+    results = study.optimize_sweep_iter(
+            param_sweep, ['a', 'b'], repetitions=3, seeds=[5, 6, 7],
+            use_multiprocessing=True, num_processes=1)
+    identifier, _ = next(results)
+    results.close()
+
+    # The runs that are left were cancelled, which does not affect the
+    # runs of later sweeps on the same pool
+    assert study._cancel_counter.value == 1
+    trial_results = study.optimize_sweep(
+            param_sweep[:1], ['c'], repetitions=2, seeds=[1, 2],
+            use_multiprocessing=True, num_processes=1)
+    assert trial_results[0].repetitions == 2
+    study.close()
+
+    loaded_study = VariationalStudy.load('closed_study', datadir=datadir)
+    assert sorted(loaded_study.trial_results) == sorted([identifier, 'c'])
+    assert loaded_study.trial_results[identifier].repetitions == 1
+    assert loaded_study.trial_results['c'].repetitions == 2
+
+
+def _stop_after_three_evaluations(black_box):
+    return black_box.num_evaluations >= 3
+
+
+@pytest.mark.parametrize('use_multiprocessing', [False, True])
+def test_variational_study_stop_at_target(use_multiprocessing):
+    # Every value of the objective is at most 2, so the first evaluation
+    # reaches the target. Runs only stop early with stateful black boxes.
+    study = VariationalStudy(
+            'stop_study', test_ansatz, test_objective,
+            target=2.0, stop_at_target=True,
+            black_box_type=variational_black_box.UNITARY_SIMULATE_STATEFUL)
+    trial_results = study.optimize_sweep(
+            [OptimizationParams(test_algorithm)] * 2,
+            repetitions=2,
+            use_multiprocessing=use_multiprocessing,
+            num_processes=2)
+    study.close()
+
+    results = [result for trial_result in trial_results
+               for result in trial_result.results]
+    assert results
+    assert all(result.stopped_early for result in results)
+    assert all(result.num_evaluations == 1 for result in results)
+    assert len(results) + sum(trial_result.cancelled_repetitions
+                              for trial_result in trial_results) == 4
+    if not use_multiprocessing:
+        assert [trial_result.repetitions
+                for trial_result in trial_results] == [1, 0]
+        assert [trial_result.cancelled_repetitions
+                for trial_result in trial_results] == [1, 2]
+
+
+def test_variational_study_stopping_rule():
+    study = VariationalStudy(
+            'stop_study', test_ansatz, test_objective,
+            target=-1.0,
+            black_box_type=variational_black_box.UNITARY_SIMULATE_STATEFUL,
+            stopping_rule=_stop_after_three_evaluations)
+    result = study.optimize(OptimizationParams(test_algorithm),
+                            repetitions=2)
+    assert result.repetitions == 2
+    assert result.cancelled_repetitions == 0
+    for run in result.results:
+        assert run.stopped_early
+        assert run.num_evaluations == 3
+        assert run.optimal_value == min(run.function_values.values)
+
+
+def test_variational_study_stopping_criteria_apply_to_running_pool():
+    study = VariationalStudy(
+            'stop_study', test_ansatz, test_objective,
+            target=2.0,
+            black_box_type=variational_black_box.UNITARY_SIMULATE_STATEFUL)
+    result = study.optimize(OptimizationParams(test_algorithm),
+                            identifier='full',
+                            use_multiprocessing=True,
+                            num_processes=1)
+    assert not result.results[0].stopped_early
+    pool = study._pool
+
+    study.stop_at_target = True
+    result = study.optimize(OptimizationParams(test_algorithm),
+                            identifier='stopped',
+                            use_multiprocessing=True,
+                            num_processes=1)
+    assert study._pool is pool
+    assert result.results[0].stopped_early
+
+    study.stop_at_target = False
+    study.stopping_rule = _stop_after_three_evaluations
+    result = study.optimize(OptimizationParams(test_algorithm),
+                            identifier='rule',
+                            use_multiprocessing=True,
+                            num_processes=1)
+    study.close()
+    assert result.results[0].stopped_early
+    assert result.results[0].num_evaluations == 3
+
+
 def test_variational_black_box_dimension():
     black_box = XmonSimulateVariationalBlackBox(test_ansatz, test_objective)
     assert black_box.dimension == 2
@@ -273,3 +438,58 @@ def test_variational_black_box_evaluate_with_cost():
     noisy_val = black_box_noisy.evaluate_with_cost(
             numpy.array([0.5, 0.0]), 10.0)
     assert -0.8 < noisy_val < 1.2
+
+
+def test_variational_study_stops_workers_when_collected():
+    study = VariationalStudy('study', test_ansatz, test_objective)
+    study.optimize(OptimizationParams(test_algorithm),
+                   use_multiprocessing=True,
+                   num_processes=1)
+    pool = study._pool
+    del study
+    gc.collect()
+    with pytest.raises(ValueError):
+        pool.apply(abs, (1,))
+
+
+def test_variational_study_compiled_simulate():
+    with VariationalStudy(
+            'study', test_ansatz, test_objective,
+            preparation_circuit=preparation_circuit,
+            black_box_type=variational_black_box.COMPILED_SIMULATE_STATEFUL
+            ) as study:
+        result = study.optimize(
+                OptimizationParams(test_algorithm),
+                repetitions=2,
+                seeds=[1, 2],
+                use_multiprocessing=True)
+    assert study._pool is None
+    assert result.repetitions == 2
+    assert all(result.data_frame['num_evaluations'] > 0)
+    numpy.testing.assert_allclose(
+            study.value_of(numpy.array([0.0, 0.5])),
+            UnitarySimulateVariationalBlackBox(
+                test_ansatz, test_objective, preparation_circuit
+                ).evaluate_noiseless(numpy.array([0.0, 0.5])))
+
+
+def test_variational_study_evaluation_cache():
+    class RepeatingAlgorithm(LazyAlgorithm):
+        def optimize(self, black_box, initial_guess=None,
+                     initial_guess_array=None):
+            _ = black_box.evaluate(initial_guess)
+            return super().optimize(black_box, initial_guess)
+
+    study = VariationalStudy(
+            'study', test_ansatz, test_objective,
+            black_box_type=variational_black_box.COMPILED_SIMULATE_STATEFUL)
+    result = study.optimize(
+            OptimizationParams(RepeatingAlgorithm(),
+                               initial_guess=numpy.array([0.1, 0.2]),
+                               evaluation_cache_size=10),
+            repetitions=2)
+
+    for optimization_result in result.results:
+        assert optimization_result.num_evaluations == 1
+        assert optimization_result.cache_hits == 1
+        assert optimization_result.cache_misses == 1
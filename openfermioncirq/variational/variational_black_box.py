@@ -12,7 +12,7 @@
 
 """Black boxes for variational studies"""
 
-from typing import Optional, Sequence, Tuple, Union
+from typing import Dict, Optional, Sequence, Tuple, Union
 
 import abc
 
@@ -20,7 +20,10 @@ import numpy
 
 import cirq
 
+from openfermioncirq.simulation import CompiledCircuit, NumberSector
 from openfermioncirq.variational.ansatz import VariationalAnsatz
+from openfermioncirq.variational.hamiltonian_objective import (
+        HamiltonianObjective)
 from openfermioncirq.variational.objective import VariationalObjective
 from openfermioncirq.optimization import (
         BlackBox,
@@ -30,11 +33,18 @@ from openfermioncirq.optimization import (
 class VariationalBlackBox(BlackBox):
     """A black box encapsulating a variational ansatz objective function.
 
+    The preparation circuit takes no parameters, so the state it outputs is
+    simulated once and cached, and every evaluation starts from a copy of the
+    cached state. The cache is invalidated when `preparation_circuit` or
+    `initial_state` is assigned a new value. It is not invalidated when either
+    of them is modified in place.
+
     Attributes:
         ansatz: The variational ansatz circuit.
         objective: The objective function.
         preparation_circuit: An optional circuit used to prepare the
             initial state
+        initial_state: The state that the preparation circuit is applied to.
     """
 
     def __init__(self,
@@ -45,19 +55,59 @@ class VariationalBlackBox(BlackBox):
                  **kwargs) -> None:
         self.ansatz = ansatz
         self.objective = objective
+        self._prepared_state = None  # type: Optional[numpy.ndarray]
         self.preparation_circuit = preparation_circuit or cirq.Circuit()
         self.initial_state = initial_state
         super().__init__(**kwargs)
 
+    @property
+    def preparation_circuit(self) -> cirq.Circuit:
+        return self._preparation_circuit
+
+    @preparation_circuit.setter
+    def preparation_circuit(self, preparation_circuit: cirq.Circuit) -> None:
+        self._preparation_circuit = preparation_circuit
+        self._prepared_state = None
+
+    @property
+    def initial_state(self) -> Union[int, numpy.ndarray]:
+        return self._initial_state
+
+    @initial_state.setter
+    def initial_state(self, initial_state: Union[int, numpy.ndarray]) -> None:
+        self._initial_state = initial_state
+        self._prepared_state = None
+
+    @property
+    def prepared_state(self) -> numpy.ndarray:
+        """The read-only output state of the preparation circuit.
+
+        The qubits are ordered by `ansatz.qubit_permutation(ansatz.qubits)`.
+        """
+        if self._prepared_state is None:
+            prepared_state = self._prepare_state()
+            prepared_state.flags.writeable = False
+            self._prepared_state = prepared_state
+        return self._prepared_state
+
+    def _prepare_state(self) -> numpy.ndarray:
+        """Simulates the preparation circuit."""
+        return self.preparation_circuit.apply_unitary_effect_to_state(
+                self.initial_state,
+                qubit_order=self.ansatz.qubit_permutation(self.ansatz.qubits))
+
     @property
     def dimension(self) -> int:
         """The dimension of the array accepted by the objective function."""
-        return len(list(self.ansatz.params()))
+        return self.ansatz.num_params
 
     @property
     def bounds(self) -> Optional[Sequence[Tuple[float, float]]]:
         """Optional bounds on the inputs to the objective function."""
-        return self.ansatz.param_bounds()
+        bounds = self.ansatz.param_table.bounds
+        if bounds is None:
+            return None
+        return [(low, high) for low, high in bounds.tolist()]
 
     @abc.abstractmethod
     def evaluate_noiseless(self,
@@ -65,6 +115,13 @@ class VariationalBlackBox(BlackBox):
         """Evaluate parameters with a noiseless simulation."""
         pass
 
+    def evaluate_noiseless_batch(self,
+                                 xs: numpy.ndarray) -> numpy.ndarray:
+        """Evaluate each row of an array of parameters with a noiseless
+        simulation."""
+        # Default: evaluate the parameters one at a time
+        return numpy.array([self.evaluate_noiseless(x) for x in xs])
+
     def _evaluate(self,
                   x: numpy.ndarray) -> float:
         """Determine the value of some parameters."""
@@ -78,6 +135,20 @@ class VariationalBlackBox(BlackBox):
         # Default: add artifical noise with the specified cost
         return self._evaluate(x) + self.objective.noise(cost)
 
+    def _evaluate_batch(self,
+                        xs: numpy.ndarray) -> numpy.ndarray:
+        """Determine the values of a batch of parameters."""
+        # Default: defer to evaluate_noiseless_batch
+        return self.evaluate_noiseless_batch(xs)
+
+    def _evaluate_with_cost_batch(self,
+                                  xs: numpy.ndarray,
+                                  cost: float) -> numpy.ndarray:
+        """Evaluate a batch of parameters with a specified cost."""
+        # Default: add independent artifical noise to each value
+        noise = numpy.array([self.objective.noise(cost) for _ in xs])
+        return self._evaluate_batch(xs) + noise
+
     def noise_bounds(self,
                      cost: float,
                      confidence: Optional[float]=None
@@ -85,6 +156,12 @@ class VariationalBlackBox(BlackBox):
         """Exact or approximate bounds on noise in the objective function."""
         return self.objective.noise_bounds(cost, confidence)
 
+    def __getstate__(self) -> Dict:
+        # Don't pickle the cached state; it is recomputed where it is needed
+        state = self.__dict__.copy()
+        state['_prepared_state'] = None
+        return state
+
 
 class UnitarySimulateVariationalBlackBox(VariationalBlackBox):
 
@@ -93,10 +170,10 @@ class UnitarySimulateVariationalBlackBox(VariationalBlackBox):
         """Evaluate parameters with a noiseless simulation."""
         # Default: evaluate using apply_unitary_effect_to_state
         circuit = cirq.resolve_parameters(
-                self.preparation_circuit + self.ansatz.circuit,
+                self.ansatz.circuit,
                 self.ansatz.param_resolver(x))
         final_state = circuit.apply_unitary_effect_to_state(
-                self.initial_state,
+                self.prepared_state,
                 qubit_order=self.ansatz.qubit_permutation(self.ansatz.qubits))
         return self.objective.value(final_state)
 
@@ -116,8 +193,8 @@ class XmonSimulateVariationalBlackBox(VariationalBlackBox):
         # Default: evaluate using Xmon simulator
         simulator = cirq.google.XmonSimulator()
         result = simulator.simulate(
-                self.preparation_circuit + self.ansatz.circuit,
-                initial_state=self.initial_state,
+                self.ansatz.circuit,
+                initial_state=self.prepared_state.astype(numpy.complex64),
                 param_resolver=self.ansatz.param_resolver(x),
                 qubit_order=self.ansatz.qubit_permutation(self.ansatz.qubits))
         return self.objective.value(result)
@@ -129,7 +206,298 @@ class XmonSimulateVariationalStatefulBlackBox(XmonSimulateVariationalBlackBox,
     pass
 
 
+class CompiledSimulateVariationalBlackBox(VariationalBlackBox):
+    """Evaluates parameters by running a compiled program of the circuit.
+
+    The ansatz circuit is compiled into a `CompiledCircuit` the first time
+    the black box is evaluated, with the parameters of the ansatz bound in the
+    order of `ansatz.params()`. Runs of gates acting on the same pair of
+    qubits are fused into single passes over the state, and SWAP and FSWAP
+    gates are replaced by a relabeling of the qubits. The compiled program
+    starts from the cached output state of the preparation circuit.
+    Subsequent evaluations only run the compiled program. Batches of
+    parameters are simulated together as a single array of states.
+    """
+
+    def __init__(self,
+                 ansatz: VariationalAnsatz,
+                 objective: VariationalObjective,
+                 preparation_circuit: Optional[cirq.Circuit]=None,
+                 initial_state: Union[int, numpy.ndarray]=0,
+                 **kwargs) -> None:
+        self._compiled_circuit = None  # type: Optional[CompiledCircuit]
+        super().__init__(ansatz,
+                         objective,
+                         preparation_circuit,
+                         initial_state,
+                         **kwargs)
+
+    @property
+    def compiled_circuit(self) -> CompiledCircuit:
+        """The compiled program of the ansatz circuit."""
+        if self._compiled_circuit is None:
+            self._compiled_circuit = self._compile_circuit()
+        return self._compiled_circuit
+
+    def _compile_circuit(self, **kwargs) -> CompiledCircuit:
+        return CompiledCircuit(
+                self.ansatz.circuit,
+                qubit_order=self.ansatz.qubit_permutation(self.ansatz.qubits),
+                params=self.ansatz.param_symbols,
+                scale_factors=self.ansatz.param_table.scale_factors,
+                relabel_swaps=True,
+                **kwargs)
+
+    def evaluate_noiseless(self,
+                           x: numpy.ndarray) -> float:
+        """Evaluate parameters with a noiseless simulation."""
+        final_state = self.compiled_circuit.final_state(
+                x, self.prepared_state, copy=False)
+        return self.objective.value(final_state)
+
+    def evaluate_noiseless_batch(self,
+                                 xs: numpy.ndarray) -> numpy.ndarray:
+        """Evaluate each row of an array of parameters with a noiseless
+        simulation.
+
+        The whole batch is simulated at once as an array of shape
+        (len(xs), 2**n).
+        """
+        final_states = self.compiled_circuit.final_states(
+                xs, self.prepared_state, copy=False)
+        return self.objective.value_batch(final_states)
+
+
+class CompiledSimulateVariationalStatefulBlackBox(
+        CompiledSimulateVariationalBlackBox,
+        StatefulBlackBox):
+    """A stateful black box encapsulating a variational objective function."""
+    pass
+
+
+class AdjointGradientVariationalBlackBox(CompiledSimulateVariationalBlackBox):
+    """Evaluates parameters and gradients with a compiled program.
+
+    Gradients are computed with the adjoint method of
+    `CompiledCircuit.expectation_gradient`, at the cost of about three
+    evaluations regardless of the number of parameters. Scipy optimizers that
+    use gradients, such as L-BFGS-B and SLSQP, are given the gradient
+    automatically. The objective must be a `HamiltonianObjective`, and every
+    parameterized gate of the ansatz must be an eigengate whose exponent is
+    linear in one parameter.
+
+    If a cost is specified, noise is added to the values of the objective but
+    not to the gradients.
+    """
+
+    def __init__(self,
+                 ansatz: VariationalAnsatz,
+                 objective: VariationalObjective,
+                 preparation_circuit: Optional[cirq.Circuit]=None,
+                 initial_state: Union[int, numpy.ndarray]=0,
+                 **kwargs) -> None:
+        """
+        Raises:
+            TypeError: The objective is not a HamiltonianObjective.
+        """
+        if not isinstance(objective, HamiltonianObjective):
+            raise TypeError('Adjoint gradients require a '
+                            'HamiltonianObjective but got {}.'.format(
+                                type(objective).__name__))
+        super().__init__(ansatz,
+                         objective,
+                         preparation_circuit,
+                         initial_state,
+                         **kwargs)
+
+    @property
+    def has_gradient(self) -> bool:
+        return True
+
+    def _gradient(self,
+                  x: numpy.ndarray) -> numpy.ndarray:
+        _, gradient = self.compiled_circuit.expectation_gradient(
+                x,
+                self.objective.apply_hamiltonian,  # type: ignore
+                self.prepared_state)
+        return gradient
+
+
+class AdjointGradientVariationalStatefulBlackBox(
+        AdjointGradientVariationalBlackBox,
+        StatefulBlackBox):
+    """A stateful black box encapsulating a variational objective function."""
+    pass
+
+
+class ParameterShiftVariationalBlackBox(CompiledSimulateVariationalBlackBox):
+    """Evaluates parameters and gradients with a compiled program.
+
+    Gradients are computed exactly with the parameter-shift rule of
+    `CompiledCircuit.parameter_shift_rule`: every occurrence of a parameter
+    in the ansatz circuit contributes the values of the objective at a few
+    shifted exponents, and all of the shifted circuits are simulated together
+    as one batch. Scipy optimizers that use gradients, such as L-BFGS-B and
+    SLSQP, are given the gradient automatically.
+
+    Unlike adjoint differentiation, the gradient is a combination of values of
+    the objective, so any objective that is the expectation value of an
+    observable can be used, and if a cost is specified, the noise of the
+    objective is added to each of the shifted values.
+    """
+
+    def __init__(self,
+                 ansatz: VariationalAnsatz,
+                 objective: VariationalObjective,
+                 preparation_circuit: Optional[cirq.Circuit]=None,
+                 initial_state: Union[int, numpy.ndarray]=0,
+                 **kwargs) -> None:
+        self._parameter_shift_rule = (
+                None)  # type: Optional[Tuple[numpy.ndarray, numpy.ndarray]]
+        super().__init__(ansatz,
+                         objective,
+                         preparation_circuit,
+                         initial_state,
+                         **kwargs)
+
+    @property
+    def has_gradient(self) -> bool:
+        return True
+
+    @property
+    def evaluations_per_gradient(self) -> int:
+        exponent_shifts, _ = self.parameter_shift_rule
+        return len(exponent_shifts)
+
+    @property
+    def parameter_shift_rule(self) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """The exponent shifts and weights of the compiled ansatz circuit."""
+        if self._parameter_shift_rule is None:
+            self._parameter_shift_rule = (
+                    self.compiled_circuit.parameter_shift_rule())
+        return self._parameter_shift_rule
+
+    def _shifted_values(self,
+                        x: numpy.ndarray) -> numpy.ndarray:
+        exponent_shifts, _ = self.parameter_shift_rule
+        final_states = self.compiled_circuit.final_states(
+                numpy.tile(x, (len(exponent_shifts), 1)),
+                self.prepared_state,
+                copy=False,
+                exponent_shifts=exponent_shifts)
+        return self.objective.value_batch(final_states)
+
+    def _gradient(self,
+                  x: numpy.ndarray) -> numpy.ndarray:
+        _, weights = self.parameter_shift_rule
+        return self._shifted_values(x).dot(weights)
+
+    def _gradient_with_cost(self,
+                            x: numpy.ndarray,
+                            cost: float) -> numpy.ndarray:
+        _, weights = self.parameter_shift_rule
+        values = self._shifted_values(x)
+        noise = numpy.array([self.objective.noise(cost) for _ in values])
+        return (values + noise).dot(weights)
+
+
+class ParameterShiftVariationalStatefulBlackBox(
+        ParameterShiftVariationalBlackBox,
+        StatefulBlackBox):
+    """A stateful black box encapsulating a variational objective function."""
+    pass
+
+
+class NumberSectorSimulateVariationalBlackBox(
+        CompiledSimulateVariationalBlackBox):
+    """Evaluates parameters with a compiled program on a number sector.
+
+    The gates of the ansatzes in this library conserve the number of
+    particles, i.e., of qubits in the state 1, so the circuit is compiled to
+    act on the binomial(n, k) dimensional subspace of states with k
+    particles rather than on all 2**n states. The number of particles is
+    taken from the objective, which must be restricted to the same sector,
+    e.g. `HamiltonianObjective(hamiltonian, n_particles=k)`.
+
+    The initial state and the output of the preparation circuit must have k
+    particles. If there is no preparation circuit, the initial state is
+    prepared directly in the sector, so no state vector of dimension 2**n is
+    ever created. An initial state vector may be given either on the whole
+    space or on the sector, in the order of `NumberSector.basis`.
+    """
+
+    def __init__(self,
+                 ansatz: VariationalAnsatz,
+                 objective: VariationalObjective,
+                 preparation_circuit: Optional[cirq.Circuit]=None,
+                 initial_state: Union[int, numpy.ndarray]=0,
+                 **kwargs) -> None:
+        """
+        Raises:
+            ValueError: The objective is not restricted to a number sector.
+        """
+        if getattr(objective, 'n_particles', None) is None:
+            raise ValueError('The objective must be restricted to a number '
+                             'sector, e.g. with HamiltonianObjective('
+                             'hamiltonian, n_particles=n_particles).')
+        super().__init__(ansatz,
+                         objective,
+                         preparation_circuit,
+                         initial_state,
+                         **kwargs)
+
+    @property
+    def n_particles(self) -> int:
+        return self.objective.n_particles  # type: ignore
+
+    def _compile_circuit(self, **kwargs) -> CompiledCircuit:
+        return super()._compile_circuit(n_particles=self.n_particles,
+                                        **kwargs)
+
+    def _prepare_state(self) -> numpy.ndarray:
+        """Prepares the initial state of the ansatz on the number sector.
+
+        Raises:
+            ValueError: The prepared state does not have the number of
+                particles of the sector.
+        """
+        sector = NumberSector(len(self.ansatz.qubits), self.n_particles)
+        initial_state = self.initial_state
+        if not list(self.preparation_circuit.all_operations()):
+            if isinstance(initial_state, (int, numpy.integer)):
+                prepared_state = numpy.zeros(sector.dimension, dtype=complex)
+                prepared_state[sector.position(initial_state)] = 1
+                return prepared_state
+            initial_state = numpy.asarray(initial_state, dtype=complex)
+            if len(initial_state) == sector.dimension:
+                return initial_state.copy()
+
+        full_state = super()._prepare_state()
+        prepared_state = full_state[sector.basis]
+        if not numpy.isclose(numpy.linalg.norm(prepared_state),
+                             numpy.linalg.norm(full_state)):
+            raise ValueError('The prepared state does not have {} '
+                             'particles.'.format(self.n_particles))
+        return prepared_state
+
+
+class NumberSectorSimulateVariationalStatefulBlackBox(
+        NumberSectorSimulateVariationalBlackBox,
+        StatefulBlackBox):
+    """A stateful black box encapsulating a variational objective function."""
+    pass
+
+
 UNITARY_SIMULATE = UnitarySimulateVariationalBlackBox
 UNITARY_SIMULATE_STATEFUL = UnitarySimulateVariationalStatefulBlackBox
 XMON_SIMULATE = XmonSimulateVariationalBlackBox
 XMON_SIMULATE_STATEFUL = XmonSimulateVariationalStatefulBlackBox
+COMPILED_SIMULATE = CompiledSimulateVariationalBlackBox
+COMPILED_SIMULATE_STATEFUL = CompiledSimulateVariationalStatefulBlackBox
+ADJOINT_GRADIENT_SIMULATE = AdjointGradientVariationalBlackBox
+ADJOINT_GRADIENT_SIMULATE_STATEFUL = AdjointGradientVariationalStatefulBlackBox
+PARAMETER_SHIFT_SIMULATE = ParameterShiftVariationalBlackBox
+PARAMETER_SHIFT_SIMULATE_STATEFUL = ParameterShiftVariationalStatefulBlackBox
+NUMBER_SECTOR_SIMULATE = NumberSectorSimulateVariationalBlackBox
+NUMBER_SECTOR_SIMULATE_STATEFUL = (
+        NumberSectorSimulateVariationalStatefulBlackBox)
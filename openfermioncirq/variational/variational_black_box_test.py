@@ -10,13 +10,43 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+import pickle
+
+import numpy
 import pytest
 
+import cirq
+import openfermion
+
+from openfermioncirq import prepare_gaussian_state
 from openfermioncirq.testing import ExampleAnsatz, ExampleVariationalObjective
+from openfermioncirq.variational import (
+        HamiltonianObjective,
+        LowRankTrotterAnsatz,
+        SplitOperatorTrotterAnsatz,
+        SwapNetworkTrotterAnsatz,
+        SwapNetworkTrotterHubbardAnsatz)
+from openfermioncirq.optimization import L_BFGS_B
 from openfermioncirq.variational.variational_black_box import (
+        ADJOINT_GRADIENT_SIMULATE,
+        ADJOINT_GRADIENT_SIMULATE_STATEFUL,
+        COMPILED_SIMULATE,
+        COMPILED_SIMULATE_STATEFUL,
+        NUMBER_SECTOR_SIMULATE,
+        NUMBER_SECTOR_SIMULATE_STATEFUL,
+        PARAMETER_SHIFT_SIMULATE,
+        PARAMETER_SHIFT_SIMULATE_STATEFUL,
+        UNITARY_SIMULATE,
         VariationalBlackBox)
 
 
+diag_coul_hamiltonian = openfermion.random_diagonal_coulomb_hamiltonian(
+        4, real=True, seed=26191)
+h2_hamiltonian = openfermion.load_molecular_hamiltonian(
+        [('H', (0., 0., 0.)), ('H', (0., 0., 0.7414))],
+        'sto-3g', 1, format(0.7414), 2, 2)
+
+
 def test_variational_black_box_is_abstract_cant_instantiate():
     with pytest.raises(TypeError):
         _ = VariationalBlackBox(ExampleAnsatz(), ExampleVariationalObjective())
@@ -37,3 +67,305 @@ def test_variational_black_box_is_abstract_can_implement():
 
     assert isinstance(Included(ExampleAnsatz(), ExampleVariationalObjective()),
                       VariationalBlackBox)
+
+
+@pytest.mark.parametrize('ansatz, objective, preparation_circuit', [
+    (SwapNetworkTrotterAnsatz(diag_coul_hamiltonian, iterations=1),
+     HamiltonianObjective(diag_coul_hamiltonian),
+     cirq.Circuit.from_ops(prepare_gaussian_state(
+         cirq.LineQubit.range(4),
+         openfermion.QuadraticHamiltonian(
+             diag_coul_hamiltonian.one_body),
+         occupied_orbitals=[0, 1]))),
+    (SplitOperatorTrotterAnsatz(diag_coul_hamiltonian, iterations=2),
+     HamiltonianObjective(diag_coul_hamiltonian),
+     None),
+    (LowRankTrotterAnsatz(h2_hamiltonian, iterations=1),
+     HamiltonianObjective(h2_hamiltonian),
+     None),
+    (SwapNetworkTrotterHubbardAnsatz(2, 1, 1.0, 4.0, iterations=2),
+     HamiltonianObjective(
+         openfermion.fermi_hubbard(2, 1, 1.0, 4.0, periodic=False)),
+     None),
+])
+def test_compiled_simulate_matches_unitary_simulate(
+        ansatz, objective, preparation_circuit):
+    unitary_black_box = UNITARY_SIMULATE(
+            ansatz, objective, preparation_circuit=preparation_circuit,
+            initial_state=1)
+    compiled_black_box = COMPILED_SIMULATE(
+            ansatz, objective, preparation_circuit=preparation_circuit,
+            initial_state=1)
+    assert compiled_black_box.dimension == unitary_black_box.dimension
+
+    numpy.random.seed(18374)
+    for x in [ansatz.default_initial_params(),
+              numpy.random.randn(unitary_black_box.dimension)]:
+        numpy.testing.assert_allclose(
+                compiled_black_box.evaluate(x),
+                unitary_black_box.evaluate(x),
+                atol=1e-8)
+
+
+@pytest.mark.parametrize('ansatz, hamiltonian, preparation_circuit', [
+    (SwapNetworkTrotterAnsatz(diag_coul_hamiltonian, iterations=1),
+     diag_coul_hamiltonian,
+     cirq.Circuit.from_ops(prepare_gaussian_state(
+         cirq.LineQubit.range(4),
+         openfermion.QuadraticHamiltonian(
+             diag_coul_hamiltonian.one_body),
+         occupied_orbitals=[0, 1]))),
+    (SplitOperatorTrotterAnsatz(diag_coul_hamiltonian, iterations=2),
+     diag_coul_hamiltonian,
+     None),
+    (LowRankTrotterAnsatz(h2_hamiltonian, iterations=1),
+     h2_hamiltonian,
+     None),
+    (SwapNetworkTrotterHubbardAnsatz(2, 1, 1.0, 4.0, iterations=2),
+     openfermion.fermi_hubbard(2, 1, 1.0, 4.0, periodic=False),
+     None),
+])
+def test_number_sector_simulate_matches_compiled_simulate(
+        ansatz, hamiltonian, preparation_circuit):
+    # The preparation circuit occupies two orbitals of the vacuum
+    initial_state = 0 if preparation_circuit else 3
+    compiled_black_box = COMPILED_SIMULATE(
+            ansatz, HamiltonianObjective(hamiltonian),
+            preparation_circuit=preparation_circuit,
+            initial_state=initial_state)
+    sector_black_box = NUMBER_SECTOR_SIMULATE(
+            ansatz, HamiltonianObjective(hamiltonian, n_particles=2),
+            preparation_circuit=preparation_circuit,
+            initial_state=initial_state)
+    assert sector_black_box.n_particles == 2
+    assert sector_black_box.compiled_circuit.dimension == 6
+    assert sector_black_box.prepared_state.shape == (6,)
+
+    numpy.random.seed(50218)
+    for x in [ansatz.default_initial_params(),
+              numpy.random.randn(compiled_black_box.dimension)]:
+        numpy.testing.assert_allclose(
+                sector_black_box.evaluate(x),
+                compiled_black_box.evaluate(x),
+                atol=1e-8)
+
+
+def test_number_sector_simulate_initial_states():
+    ansatz = SwapNetworkTrotterAnsatz(diag_coul_hamiltonian, iterations=1)
+    objective = HamiltonianObjective(diag_coul_hamiltonian, n_particles=2)
+    x = ansatz.default_initial_params()
+    initial_state = numpy.zeros(16, dtype=complex)
+    initial_state[[3, 5]] = numpy.sqrt(0.5)
+
+    expected = COMPILED_SIMULATE(
+            ansatz, HamiltonianObjective(diag_coul_hamiltonian),
+            initial_state=initial_state).evaluate(x)
+    for state in [initial_state, initial_state[[3, 5, 6, 9, 10, 12]]]:
+        black_box = NUMBER_SECTOR_SIMULATE_STATEFUL(
+                ansatz, objective, initial_state=state)
+        numpy.testing.assert_allclose(black_box.evaluate(x), expected)
+        assert black_box.num_evaluations == 1
+
+    with pytest.raises(ValueError):
+        _ = NUMBER_SECTOR_SIMULATE(
+                ansatz, objective, initial_state=1).evaluate(x)
+    with pytest.raises(ValueError):
+        _ = NUMBER_SECTOR_SIMULATE(
+                ansatz, objective,
+                preparation_circuit=cirq.Circuit.from_ops(
+                    cirq.X(ansatz.qubits[0])),
+                initial_state=3).evaluate(x)
+    with pytest.raises(ValueError):
+        _ = NUMBER_SECTOR_SIMULATE(
+                ansatz, HamiltonianObjective(diag_coul_hamiltonian))
+
+
+@pytest.mark.parametrize('ansatz, objective', [
+    (SwapNetworkTrotterAnsatz(diag_coul_hamiltonian, iterations=1),
+     HamiltonianObjective(diag_coul_hamiltonian)),
+    (SplitOperatorTrotterAnsatz(diag_coul_hamiltonian, iterations=1),
+     HamiltonianObjective(diag_coul_hamiltonian)),
+    (LowRankTrotterAnsatz(h2_hamiltonian, iterations=1),
+     HamiltonianObjective(h2_hamiltonian)),
+    (SwapNetworkTrotterHubbardAnsatz(2, 1, 1.0, 4.0, iterations=1),
+     HamiltonianObjective(
+         openfermion.fermi_hubbard(2, 1, 1.0, 4.0, periodic=False))),
+])
+def test_adjoint_gradient_matches_finite_differences(ansatz, objective):
+    black_box = ADJOINT_GRADIENT_SIMULATE(ansatz, objective, initial_state=3)
+    assert black_box.has_gradient
+
+    numpy.random.seed(2240)
+    x = numpy.random.randn(black_box.dimension)
+    step = 1e-6
+    finite_differences = [
+            (black_box.evaluate(x + step * unit) -
+             black_box.evaluate(x - step * unit)) / (2 * step)
+            for unit in numpy.eye(black_box.dimension)]
+    numpy.testing.assert_allclose(
+            black_box.gradient(x), finite_differences, atol=1e-5)
+
+
+@pytest.mark.parametrize('ansatz, objective', [
+    (SwapNetworkTrotterAnsatz(diag_coul_hamiltonian, iterations=1),
+     HamiltonianObjective(diag_coul_hamiltonian)),
+    (SplitOperatorTrotterAnsatz(diag_coul_hamiltonian, iterations=1),
+     HamiltonianObjective(diag_coul_hamiltonian)),
+    (LowRankTrotterAnsatz(h2_hamiltonian, iterations=1),
+     HamiltonianObjective(h2_hamiltonian)),
+    (SwapNetworkTrotterHubbardAnsatz(2, 1, 1.0, 4.0, iterations=2),
+     HamiltonianObjective(
+         openfermion.fermi_hubbard(2, 1, 1.0, 4.0, periodic=False))),
+])
+def test_parameter_shift_matches_adjoint_gradient(ansatz, objective):
+    adjoint_black_box = ADJOINT_GRADIENT_SIMULATE(
+            ansatz, objective, initial_state=3)
+    black_box = PARAMETER_SHIFT_SIMULATE(ansatz, objective, initial_state=3)
+    assert black_box.has_gradient
+
+    numpy.random.seed(7351)
+    x = numpy.random.randn(black_box.dimension)
+    numpy.testing.assert_allclose(black_box.gradient(x),
+                                  adjoint_black_box.gradient(x),
+                                  atol=1e-8)
+
+
+def test_parameter_shift_gradient_with_cost():
+    ansatz = SwapNetworkTrotterAnsatz(diag_coul_hamiltonian, iterations=1)
+    objective = HamiltonianObjective(diag_coul_hamiltonian)
+    black_box = PARAMETER_SHIFT_SIMULATE_STATEFUL(
+            ansatz, objective, initial_state=3)
+    x = ansatz.default_initial_params()
+    gradient = black_box.gradient(x)
+    n_shifts = black_box.evaluations_per_gradient
+    assert n_shifts > 0
+    assert black_box.num_evaluations == n_shifts
+    assert black_box.cost_spent == 0.0
+
+    numpy.random.seed(52063)
+    noisy_gradient = black_box.gradient_with_cost(x, 1e8)
+    assert black_box.num_gradient_evaluations == 2 * n_shifts
+    assert black_box.cost_spent == n_shifts * 1e8
+    assert not black_box.function_values
+    assert all(noisy_gradient != gradient)
+    numpy.testing.assert_allclose(noisy_gradient, gradient, atol=0.1)
+
+    result = L_BFGS_B.optimize(black_box, x)
+    assert result.optimal_value < black_box.evaluate(x)
+    numpy.testing.assert_allclose(
+            black_box.gradient(result.optimal_parameters), 0, atol=1e-3)
+
+
+def test_adjoint_gradient_optimize():
+    ansatz = SwapNetworkTrotterAnsatz(diag_coul_hamiltonian, iterations=1)
+    objective = HamiltonianObjective(diag_coul_hamiltonian)
+    black_box = ADJOINT_GRADIENT_SIMULATE_STATEFUL(
+            ansatz, objective, initial_state=3)
+    initial_guess = ansatz.default_initial_params()
+
+    result = L_BFGS_B.optimize(black_box, initial_guess)
+    assert result.optimal_value < black_box.evaluate(initial_guess)
+    numpy.testing.assert_allclose(
+            black_box.gradient(result.optimal_parameters), 0, atol=1e-3)
+
+    noisy_gradient = black_box.gradient_with_cost(initial_guess, 1e3)
+    numpy.testing.assert_allclose(noisy_gradient,
+                                  black_box.gradient(initial_guess))
+
+
+def test_adjoint_gradient_requires_hamiltonian_objective():
+    with pytest.raises(TypeError):
+        _ = ADJOINT_GRADIENT_SIMULATE(ExampleAnsatz(),
+                                      ExampleVariationalObjective())
+
+
+def test_compiled_simulate_stateful():
+    ansatz = ExampleAnsatz()
+    objective = ExampleVariationalObjective()
+    black_box = COMPILED_SIMULATE_STATEFUL(ansatz, objective)
+    compiled_circuit = black_box.compiled_circuit
+    assert black_box.compiled_circuit is compiled_circuit
+    assert compiled_circuit.params == tuple(ansatz.params())
+
+    x = numpy.array([0.5, -0.25])
+    numpy.testing.assert_allclose(
+            black_box.evaluate(x),
+            UNITARY_SIMULATE(ansatz, objective).evaluate(x))
+    assert black_box.num_evaluations == 1
+
+
+def test_variational_black_box_evaluate_batch():
+    ansatz = SwapNetworkTrotterAnsatz(diag_coul_hamiltonian, iterations=1)
+    objective = HamiltonianObjective(diag_coul_hamiltonian)
+    unitary_black_box = UNITARY_SIMULATE(ansatz, objective, initial_state=3)
+    compiled_black_box = COMPILED_SIMULATE_STATEFUL(
+            ansatz, objective, initial_state=3)
+
+    numpy.random.seed(30015)
+    xs = numpy.random.randn(4, compiled_black_box.dimension)
+    expected = [unitary_black_box.evaluate(x) for x in xs]
+    numpy.testing.assert_allclose(
+            unitary_black_box.evaluate_batch(xs), expected, atol=1e-8)
+    numpy.testing.assert_allclose(
+            compiled_black_box.evaluate_batch(xs), expected, atol=1e-8)
+    assert compiled_black_box.num_evaluations == 4
+
+    noisy_vals = compiled_black_box.evaluate_with_cost_batch(xs, 1e6)
+    assert len(set(noisy_vals - expected)) == 4
+    numpy.testing.assert_allclose(noisy_vals, expected, atol=0.1)
+    assert compiled_black_box.cost_spent == 4e6
+
+
+def test_variational_black_box_caches_prepared_state():
+    ansatz = ExampleAnsatz()
+    objective = ExampleVariationalObjective()
+    a, b = ansatz.qubits
+    black_box = COMPILED_SIMULATE(
+            ansatz, objective,
+            preparation_circuit=cirq.Circuit.from_ops(cirq.X(a)))
+    x = numpy.array([0.0, 0.5])
+
+    def expected_value():
+        circuit = cirq.resolve_parameters(
+                black_box.preparation_circuit + ansatz.circuit,
+                ansatz.param_resolver(x))
+        return objective.value(circuit.apply_unitary_effect_to_state(
+            black_box.initial_state, qubit_order=ansatz.qubits))
+
+    prepared_state = black_box.prepared_state
+    assert black_box.prepared_state is prepared_state
+    numpy.testing.assert_allclose(prepared_state, [0, 0, 1, 0])
+    assert not prepared_state.flags.writeable
+    numpy.testing.assert_allclose(black_box.evaluate(x), expected_value())
+    assert black_box.prepared_state is prepared_state
+
+    black_box.initial_state = 1
+    numpy.testing.assert_allclose(black_box.prepared_state, [0, 0, 0, 1])
+    numpy.testing.assert_allclose(black_box.evaluate(x), expected_value())
+
+    black_box.preparation_circuit = cirq.Circuit.from_ops(cirq.X(b))
+    numpy.testing.assert_allclose(black_box.prepared_state, [1, 0, 0, 0])
+    numpy.testing.assert_allclose(black_box.evaluate(x), expected_value())
+
+    unpickled = pickle.loads(pickle.dumps(black_box))
+    assert unpickled._prepared_state is None
+    numpy.testing.assert_allclose(unpickled.evaluate(x), expected_value())
+
+
+def test_variational_black_box_prepared_state_matches_full_circuit():
+    ansatz = SwapNetworkTrotterAnsatz(diag_coul_hamiltonian, iterations=1)
+    objective = HamiltonianObjective(diag_coul_hamiltonian)
+    preparation_circuit = cirq.Circuit.from_ops(prepare_gaussian_state(
+        ansatz.qubits,
+        openfermion.QuadraticHamiltonian(diag_coul_hamiltonian.one_body),
+        occupied_orbitals=[1, 2]))
+    x = ansatz.default_initial_params()
+
+    full_circuit = cirq.resolve_parameters(
+            preparation_circuit + ansatz.circuit, ansatz.param_resolver(x))
+    expected = objective.value(full_circuit.apply_unitary_effect_to_state(
+        qubit_order=ansatz.qubit_permutation(ansatz.qubits)))
+    for black_box_type in [UNITARY_SIMULATE, COMPILED_SIMULATE]:
+        black_box = black_box_type(
+                ansatz, objective, preparation_circuit=preparation_circuit)
+        numpy.testing.assert_allclose(black_box.evaluate(x), expected)